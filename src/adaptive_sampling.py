@@ -0,0 +1,192 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from consistency_checks import STRONG_THRESHOLD, ConsistencyCheck, extract_result
+
+# Tirages initiaux par question : à température nulle, deux réponses identiques
+# suffisent généralement ; au-delà, deux réponses peuvent coïncider par hasard
+DEFAULT_MIN_RUNS = {"greedy": 2, "sampled": 3}
+# Écart maximal entre les réponses d'une question pour considérer sa médiane stable
+DEFAULT_TOLERANCE = 0.01
+# Couverture minimale de l'intervalle [min, max] des tirages pour la médiane
+DEFAULT_CONFIDENCE = 0.75
+# Nombre maximal de sommets de l'hypercube des médianes évalués par élément
+MAX_CORNERS = 256
+
+
+class AdaptiveSettings:
+    """
+    Paramètres de l'échantillonnage adaptatif des tirages.
+
+    Args:
+        min_runs: Tirages effectués d'emblée pour chaque question (None :
+                  DEFAULT_MIN_RUNS selon la température).
+        tolerance: Une question dont toutes les réponses extraites tiennent
+                   dans un intervalle de cette largeur n'est plus tirée.
+        confidence: Couverture minimale exigée de l'intervalle [min, max]
+                    des réponses pour trancher sur le seuil de violation forte.
+        threshold: Seuil des violations fortes.
+    """
+
+    def __init__(
+        self,
+        min_runs: Optional[int] = None,
+        tolerance: float = DEFAULT_TOLERANCE,
+        confidence: float = DEFAULT_CONFIDENCE,
+        threshold: float = STRONG_THRESHOLD,
+    ):
+        self.min_runs = min_runs
+        self.tolerance = tolerance
+        self.confidence = confidence
+        self.threshold = threshold
+
+    @classmethod
+    def from_config(cls, value: Any) -> Optional["AdaptiveSettings"]:
+        """
+        Lit le champ "adaptive" d'une configuration : true, false/absent,
+        ou un dictionnaire de paramètres.
+        """
+        if not value:
+            return None
+        if value is True:
+            return cls()
+        return cls(**value)
+
+    def initial_runs(self, temperature: float) -> int:
+        if self.min_runs is not None:
+            return self.min_runs
+        return DEFAULT_MIN_RUNS["greedy" if temperature == 0 else "sampled"]
+
+
+def median_coverage(runs: np.ndarray) -> np.ndarray:
+    """
+    Probabilité que la médiane de la distribution des réponses soit comprise
+    entre le minimum et le maximum de runs tirages indépendants.
+    """
+    return 1 - 2.0 ** (1 - np.asarray(runs, dtype=float))
+
+
+def answer_ranges(extracted: Sequence[Sequence[Sequence[float]]], width: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Minimum et maximum des réponses extraites de chaque question
+    (éléments × questions), NaN pour une question sans réponse extraite.
+    """
+    lows = np.full((len(extracted), width), np.nan)
+    highs = np.full((len(extracted), width), np.nan)
+    for i, item in enumerate(extracted):
+        for j, values in enumerate(item):
+            if values:
+                lows[i, j] = min(values)
+                highs[i, j] = max(values)
+    return lows, highs
+
+
+def violation_bounds(
+    check: ConsistencyCheck,
+    lows: np.ndarray,
+    highs: np.ndarray,
+    items: Sequence[Dict[str, Any]],
+    max_corners: int = MAX_CORNERS,
+    seed: int = 0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encadre la violation de chaque élément quand chaque médiane peut varier
+    dans [low, high], en évaluant la violation aux sommets de cet hypercube
+    (tous si possible, sinon max_corners tirés au hasard). C'est exact pour
+    la négation, la règle de Bayes et les paraphrases, dont les extrema sont
+    atteints aux sommets, et une approximation pour les suites monotones.
+    """
+    n_items, width = lows.shape
+    if n_items == 0:
+        return np.zeros(0), np.zeros(0)
+    n_corners = min(2 ** width, max_corners)
+    if 2 ** width <= max_corners:
+        corners = (np.arange(n_corners)[:, None] >> np.arange(width)[None, :]) & 1
+    else:
+        corners = np.random.default_rng(seed).integers(0, 2, size=(n_corners, width))
+    corners = corners.astype(bool)
+    # (sommets × éléments × questions), aplati pour un seul appel vectorisé
+    medians = np.where(corners[:, None, :], highs[None, :, :], lows[None, :, :]).reshape(-1, width)
+    repeated = [item for _ in range(n_corners) for item in items]
+    violations = check.compute(medians, repeated).reshape(n_corners, n_items)
+    return violations.min(axis=0), violations.max(axis=0)
+
+
+def prompts_to_resample(
+    check: ConsistencyCheck,
+    batch: Sequence[Dict[str, Any]],
+    extracted: Sequence[Sequence[Sequence[float]]],
+    runs: np.ndarray,
+    max_runs: int,
+    settings: AdaptiveSettings,
+) -> np.ndarray:
+    """
+    Questions à tirer une fois de plus (masque éléments × questions).
+
+    Un élément est terminé quand la médiane de chacune de ses questions est
+    stable (réponses dans un intervalle de largeur tolerance), ou quand
+    l'encadrement de sa violation est entièrement d'un côté du seuil. Sinon
+    ses questions instables, ou sans réponse extraite, sont tirées à nouveau
+    tant qu'elles n'ont pas atteint max_runs tirages.
+    """
+    width = runs.shape[1]
+    asked = np.array([[j < len(item["questions"]) for j in range(width)] for item in batch])
+    lows, highs = answer_ranges(extracted, width)
+    answered = ~np.isnan(lows)
+    unstable = asked & (~answered | (highs - lows > settings.tolerance))
+
+    low, high = violation_bounds(check, lows, highs, batch)
+    covered = (median_coverage(runs) >= settings.confidence) | ~asked
+    decided = (answered | ~asked).all(axis=1) & covered.all(axis=1) & (
+        (low > settings.threshold) | (high <= settings.threshold)
+    )
+    return unstable & ~decided[:, None] & (runs < max_runs)
+
+
+def sample_adaptively(
+    check: ConsistencyCheck,
+    batch: Sequence[Dict[str, Any]],
+    ask: Callable[[List[Tuple[int, int, int]]], List[str]],
+    max_runs: int,
+    settings: AdaptiveSettings,
+    temperature: float = 0.0,
+) -> List[List[List[str]]]:
+    """
+    Tire les réponses d'un lot question par question, jusqu'à stabilité ou
+    décision sur le seuil (cf. prompts_to_resample).
+
+    Args:
+        check: La vérification, qui fournit la fonction de violation.
+        batch: Les éléments du lot.
+        ask: Fonction recevant une liste de (élément, question, indice de
+             tirage) et renvoyant les réponses brutes dans le même ordre.
+        max_runs: Nombre maximal de tirages par question.
+        settings: Paramètres de l'échantillonnage.
+        temperature: Température des requêtes, qui fixe les tirages initiaux.
+
+    Returns:
+        Les réponses brutes (éléments × questions × tirages), avec un
+        nombre de tirages variable d'une question à l'autre.
+    """
+    width = max(len(item["questions"]) for item in batch)
+    answers: List[List[List[str]]] = [[[] for _ in item["questions"]] for item in batch]
+    extracted: List[List[List[float]]] = [[[] for _ in item["questions"]] for item in batch]
+    runs = np.zeros((len(batch), width), dtype=int)
+
+    requests = [
+        (i, j, k)
+        for k in range(min(settings.initial_runs(temperature), max_runs))
+        for i, item in enumerate(batch)
+        for j in range(len(item["questions"]))
+    ]
+    while requests:
+        for (i, j, _), response in zip(requests, ask(requests)):
+            answers[i][j].append(response)
+            runs[i, j] += 1
+            result = extract_result(response, check.answer_kind)
+            if result is not None:
+                extracted[i][j].append(result)
+        resample = prompts_to_resample(check, batch, extracted, runs, max_runs, settings)
+        requests = [(int(i), int(j), int(runs[i, j])) for i, j in zip(*np.nonzero(resample))]
+    return answers
@@ -0,0 +1,378 @@
+import argparse
+import glob
+import json
+import os
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from question_loader import iter_json_array
+
+ANSWER_TAG = "[Answer]"
+
+# Types de réponses : probabilités (dans [0, 1]) ou quantités (sans borne)
+PROBABILITY = "probability"
+QUANTITY = "quantity"
+
+# Raisons d'échec, indexées par les codes renvoyés par AnswerParser.parse_many
+OK = "ok"
+NO_TAG = "no_tag"
+NO_NUMBER = "no_number"
+OUT_OF_RANGE = "out_of_range"
+REASONS = (OK, NO_TAG, NO_NUMBER, OUT_OF_RANGE)
+
+_LEADING_SPACE = re.compile(r"\s*")
+# Nombre : signe, séparateurs de milliers, durée « 1:51.28 », décimales
+# (« 0.98. » donne 0.98), virgule décimale (« 0,75 » : une ou deux
+# décimales, trois chiffres restant un séparateur de milliers), exposant, multiplicateur (« 15 million ») et
+# pourcentage éventuel
+_NUMBER = re.compile(
+    r"(?<![\w.:])([-−]?)"
+    r"(\d+(?::\d{2})+(?:\.\d+)?|\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+,\d{1,2}(?!\d)|\d+(?:\.\d*)?|\.\d+)"
+    r"((?:[eE][-+]?\d+)?)"
+    r"(?:\s*(?i:(thousand|million|billion|trillion)\b))?"
+    r"(\s*(?:%|percent\b))?"
+)
+_SCALES = {"thousand": 1e3, "million": 1e6, "billion": 1e9, "trillion": 1e12}
+# Nombre précédé d'une date (« by the year 2025 ») : ce n'est pas la réponse
+_DATE_CONTEXT = re.compile(r"\b(?:by|in|until|before|after|since|year)\s*$", re.IGNORECASE)
+# Début de ligne sans mot avant le nombre (« **: », « ~ », « >= », « ( »...),
+# le signe éventuel restant au nombre
+_NO_WORDS = re.compile(r"[^\w\n\-−]*")
+
+
+class ParsedAnswer:
+    """
+    Résultat de l'extraction d'une réponse : la valeur, ou None et la
+    raison de l'échec (NO_TAG, NO_NUMBER, OUT_OF_RANGE).
+    """
+
+    __slots__ = ("value", "reason")
+
+    def __init__(self, value: Optional[float], reason: str = OK):
+        self.value = value
+        self.reason = reason
+
+    @property
+    def ok(self) -> bool:
+        return self.reason == OK
+
+    def __repr__(self) -> str:
+        return f"ParsedAnswer({self.value!r}, {self.reason!r})"
+
+
+class AnswerParser:
+    """
+    Extraction du nombre qui suit la dernière balise "[Answer]", sur la
+    ligne qui suit la balise, en tolérant la ponctuation et le texte
+    autour (« [Answer] 0.98. », « **[Answer]**: 35% », « [Answer] 19,119
+    meters », « [Answer] 2,5 », « [Answer] 15 million », « [Answer]
+    1:51.28 » en secondes).
+
+    Args:
+        low, high: Bornes des valeurs acceptées (None : pas de borne).
+        percent_divisor: Diviseur des valeurs suivies de « % » (100 pour une probabilité).
+    """
+
+    def __init__(self, low: Optional[float] = None, high: Optional[float] = None, percent_divisor: float = 1.0):
+        self.low = low
+        self.high = high
+        self.percent_divisor = percent_divisor
+
+    def _parse(self, text: str) -> Tuple[float, int]:
+        start = text.rfind(ANSWER_TAG)
+        if start < 0:
+            # Balise en minuscules ou en majuscules, plus rare
+            start = text.lower().rfind(ANSWER_TAG.lower())
+            if start < 0:
+                return np.nan, 1
+        start = _LEADING_SPACE.match(text, start + len(ANSWER_TAG)).end()
+        end = text.find("\n", start)
+        if end < 0:
+            end = len(text)
+        # Le nombre qui ouvre la ligne (« 0.8 for smoking, 0.3 for sex »
+        # donne 0.8), sinon le dernier de la phrase qui n'est pas une date
+        # (« the probability of a 50% decline is around 20% » donne 20%)
+        match = _NUMBER.match(text, _NO_WORDS.match(text, start, end).end(), end)
+        if match is None:
+            for candidate in _NUMBER.finditer(text, start, end):
+                if not _DATE_CONTEXT.search(text, max(start, candidate.start() - 12), candidate.start()):
+                    match = candidate
+            if match is None:
+                return np.nan, 2
+        sign, digits, exponent, scale, percent = match.groups()
+        if ":" in digits:
+            # Durée (h:)min:s, en secondes
+            seconds = 0.0
+            for part in digits.split(":"):
+                seconds = seconds * 60 + float(part)
+            digits = repr(seconds)
+        if "," in digits[-3:]:
+            # Virgule décimale (« 0,75 »)
+            digits = digits.replace(",", ".")
+        value = float(digits.replace(",", "") + exponent)
+        if scale:
+            value *= _SCALES[scale.lower()]
+        if sign:
+            value = -value
+        if percent:
+            value /= self.percent_divisor
+        if (self.low is not None and value < self.low) or (self.high is not None and value > self.high):
+            return value, 3
+        return value, 0
+
+    def parse(self, text: str) -> ParsedAnswer:
+        value, code = self._parse(text)
+        if code == 0:
+            return ParsedAnswer(value)
+        return ParsedAnswer(None, REASONS[code])
+
+    def parse_many(self, texts: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Extraction en lot.
+
+        Returns:
+            Les valeurs (NaN en cas d'échec) et les codes des raisons
+            (indices dans REASONS, 0 : succès).
+        """
+        parsed = [self._parse(text) for text in texts]
+        values = np.array([value for value, _ in parsed], dtype=float)
+        codes = np.array([code for _, code in parsed], dtype=np.int8)
+        values[codes != 0] = np.nan
+        return values, codes
+
+
+PARSERS: Dict[str, AnswerParser] = {
+    PROBABILITY: AnswerParser(0.0, 1.0, percent_divisor=100),
+    QUANTITY: AnswerParser(),
+}
+
+
+def get_parser(kind: str = PROBABILITY) -> AnswerParser:
+    try:
+        return PARSERS[kind]
+    except KeyError:
+        raise ValueError(f"Type de réponse inconnu : {kind} (disponibles : {', '.join(sorted(PARSERS))})")
+
+
+class StreamingAnswer:
+    """
+    Suit une complétion reçue par fragments (streaming) et signale dès
+    qu'une ligne « [Answer] x » est terminée avec un nombre valide : la
+    suite de la réponse ne changerait plus la valeur extraite, sauf
+    nouvelle balise plus loin, rare avec le prompt système.
+
+    Args:
+        parser: Parseur qui valide la ligne de la balise (défaut : sans
+                bornes, l'extraction finale applique celles de la vérification).
+    """
+
+    def __init__(self, parser: Optional[AnswerParser] = None):
+        self.parser = parser or AnswerParser()
+        self.text = ""
+        self.value: Optional[float] = None
+        # Position à partir de laquelle chercher la prochaine balise
+        self._search = 0
+        self._tag: Optional[int] = None
+
+    @property
+    def complete(self) -> bool:
+        return self.value is not None
+
+    def feed(self, fragment: str) -> bool:
+        """
+        Ajoute un fragment ; renvoie True quand la réponse est complète.
+        """
+        self.text += fragment
+        while self.value is None:
+            if self._tag is None:
+                found = self.text.lower().find(ANSWER_TAG.lower(), self._search)
+                if found < 0:
+                    # La balise peut être coupée entre deux fragments
+                    self._search = max(self._search, len(self.text) - len(ANSWER_TAG) + 1)
+                    return False
+                self._tag = found
+            start = _LEADING_SPACE.match(self.text, self._tag + len(ANSWER_TAG)).end()
+            end = self.text.find("\n", start) if start < len(self.text) else -1
+            if end < 0:
+                # Ligne de la réponse pas encore terminée (« 0.4 » peut devenir « 0.45 »)
+                return False
+            value, code = self.parser._parse(self.text[:end])
+            if code == 0:
+                self.value = value
+            else:
+                self._search, self._tag = self._tag + len(ANSWER_TAG), None
+        return True
+
+    def finish(self) -> bool:
+        """
+        Fin du flux : la dernière ligne peut porter la réponse sans retour à
+        la ligne. Renvoie True si elle la complète.
+        """
+        if self.value is not None:
+            return False
+        complete = self.feed("\n")
+        self.text = self.text[:-1]
+        return complete
+
+
+def count_reasons(codes: np.ndarray) -> Dict[str, int]:
+    counts = np.bincount(codes, minlength=len(REASONS))
+    return {reason: int(count) for reason, count in zip(REASONS, counts)}
+
+
+def _answer_kind(check_type: Optional[str]) -> str:
+    from consistency_checks import CHECKS
+    check = CHECKS.get(check_type)
+    return check.answer_kind if check is not None else PROBABILITY
+
+
+def load_corpus(files: Sequence[str]) -> Dict[str, Dict[str, List[Any]]]:
+    """
+    Réponses brutes et réponses extraites enregistrées des fichiers de
+    data/, aplaties et regroupées par type de réponse.
+
+    Returns:
+        {type de réponse: {"texts", "stored" (valeur ou None), "files"}}.
+    """
+    corpus: Dict[str, Dict[str, List[Any]]] = {}
+    for file in files:
+        for _, item in iter_json_array(file, fields=["type", "responses", "answers"]):
+            group = corpus.setdefault(_answer_kind(item.get("type")), {"texts": [], "stored": [], "files": []})
+            for responses, answers in zip(item.get("responses", []), item.get("answers", [])):
+                for response, answer in zip(responses, answers):
+                    group["texts"].append(response)
+                    group["stored"].append(answer["result"] if answer.get("parsed") else None)
+                    group["files"].append(os.path.basename(file))
+    return corpus
+
+
+# Cas de référence vérifiés par verify : (type de réponse, texte, valeur
+# attendue ou raison de l'échec)
+CASES: List[Tuple[str, str, Any]] = [
+    (PROBABILITY, "[Answer] 0.98.", 0.98),
+    (PROBABILITY, "**[Answer]**: 35%", 0.35),
+    (PROBABILITY, "[Answer] -0.1", OUT_OF_RANGE),
+    (PROBABILITY, "[Answer]\n- 0.3", 0.3),
+    (PROBABILITY, "No tag: 0.4", NO_TAG),
+    (PROBABILITY, "[Answer]: 0,75", 0.75),
+    (QUANTITY, "[Answer] 19,119 meters", 19119.0),
+    (QUANTITY, "[Answer] 2,5", 2.5),
+    (QUANTITY, "[Answer] 1,234,567.5", 1234567.5),
+    (QUANTITY, "[Answer] 15 million", 15e6),
+    (QUANTITY, "[Answer] 1:51.28", 111.28),
+    (QUANTITY, "[Answer] -5", -5.0),
+    (QUANTITY, "[Answer] −3", -3.0),
+    (QUANTITY, "[Answer] ~-2e3", -2000.0),
+]
+
+
+def check_cases() -> List[Dict[str, Any]]:
+    """
+    Les cas de CASES dont l'extraction ne donne pas le résultat attendu.
+    """
+    failures = []
+    for kind, text, expected in CASES:
+        parsed = get_parser(kind).parse(text)
+        if isinstance(expected, str):
+            ok = parsed.reason == expected
+        else:
+            ok = parsed.ok and bool(np.isclose(parsed.value, expected))
+        if not ok:
+            failures.append({"kind": kind, "text": text, "expected": expected, "got": repr(parsed)})
+    return failures
+
+
+def verify(data_dir: str, repeat: int = 1, show: int = 0) -> Dict[str, Any]:
+    """
+    Vérifie les cas de référence (CASES), réextrait toutes les réponses de
+    data/*.json, compare le résultat aux champs answers[].parsed/result
+    enregistrés, et mesure le débit de l'extraction (hors lecture des
+    fichiers).
+
+    Args:
+        data_dir: Dossier des jeux de données.
+        repeat: Nombre de passes chronométrées sur tout le corpus.
+        show: Nombre d'exemples de désaccords affichés par catégorie.
+    """
+    corpus = load_corpus(sorted(glob.glob(os.path.join(data_dir, "*.json"))))
+    report: Dict[str, Any] = {"cases": len(CASES), "case_failures": check_cases(), "kinds": {}}
+    total_responses = total_chars = 0
+    total_seconds = 0.0
+    for kind, group in sorted(corpus.items()):
+        parser = get_parser(kind)
+        texts = group["texts"]
+        start = time.perf_counter()
+        for _ in range(repeat):
+            values, codes = parser.parse_many(texts)
+        seconds = (time.perf_counter() - start) / repeat
+
+        stored = np.array([np.nan if v is None else v for v in group["stored"]], dtype=float)
+        was_parsed = ~np.isnan(stored)
+        now_parsed = codes == 0
+        same = was_parsed & now_parsed & np.isclose(values, stored, rtol=1e-9, atol=1e-12)
+        categories = {
+            "agree_parsed": same,
+            "agree_failed": ~was_parsed & ~now_parsed,
+            "value_differs": was_parsed & now_parsed & ~same,
+            "newly_parsed": ~was_parsed & now_parsed,
+            "no_longer_parsed": was_parsed & ~now_parsed,
+        }
+        report["kinds"][kind] = {
+            "responses": len(texts),
+            **{name: int(mask.sum()) for name, mask in categories.items()},
+            "failures": {reason: count for reason, count in count_reasons(codes).items() if reason != OK},
+            "no_longer_parsed_by_reason": count_reasons(codes[categories["no_longer_parsed"]]),
+            "seconds": seconds,
+        }
+        total_responses += len(texts)
+        total_chars += sum(map(len, texts))
+        total_seconds += seconds
+
+        for name in ("value_differs", "newly_parsed", "no_longer_parsed"):
+            for index in np.flatnonzero(categories[name])[:show]:
+                tail = texts[index][-80:].replace("\n", "\\n")
+                print(f"[{kind}] {name} ({group['files'][index]}) : enregistré {group['stored'][index]},"
+                      f" extrait {values[index]:g} ({REASONS[codes[index]]}) ... {tail}")
+
+    report["responses"] = total_responses
+    report["seconds"] = total_seconds
+    report["responses_per_second"] = total_responses / total_seconds if total_seconds else None
+    report["megabytes_per_second"] = total_chars / 1e6 / total_seconds if total_seconds else None
+    return report
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"Cas de référence : {report['cases'] - len(report['case_failures'])}/{report['cases']} corrects")
+    for failure in report["case_failures"]:
+        print(f"    [{failure['kind']}] {failure['text']!r} : attendu {failure['expected']}, obtenu {failure['got']}")
+    for kind, entry in report["kinds"].items():
+        agree = entry["agree_parsed"] + entry["agree_failed"]
+        print(f"{kind} : {entry['responses']} réponses, {agree} identiques à data/"
+              f" ({agree / max(entry['responses'], 1):.2%}), {entry['newly_parsed']} nouvellement extraites,"
+              f" {entry['no_longer_parsed']} rejetées, {entry['value_differs']} de valeur différente")
+        print("    échecs : " + ", ".join(f"{reason} {count}" for reason, count in entry["failures"].items()))
+    if report["responses_per_second"]:
+        print(f"Débit : {report['responses_per_second']:,.0f} réponses/s"
+              f" ({report['megabytes_per_second']:.1f} Mo/s, {report['seconds']:.3f} s par passe)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Réextrait les réponses enregistrées de data/ et les compare"
+                                                 " aux réponses extraites à l'époque.")
+    parser.add_argument("data_dir", nargs="?", default=os.path.join("..", "data"),
+                        help="Dossier des jeux de données (défaut : ../data)")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes chronométrées (défaut : 3)")
+    parser.add_argument("--show", type=int, default=0, help="Exemples de désaccords affichés par catégorie")
+    parser.add_argument("--output", help="Écrit aussi le rapport dans ce fichier JSON")
+    args = parser.parse_args()
+
+    report = verify(args.data_dir, args.repeat, args.show)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4)
+    if report["case_failures"]:
+        raise SystemExit(1)
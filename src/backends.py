@@ -0,0 +1,419 @@
+import asyncio
+import importlib
+import itertools
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from openai import APIStatusError, AsyncOpenAI, InternalServerError, OpenAI, RateLimitError
+
+from rate_limiter import TokenBucket
+
+DEFAULT_BASE_URL = "https://openrouter.ai/api/v1"
+# Délais (secondes) des connexions HTTP : établissement, puis lecture d'une réponse
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 120.0
+# Taille du pool de connexions gardées ouvertes (keep-alive) par backend
+DEFAULT_MAX_CONNECTIONS = 64
+DEFAULT_MAX_KEEPALIVE = 32
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+
+# (réponses, usage renvoyé par le fournisseur ou None)
+Completion = Tuple[List[str], Optional[Any]]
+# Élément d'un flux : (indice du choix, fragment de texte), ou (None, usage)
+# en fin de flux si le fournisseur renvoie l'usage
+StreamChunk = Tuple[Optional[int], Any]
+
+
+class Backend:
+    """
+    Interface commune des backends de complétion.
+
+    Args:
+        max_concurrency: Nombre maximal de requêtes simultanées vers ce
+                         backend, par boucle d'événements (None : seulement
+                         la limite de gpt_query_many).
+    """
+
+    # Le backend renvoie n réponses en un seul appel (paramètre n de l'API)
+    supports_n = False
+    # Le backend envoie les réponses au fil de leur génération (cf. astream)
+    supports_stream = False
+
+    def __init__(self, max_concurrency: Optional[int] = None):
+        self.max_concurrency = max_concurrency
+        # Un sémaphore asyncio est lié à une boucle d'événements
+        self._semaphores: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+    def limit(self) -> Any:
+        """
+        Contexte asynchrone limitant la concurrence propre au backend.
+        """
+        if self.max_concurrency is None:
+            return _NO_LIMIT
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            # Une boucle par thread (cf. gpt_interface._run) ; celles qui
+            # sont fermées ne servent plus
+            self._semaphores = {other: sem for other, sem in self._semaphores.items() if not other.is_closed()}
+            self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphores[loop]
+
+    def create(
+        self,
+        model_name: str,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.0,
+        max_tokens: int = 200,
+        sample_index: int = 0,
+        n: int = 1,
+    ) -> Completion:
+        raise NotImplementedError
+
+    async def acreate(
+        self,
+        model_name: str,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.0,
+        max_tokens: int = 200,
+        sample_index: int = 0,
+        n: int = 1,
+    ) -> Completion:
+        # Par défaut, l'appel synchrone part dans un thread
+        return await asyncio.to_thread(self.create, model_name, messages, temperature, max_tokens, sample_index, n)
+
+    async def astream(
+        self,
+        model_name: str,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.0,
+        max_tokens: int = 200,
+        sample_index: int = 0,
+        n: int = 1,
+    ) -> AsyncIterator[StreamChunk]:
+        """
+        Complétions en flux (cf. StreamChunk). Fermer le générateur avant la
+        fin (aclose) interrompt la génération. Par défaut, chaque réponse
+        arrive en un seul fragment.
+        """
+        contents, usage = await self.acreate(model_name, messages, temperature, max_tokens, sample_index, n)
+        for index, content in enumerate(contents):
+            yield index, content
+        if usage is not None:
+            yield None, usage
+
+    def close(self):
+        pass
+
+
+class _NoLimit:
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, *exc: Any):
+        return False
+
+
+_NO_LIMIT = _NoLimit()
+
+BACKENDS: Dict[str, Callable[..., Backend]] = {}
+
+
+def register_backend(name: str):
+    """
+    Décorateur enregistrant une classe (ou fabrique) de backend dans BACKENDS.
+    """
+    def decorator(factory: Callable[..., Backend]) -> Callable[..., Backend]:
+        BACKENDS[name] = factory
+        return factory
+    return decorator
+
+
+def create_backend(kind: str, **options: Any) -> Backend:
+    try:
+        factory = BACKENDS[kind]
+    except KeyError:
+        raise ValueError(f"Type de backend inconnu : {kind} (disponibles : {', '.join(sorted(BACKENDS))})")
+    return factory(**options)
+
+
+@register_backend("openai")
+class OpenAICompatibleBackend(Backend):
+    """
+    API compatible OpenAI (OpenAI, OpenRouter, vLLM, fake_openai_server.py...)
+    sur un pool de connexions HTTP persistantes, partagé par toutes les
+    requêtes du backend.
+
+    Args:
+        base_url: URL de l'API (défaut : $OPENAI_BASE_URL, sinon OpenRouter).
+        api_key: Clé d'API (défaut : variable d'environnement api_key_env).
+        api_key_env: Variable d'environnement contenant la clé.
+        connect_timeout, read_timeout: Délais HTTP en secondes.
+        max_connections, max_keepalive, keepalive_expiry: Réglages du pool.
+        max_concurrency: Requêtes simultanées au plus vers ce backend.
+        supports_n: Le fournisseur honore le paramètre n.
+        supports_stream: Le fournisseur sait envoyer les réponses en flux (stream).
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        api_key_env: str = "OPENAI_API_KEY",
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive: int = DEFAULT_MAX_KEEPALIVE,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+        max_concurrency: Optional[int] = None,
+        supports_n: bool = True,
+        supports_stream: bool = True,
+    ):
+        super().__init__(max_concurrency)
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL", DEFAULT_BASE_URL)
+        self.api_key = api_key or os.getenv(api_key_env)
+        self.supports_n = supports_n
+        self.supports_stream = supports_stream
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._client: Optional[OpenAI] = None
+        self._async_clients: Dict[asyncio.AbstractEventLoop, AsyncOpenAI] = {}
+
+    def _client_options(self) -> Dict[str, Any]:
+        # Les relances sont gérées par gpt_interface (et comptées dans metrics)
+        return {"base_url": self.base_url, "api_key": self.api_key or "", "max_retries": 0}
+
+    @property
+    def client(self) -> OpenAI:
+        if self._client is None:
+            http_client = httpx.Client(timeout=self.timeout, limits=self.limits)
+            self._client = OpenAI(http_client=http_client, **self._client_options())
+        return self._client
+
+    def async_client(self) -> AsyncOpenAI:
+        """
+        Client asynchrone de la boucle d'événements courante : un pool de
+        connexions ne peut pas passer d'une boucle à l'autre (asyncio.run).
+        """
+        loop = asyncio.get_running_loop()
+        if loop not in self._async_clients:
+            # Les clients des boucles terminées ne servent plus
+            self._async_clients = {
+                other: client for other, client in self._async_clients.items() if not other.is_closed()
+            }
+            http_client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+            self._async_clients[loop] = AsyncOpenAI(http_client=http_client, **self._client_options())
+        return self._async_clients[loop]
+
+    def _request(self, model_name: str, messages: List[Dict[str, str]], temperature: float,
+                 max_tokens: int, n: int) -> Dict[str, Any]:
+        request = {"model": model_name, "messages": messages, "temperature": temperature,
+                   "max_tokens": max_tokens, "extra_body": {}}
+        if n > 1:
+            request["n"] = n
+        return request
+
+    def create(self, model_name, messages, temperature=0.0, max_tokens=200, sample_index=0, n=1) -> Completion:
+        completion = self.client.chat.completions.create(**self._request(model_name, messages, temperature, max_tokens, n))
+        return [choice.message.content for choice in completion.choices], completion.usage
+
+    async def acreate(self, model_name, messages, temperature=0.0, max_tokens=200, sample_index=0, n=1) -> Completion:
+        completion = await self.async_client().chat.completions.create(
+            **self._request(model_name, messages, temperature, max_tokens, n)
+        )
+        return [choice.message.content for choice in completion.choices], completion.usage
+
+    async def astream(self, model_name, messages, temperature=0.0, max_tokens=200, sample_index=0, n=1):
+        stream = await self.async_client().chat.completions.create(
+            **self._request(model_name, messages, temperature, max_tokens, n),
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        try:
+            async for chunk in stream:
+                for choice in chunk.choices:
+                    if choice.delta.content:
+                        yield choice.index, choice.delta.content
+                if chunk.usage is not None:
+                    yield None, chunk.usage
+        finally:
+            # Ferme la connexion : le fournisseur arrête la génération
+            await stream.close()
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+        # Chaque client asynchrone (et son pool) se ferme sur la boucle qui
+        # l'a créé ; ceux des boucles déjà fermées n'ont plus de connexions
+        for loop, client in self._async_clients.items():
+            if loop.is_closed():
+                continue
+            if loop.is_running():
+                asyncio.run_coroutine_threadsafe(client.close(), loop)
+            else:
+                loop.run_until_complete(client.close())
+        self._async_clients = {}
+
+
+def injected_error(draw: float, error_rate: float, rate_limit_rate: float, source: str) -> Optional[APIStatusError]:
+    """
+    Erreur simulée pour un tirage uniforme draw dans [0, 1) : une erreur
+    serveur (500) avec la probabilité error_rate, une 429 avec la
+    probabilité rate_limit_rate, sinon None.
+    """
+    if draw < error_rate:
+        request = httpx.Request("POST", f"{source.lower()}://chat/completions")
+        return InternalServerError(f"Erreur injectée par {source}", response=httpx.Response(500, request=request), body=None)
+    if draw < error_rate + rate_limit_rate:
+        return rate_limit_error(source)
+    return None
+
+
+def rate_limit_error(source: str, retry_after: Optional[float] = None) -> RateLimitError:
+    """
+    Erreur 429 simulée, avec l'en-tête retry-after-ms si retry_after est donné.
+    """
+    request = httpx.Request("POST", f"{source.lower()}://chat/completions")
+    headers = {"retry-after-ms": f"{1000 * retry_after:.0f}"} if retry_after is not None else None
+    return RateLimitError(f"Limite de débit injectée par {source}",
+                          response=httpx.Response(429, request=request, headers=headers), body=None)
+
+
+# Texte ajouté après la réponse par FakeBackend(ramble=...)
+_RAMBLE = "Further considerations about base rates and recent news could still refine this estimate slightly."
+
+
+@register_backend("fake")
+class FakeBackend(Backend):
+    """
+    Réponses déterministes de fake_openai_server.fake_answer, sans HTTP :
+    pour tester le pipeline sans réseau ni clé, ou le mesurer (benchmarks.py).
+
+    Args:
+        latency: Délai simulé par requête, en secondes (en flux, réparti
+                 entre les fragments).
+        error_rate: Probabilité d'injecter une erreur serveur (500).
+        rate_limit_rate: Probabilité d'injecter une erreur 429, quel que soit
+                         le débit.
+        rpm: Capacité simulée, en requêtes par minute : au-delà (seau à
+             jetons d'une seconde de réserve), les requêtes reçoivent une
+             429 avec Retry-After, comme chez un fournisseur.
+        seed: Graine du tirage des erreurs injectées.
+        ramble: Nombre de mots ajoutés après la ligne [Answer], pour simuler
+                une réponse qui s'éternise (cf. gpt_interface.enable_streaming).
+        max_concurrency: Requêtes simultanées au plus vers ce backend.
+    """
+
+    supports_n = True
+    supports_stream = True
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        rpm: Optional[float] = None,
+        seed: Optional[int] = None,
+        ramble: int = 0,
+        max_concurrency: Optional[int] = None,
+    ):
+        super().__init__(max_concurrency)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.capacity = TokenBucket(rpm, capacity=max(1.0, rpm / 60)) if rpm else None
+        self._capacity_lock = threading.Lock()
+        self.random = random.Random(seed)
+        self.ramble = ramble
+        self.calls = 0
+        self.injected_errors = 0
+
+    def _admit(self):
+        # Requête reçue : refusée (429) si elle dépasse la capacité simulée
+        self.calls += 1
+        if self.capacity is None:
+            return
+        with self._capacity_lock:
+            wait = self.capacity.wait_time(1, time.monotonic())
+            if wait == 0:
+                self.capacity.take(1)
+                return
+        self.injected_errors += 1
+        raise rate_limit_error("FakeBackend", retry_after=wait)
+
+    def _answers(self, messages: List[Dict[str, str]], temperature: float, sample_index: int, n: int) -> List[str]:
+        from fake_openai_server import fake_answer
+
+        error = injected_error(self.random.random(), self.error_rate, self.rate_limit_rate, "FakeBackend")
+        if error is not None:
+            self.injected_errors += 1
+            raise error
+        answers = [fake_answer(messages[-1]["content"], temperature, i) for i in range(sample_index, sample_index + n)]
+        if self.ramble:
+            ramble = " ".join(itertools.islice(itertools.cycle(_RAMBLE.split()), self.ramble))
+            answers = [f"{answer}\n{ramble}" for answer in answers]
+        return answers
+
+    def create(self, model_name, messages, temperature=0.0, max_tokens=200, sample_index=0, n=1) -> Completion:
+        self._admit()
+        if self.latency > 0:
+            time.sleep(self.latency)
+        return self._answers(messages, temperature, sample_index, n), None
+
+    async def acreate(self, model_name, messages, temperature=0.0, max_tokens=200, sample_index=0, n=1) -> Completion:
+        self._admit()
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        return self._answers(messages, temperature, sample_index, n), None
+
+    async def astream(self, model_name, messages, temperature=0.0, max_tokens=200, sample_index=0, n=1):
+        self._admit()
+        # Un fragment par mot, les choix entrelacés comme dans l'API
+        fragments = [re.findall(r"\S+\s*|\s+", answer) for answer in self._answers(messages, temperature, sample_index, n)]
+        steps = max(len(f) for f in fragments)
+        for step in range(steps):
+            if self.latency > 0:
+                await asyncio.sleep(self.latency / steps)
+            for index, answer_fragments in enumerate(fragments):
+                if step < len(answer_fragments):
+                    yield index, answer_fragments[step]
+
+
+@register_backend("local")
+class LocalModelBackend(Backend):
+    """
+    Point d'accroche pour un modèle local (transformers, llama.cpp, ...).
+
+    Args:
+        generate: Fonction (model_name, messages, temperature, max_tokens, n)
+                  -> liste de n réponses, ou son chemin "module:fonction".
+        max_concurrency: Générations simultanées (1 par défaut : un modèle
+                         local occupe généralement tout le GPU).
+    """
+
+    supports_n = True
+
+    def __init__(self, generate: Any, max_concurrency: Optional[int] = 1):
+        super().__init__(max_concurrency)
+        if isinstance(generate, str):
+            module_name, function_name = generate.split(":")
+            generate = getattr(importlib.import_module(module_name), function_name)
+        self.generate = generate
+
+    def create(self, model_name, messages, temperature=0.0, max_tokens=200, sample_index=0, n=1) -> Completion:
+        return list(self.generate(model_name, messages, temperature, max_tokens, n)), None
+
+
+@register_backend("replay")
+def _replay_backend(data_dir: str, **options: Any) -> Backend:
+    from replay_backend import ReplayBackend
+    return ReplayBackend(data_dir, **options)
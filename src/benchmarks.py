@@ -0,0 +1,537 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+import run_checks
+from backends import FakeBackend
+from consistency_checks import CHECKS, ConsistencyCheck, extract_result, get_check
+from experiment_io import append_results, finished_results
+from gpt_interface import configure_cache, set_backend, set_rate_controller
+from question_loader import iter_json_array, iter_question_items
+from rate_limiter import DEFAULT_INCREASE, RateController
+from rescore import pack_answers, rescore
+from word_diff import paraphrase_pairs, word_edits
+
+BENCHMARKS_DIR = os.path.join(run_checks.RESULTS_ROOT, "benchmarks")
+# Version du générateur : les jeux de données en cache sont régénérés si elle change
+GENERATOR_VERSION = 1
+# Nombre d'éléments à l'échelle 1, celui des fichiers de data/
+BASE_ITEMS = {"negated_pair": 200, "paraphrase": 104, "bayes": 51, "monotonic_sequence": 50}
+SCALES = (1, 10, 100, 1000)
+DEFAULT_SCALES = (1, 10, 100)
+DEFAULT_DRIVER_SCALES = (1,)
+DEFAULT_RUNS = 6
+# Longueur des raisonnements générés, proche de celle des réponses de data/
+DEFAULT_RESPONSE_CHARS = 1200
+# Proportion de réponses sans balise [Answer]
+DEFAULT_UNPARSED_RATE = 0.02
+DEFAULT_TOLERANCE = 0.2
+# En deçà (secondes), les écarts de durée relèvent du bruit de mesure
+MIN_COMPARED_SECONDS = 0.05
+# Réglages qui changent les durées : deux exécutions ne sont comparables que s'ils sont égaux
+COMPARED_SETTINGS = ("runs", "response_chars", "latency", "error_rate", "capacity_rpm", "backoff_base",
+                     "max_concurrency", "seed", "generator_version")
+# Taille des lots du pilote (cf. run_checks.run_config, checkpoint_every)
+BATCH_SIZE = 8
+# Hausse AIMD (requêtes/min par succès) du pilote, en part de la capacité
+# simulée : après une 429, le débit remonte à la capacité en une seconde
+# environ, au lieu de plusieurs minutes avec la hausse par défaut (+1)
+CAPACITY_INCREASE = 1 / 120
+
+SUBJECTS = [
+    "the Lunar Research Consortium", "the city of Port Elston", "the Northern Grid Authority",
+    "the Meridian Space Agency", "the Coastal Rail Company", "the Global Seed Vault Trust",
+    "the Helix Biotech Institute", "the Pacific Fusion Laboratory",
+]
+EVENTS = [
+    "launch a crewed mission to orbit", "open a fully automated factory", "reach one million subscribers",
+    "ban single-use plastics", "complete a high-speed rail line", "publish a verified room-temperature superconductor",
+    "double its annual budget", "run entirely on renewable energy",
+]
+QUANTITIES = [
+    "operational fusion reactors connected to a national grid", "people living permanently in Antarctica",
+    "countries with a central bank digital currency", "humanoid robots sold to households",
+    "commercial flights powered by hydrogen",
+]
+PARAPHRASES = [
+    "Will {s} {e} by {y}?",
+    "By the end of {y}, will {s} {e}?",
+    "Is it going to happen that {s} will {e} before {y} is over?",
+    "Before {y} ends, will {s} manage to {e}?",
+]
+REASONING = [
+    "On the YES side, recent announcements suggest that the necessary investments are already planned.",
+    "On the NO side, similar projects have historically been delayed by regulatory hurdles and funding gaps.",
+    "Base rates for comparable initiatives indicate that roughly half of them meet their stated deadlines.",
+    "Public statements from officials point to strong political support, although budgets remain uncertain.",
+    "Taking an outside view, technological progress in this area has been slower than early forecasts.",
+    "Combining these considerations, an intermediate estimate seems more reasonable than an extreme one.",
+]
+
+
+def _reasoning_pool(rng: np.random.Generator, length: int, size: int = 64) -> List[str]:
+    """
+    Raisonnements synthétiques d'environ length caractères, tirés une
+    fois pour toutes : seule la balise [Answer] change d'une réponse à l'autre.
+    """
+    pool = []
+    for _ in range(size):
+        parts: List[str] = []
+        while sum(len(p) + 1 for p in parts) < length:
+            parts.append(REASONING[rng.integers(len(REASONING))])
+        pool.append("\n".join(parts)[:length])
+    return pool
+
+
+def _questions(check: str, index: int, rng: np.random.Generator) -> Dict[str, Any]:
+    """
+    Questions d'un élément synthétique (et "direction" pour les suites
+    monotones) ; le numéro de l'élément les rend toutes distinctes.
+    """
+    s = f"{SUBJECTS[rng.integers(len(SUBJECTS))]} (branch {index})"
+    e = EVENTS[rng.integers(len(EVENTS))]
+    y = int(rng.integers(2026, 2060))
+    if check == "negated_pair":
+        return {"questions": [f"Will {s} {e} by {y}?", f"Will {s} not {e} by {y}?"]}
+    if check == "paraphrase":
+        return {"questions": [template.format(s=s, e=e, y=y) for template in PARAPHRASES]}
+    if check == "bayes":
+        s2 = f"{SUBJECTS[rng.integers(len(SUBJECTS))]} (division {index})"
+        e2 = EVENTS[rng.integers(len(EVENTS))]
+        return {"questions": [
+            f"Will {s} {e} by {y}?",
+            f"Will {s2} {e2} by {y}?",
+            f"Conditional on {s} managing to {e} by {y}, will {s2} {e2} during the same period?",
+            f"Conditional on {s2} managing to {e2} by {y}, will {s} {e} during the same period?",
+        ]}
+    quantity = QUANTITIES[rng.integers(len(QUANTITIES))]
+    years = range(y, y + 15, 3)
+    return {
+        "questions": [f"How many {quantity} will there be in region {index} by the year {year}?" for year in years],
+        "direction": "decreasing" if rng.random() < 0.3 else "increasing",
+    }
+
+
+def _true_values(check: str, rng: np.random.Generator) -> np.ndarray:
+    """
+    Valeurs « vraies » des questions d'un élément, autour desquelles les
+    réponses sont tirées (avec quelques incohérences volontaires).
+    """
+    if check == "negated_pair":
+        p = rng.uniform(0.05, 0.95)
+        return np.clip([p, 1 - p + rng.normal(0, 0.15)], 0, 1)
+    if check == "paraphrase":
+        return np.clip(rng.uniform(0.05, 0.95) + rng.normal(0, 0.08, 4), 0, 1)
+    if check == "bayes":
+        a, b, b_given_a = rng.uniform(0.1, 0.9, 3)
+        return np.clip([a, b, b_given_a, a * b_given_a / b + rng.normal(0, 0.1)], 0, 1)
+    steps = np.maximum(rng.normal(3, 3, 5), 0)
+    return np.round(rng.uniform(0, 50) + np.cumsum(steps))
+
+
+def _draw_answer(check: str, value: float, rng: np.random.Generator) -> float:
+    if check == "monotonic_sequence":
+        return float(max(0, round(value + rng.normal(0, 2))))
+    return round(float(np.clip(value + rng.normal(0, 0.05), 0, 1)), 2)
+
+
+def synthetic_items(
+    check_name: str,
+    n_items: int,
+    runs: int = DEFAULT_RUNS,
+    response_chars: int = DEFAULT_RESPONSE_CHARS,
+    unparsed_rate: float = DEFAULT_UNPARSED_RATE,
+    seed: int = 0,
+    chunk_size: int = 1024,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Éléments synthétiques au format des fichiers de data/ (questions,
+    responses, answers, type, direction, violation, median, std_devs),
+    produits par paquets : médianes et violations sont calculées comme
+    dans rescore.py.
+    """
+    check = get_check(check_name)
+    rng = np.random.default_rng([seed, sorted(CHECKS).index(check_name)])
+    pool = _reasoning_pool(rng, response_chars)
+    for start in range(0, n_items, chunk_size):
+        chunk = []
+        for index in range(start, min(n_items, start + chunk_size)):
+            item = _questions(check_name, index, rng)
+            responses, answers = [], []
+            values = _true_values(check_name, rng)
+            if item.get("direction") == "decreasing":
+                values = values[::-1]
+            for value in values:
+                prompt_responses, prompt_answers = [], []
+                for _ in range(runs):
+                    reasoning = pool[rng.integers(len(pool))]
+                    if rng.random() < unparsed_rate:
+                        prompt_responses.append(reasoning)
+                        prompt_answers.append({"parsed": False, "result": None})
+                        continue
+                    answer = _draw_answer(check_name, value, rng)
+                    shown = int(answer) if check_name == "monotonic_sequence" else answer
+                    prompt_responses.append(f"{reasoning}\n\n[Answer] {shown}")
+                    prompt_answers.append({"parsed": True, "result": answer})
+                responses.append(prompt_responses)
+                answers.append(prompt_answers)
+            chunk.append({"questions": item["questions"], "responses": responses, "answers": answers,
+                          "type": check.name, **({"direction": item["direction"]} if "direction" in item else {})})
+        scores = rescore(pack_answers(chunk), check.name)
+        for row, item in enumerate(chunk):
+            n_questions = len(item["questions"])
+            item["violation"] = float(scores["violation"][row])
+            item["median"] = [None if np.isnan(m) else float(m) for m in scores["median"][row, :n_questions]]
+            item["std_devs"] = [None if np.isnan(s) else float(s) for s in scores["std_devs"][row, :n_questions]]
+            yield item
+
+
+def generate_dataset(
+    data_dir: str,
+    check_name: str,
+    scale: int,
+    runs: int = DEFAULT_RUNS,
+    response_chars: int = DEFAULT_RESPONSE_CHARS,
+    seed: int = 0,
+) -> str:
+    """
+    Écrit (élément par élément, mémoire bornée) le jeu synthétique d'une
+    vérification à l'échelle donnée, sauf s'il existe déjà dans data_dir.
+
+    Returns:
+        Le chemin d'accès au fichier JSON.
+    """
+    name = f"{check_name}_x{scale}_runs_{runs}_chars_{response_chars}_seed_{seed}_v{GENERATOR_VERSION}.json"
+    file = os.path.join(data_dir, name)
+    if os.path.exists(file):
+        return file
+    os.makedirs(data_dir, exist_ok=True)
+    tmp_file = file + ".tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write("[\n")
+        items = synthetic_items(check_name, BASE_ITEMS[check_name] * scale, runs, response_chars, seed=seed)
+        for i, item in enumerate(items):
+            f.write((",\n" if i else "") + json.dumps(item, ensure_ascii=False))
+        f.write("\n]\n")
+    os.replace(tmp_file, file)
+    return file
+
+
+def _row(stage: str, check: str, scale: int, items: int, units: int, seconds: float) -> Dict[str, Any]:
+    return {
+        "stage": stage,
+        "check": check,
+        "scale": scale,
+        "items": items,
+        "units": units,
+        "seconds": seconds,
+        "units_per_second": units / seconds if seconds > 0 else None,
+    }
+
+
+def _timed(function: Callable[[], Any]) -> tuple:
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def bench_file(file: str, check: ConsistencyCheck, scale: int, work_dir: str) -> List[Dict[str, Any]]:
+    """
+    Chronomètre, sur un fichier synthétique, les chargeurs de questions,
+    extract_result, le calcul des médianes et violations (par lot comme
+    le pilote, puis vectorisé sur tout le fichier comme rescore.py) et la
+    sérialisation des résultats.
+    """
+    rows = []
+    items, seconds = _timed(lambda: run_checks.load_items(file, check))
+    rows.append(_row("load_items", check.name, scale, len(items), len(items), seconds))
+    answered, seconds = _timed(lambda: list(iter_question_items(file, check.arity, check.fields, with_answers=True)))
+    rows.append(_row("load_answers", check.name, scale, len(answered), len(answered), seconds))
+    packed, seconds = _timed(lambda: pack_answers(answered))
+    n_answers = int(packed["parsed"].size)
+    rows.append(_row("pack_answers", check.name, scale, len(answered), n_answers, seconds))
+    _, seconds = _timed(lambda: rescore(packed, check.name))
+    rows.append(_row("rescore", check.name, scale, len(answered), len(answered), seconds))
+    del answered, packed
+
+    # Réponses complètes lues par lots : seul le traitement est chronométré
+    jsonl_file = os.path.join(work_dir, f"output_{check.name}_x{scale}.jsonl")
+    open(jsonl_file, 'w', encoding='utf-8').close()
+    timings = {"extract_result": 0.0, "score_batch": 0.0, "append_results": 0.0}
+    n_items = n_responses = 0
+    fields = ["questions", "responses", *check.fields]
+
+    def process(batch: List[Dict[str, Any]]):
+        nonlocal n_responses
+        responses = [item.pop("responses") for item in batch]
+        flat = [r for item_responses in responses for prompt_responses in item_responses for r in prompt_responses]
+        start = time.perf_counter()
+        for response in flat:
+            extract_result(response, check.answer_kind)
+        timings["extract_result"] += time.perf_counter() - start
+        entries, seconds = _timed(lambda: run_checks.score_batch(check, batch, responses))
+        timings["score_batch"] += seconds
+        _, seconds = _timed(lambda: append_results(jsonl_file, entries))
+        timings["append_results"] += seconds
+        n_responses += len(flat)
+
+    batch = []
+    for _, item in iter_json_array(file, fields=fields):
+        batch.append(item)
+        n_items += 1
+        if len(batch) == BATCH_SIZE:
+            process(batch)
+            batch = []
+    if batch:
+        process(batch)
+    rows.append(_row("extract_result", check.name, scale, n_items, n_responses, timings["extract_result"]))
+    rows.append(_row("score_batch", check.name, scale, n_items, n_items, timings["score_batch"]))
+    rows.append(_row("append_results", check.name, scale, n_items, n_items, timings["append_results"]))
+    results, seconds = _timed(lambda: finished_results(jsonl_file))
+    rows.append(_row("finished_results", check.name, scale, len(results), len(results), seconds))
+    del results
+    os.remove(jsonl_file)
+
+    if check.name == "paraphrase":
+        # plot_paraphrases.get_levenshtein_sentence_distance_edits délègue à
+        # word_edits ; l'appeler directement évite de charger matplotlib
+        pairs = [(first, second) for _, _, _, first, second in paraphrase_pairs(file)]
+        _, seconds = _timed(lambda: [word_edits(a, b) for a, b in pairs])
+        rows.append(_row("levenshtein_edits", check.name, scale, n_items, len(pairs), seconds))
+    return rows
+
+
+def fastest(passes: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Garde, pour chaque étape, la plus rapide de plusieurs passes identiques :
+    le minimum est la mesure la moins sensible à la charge de la machine.
+    """
+    return [min(rows, key=lambda row: row["seconds"]) for rows in zip(*passes)]
+
+
+def bench_driver(
+    file: str,
+    check: ConsistencyCheck,
+    scale: int,
+    work_dir: str,
+    runs: int,
+    latency: float,
+    error_rate: float,
+    capacity_rpm: Optional[float],
+    backoff_base: float,
+    seed: int,
+    max_concurrency: int,
+) -> Dict[str, Any]:
+    """
+    Exécution complète de run_checks.run_config sur tous les éléments d'un
+    fichier, contre un FakeBackend (latence, erreurs 500 injectées et
+    capacité limitée à capacity_rpm). Chaque exécution part d'un régulateur
+    de débit neuf : au-delà de la capacité, les 429 réduisent le débit
+    (AIMD) comme avec une vraie API, puis il remonte vite
+    (CAPACITY_INCREASE) ; le pilote tourne alors à peu près à la capacité,
+    soit une durée proche de appels / (capacity_rpm / 60) secondes.
+    """
+    backend = FakeBackend(latency=latency, error_rate=error_rate, rpm=capacity_rpm, seed=seed)
+    set_backend(backend)
+    increase = max(DEFAULT_INCREASE, capacity_rpm * CAPACITY_INCREASE) if capacity_rpm else DEFAULT_INCREASE
+    set_rate_controller(RateController(backoff_base=backoff_base, increase=increase, seed=seed))
+    n_items = BASE_ITEMS[check.name] * scale
+    config = {"name": f"bench_{check.name}_x{scale}", "file": file, "type": check.name, "model": "fake-model",
+              "temperature": 0.5, "run": runs, "sample_size": n_items, "seed": seed}
+    try:
+        results, seconds = _timed(lambda: run_checks.run_config(
+            config, results_root=work_dir, max_concurrency=max_concurrency
+        ))
+    finally:
+        set_backend(None)
+        set_rate_controller(RateController())
+    row = _row("driver", check.name, scale, len(results), backend.calls, seconds)
+    row.update({"injected_errors": backend.injected_errors, "latency": latency,
+                "error_rate": error_rate, "capacity_rpm": capacity_rpm})
+    return row
+
+
+def environment() -> Dict[str, Any]:
+    """
+    Version du code et de la machine, pour comparer deux exécutions.
+    """
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=run_checks.SRC_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        "git_revision": revision,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_benchmarks(
+    scales: Sequence[int] = DEFAULT_SCALES,
+    driver_scales: Sequence[int] = DEFAULT_DRIVER_SCALES,
+    checks: Sequence[str] = tuple(BASE_ITEMS),
+    data_dir: Optional[str] = None,
+    runs: int = DEFAULT_RUNS,
+    response_chars: int = DEFAULT_RESPONSE_CHARS,
+    latency: float = 0.0,
+    error_rate: float = 0.0,
+    capacity_rpm: Optional[float] = None,
+    backoff_base: float = 0.01,
+    max_concurrency: int = 16,
+    seed: int = 0,
+    repeat: int = 1,
+) -> Dict[str, Any]:
+    """
+    Génère les jeux synthétiques manquants, puis chronomètre chaque étape
+    pour chaque vérification et chaque échelle.
+
+    Args:
+        data_dir: Dossier où garder les jeux synthétiques pour les
+                  exécutions suivantes ; None : dossier temporaire supprimé
+                  à la fin.
+        capacity_rpm: Capacité simulée du backend, en requêtes par minute
+                      (None : illimitée), cf. bench_driver.
+        backoff_base: Base des attentes entre deux essais après une erreur
+                      injectée (cf. rate_limiter.RateController).
+        repeat: Passes des étapes hors pilote, dont la plus rapide est gardée.
+
+    Returns:
+        {"environment", "settings", "results"} : une ligne par (étape,
+        vérification, échelle), avec la durée en secondes et le débit.
+    """
+    settings = {
+        "scales": list(scales), "driver_scales": list(driver_scales), "checks": list(checks), "runs": runs,
+        "response_chars": response_chars, "latency": latency, "error_rate": error_rate,
+        "capacity_rpm": capacity_rpm, "backoff_base": backoff_base,
+        "max_concurrency": max_concurrency, "seed": seed, "repeat": repeat, "generator_version": GENERATOR_VERSION,
+    }
+    work_dir = tempfile.mkdtemp(prefix="benchmarks_")
+    data_dir = data_dir or os.path.join(work_dir, "data")
+    # Les réponses du FakeBackend ne doivent pas venir du cache
+    configure_cache(None)
+    rows = []
+    try:
+        for scale in sorted(set(scales) | set(driver_scales)):
+            for check_name in checks:
+                check = get_check(check_name)
+                file, seconds = _timed(lambda: generate_dataset(data_dir, check_name, scale, runs, response_chars, seed))
+                print(f"{check_name} ×{scale} : {os.path.getsize(file) / 1e6:.1f} Mo ({seconds:.1f} s)")
+                if scale in scales:
+                    rows.extend(fastest([bench_file(file, check, scale, work_dir) for _ in range(repeat)]))
+                if scale in driver_scales:
+                    rows.append(bench_driver(file, check, scale, os.path.join(work_dir, "results"), runs,
+                                             latency, error_rate, capacity_rpm, backoff_base, seed, max_concurrency))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {"environment": environment(), "settings": settings, "results": rows}
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE) -> List[Dict[str, Any]]:
+    """
+    Compare deux exécutions ligne à ligne (étape, vérification, échelle).
+
+    Returns:
+        Les lignes communes avec "ratio" (durée actuelle / durée de
+        référence) et "regression" (ratio > 1 + tolerance, pour les
+        mesures d'au moins MIN_COMPARED_SECONDS).
+    """
+    def key(row: Dict[str, Any]) -> tuple:
+        return row["stage"], row["check"], row["scale"]
+
+    reference = {key(row): row for row in baseline["results"]}
+    comparisons = []
+    for row in current["results"]:
+        old = reference.get(key(row))
+        if old is None or not old["seconds"]:
+            continue
+        ratio = row["seconds"] / old["seconds"]
+        comparisons.append({"stage": row["stage"], "check": row["check"], "scale": row["scale"],
+                            "seconds": row["seconds"], "baseline_seconds": old["seconds"],
+                            "ratio": ratio, "regression": ratio > 1 + tolerance
+                            and max(row["seconds"], old["seconds"]) >= MIN_COMPARED_SECONDS})
+    return comparisons
+
+
+def print_results(rows: List[Dict[str, Any]]):
+    print(f"{'étape':<18} {'vérification':<20} {'échelle':>7} {'éléments':>9} {'unités':>10} {'durée (s)':>10} {'unités/s':>12}")
+    for row in rows:
+        rate = f"{row['units_per_second']:.0f}" if row["units_per_second"] else "-"
+        print(f"{row['stage']:<18} {row['check']:<20} {row['scale']:>7} {row['items']:>9} {row['units']:>10}"
+              f" {row['seconds']:>10.3f} {rate:>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banc d'essai du pipeline sur des jeux synthétiques (×1 à ×1000).")
+    parser.add_argument("--scales", type=int, nargs="*", default=list(DEFAULT_SCALES), choices=SCALES,
+                        help="Échelles des jeux synthétiques (défaut : 1 10 100)")
+    parser.add_argument("--driver-scales", type=int, nargs="*", default=list(DEFAULT_DRIVER_SCALES), choices=SCALES,
+                        help="Échelles de l'exécution complète du pilote (défaut : 1)")
+    parser.add_argument("--checks", nargs="*", default=list(BASE_ITEMS), choices=list(BASE_ITEMS),
+                        help="Vérifications mesurées (défaut : toutes)")
+    parser.add_argument("--data-dir", default=None,
+                        help="Dossier où garder les jeux synthétiques (défaut : temporaire)")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="Tirages par question (défaut : 6)")
+    parser.add_argument("--response-chars", type=int, default=DEFAULT_RESPONSE_CHARS,
+                        help="Longueur des réponses générées (défaut : 1200)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latence simulée par requête, en secondes")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Proportion d'erreurs 500 injectées")
+    parser.add_argument("--capacity-rpm", type=float, default=None,
+                        help="Capacité simulée du backend en requêtes par minute, 429 au-delà (défaut : illimitée)")
+    parser.add_argument("--backoff-base", type=float, default=0.01,
+                        help="Base des attentes après une erreur, en secondes (défaut : 0.01)")
+    parser.add_argument("--max-concurrency", type=int, default=16, help="Requêtes simultanées du pilote")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Passes des étapes hors pilote, la plus rapide est gardée (défaut : 1)")
+    parser.add_argument("--output", default=None,
+                        help="Fichier JSON des résultats (défaut : results/benchmarks/benchmark_<date>.json)")
+    parser.add_argument("--compare", default=None, help="Fichier JSON d'une exécution de référence")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Ralentissement toléré avant de signaler une régression (défaut : 0.2)")
+    args = parser.parse_args()
+
+    report = run_benchmarks(
+        args.scales, args.driver_scales, args.checks, args.data_dir, args.runs, args.response_chars,
+        args.latency, args.error_rate, args.capacity_rpm, args.backoff_base, args.max_concurrency, args.seed,
+        args.repeat,
+    )
+    print_results(report["results"])
+    output = args.output or os.path.join(
+        BENCHMARKS_DIR, f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    print(f"Résultats écrits dans {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        changed = [name for name in COMPARED_SETTINGS
+                   if report["settings"].get(name) != baseline["settings"].get(name)]
+        if changed:
+            print(f"Avertissement : réglages différents de la référence ({', '.join(changed)})")
+        comparisons = compare(report, baseline, args.tolerance)
+        regressions = [c for c in comparisons if c["regression"]]
+        for c in comparisons:
+            flag = "  RÉGRESSION" if c["regression"] else ""
+            print(f"{c['stage']:<18} {c['check']:<20} ×{c['scale']:<5} {c['baseline_seconds']:.3f} s -> {c['seconds']:.3f} s"
+                  f" (×{c['ratio']:.2f}){flag}")
+        print(f"{len(regressions)} régression(s) sur {len(comparisons)} mesures comparables")
+        sys.exit(1 if regressions else 0)
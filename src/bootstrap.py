@@ -0,0 +1,432 @@
+import argparse
+import glob
+import itertools
+import math
+import os
+import time
+import warnings
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from columnar import STORE_SUFFIX, ColumnarStore
+from consistency_checks import STRONG_THRESHOLD, extract_result, get_check
+from experiment_io import load_results
+from sampling_plan import DEFAULT_CONFIDENCE, DEFAULT_SEED
+
+DEFAULT_RESAMPLES = 10000
+# Jusqu'à 6 tirages par question (6^6 = 46656), l'issue d'un tirage est lue dans une table
+LOOKUP_SIZE = 1 << 16
+# Au-delà de 8 tirages par question, l'énumération de median_outcomes coûte
+# trop cher (0,3 s à 9, 1 s à 10, k^k dépasse int64 à 16) : les médianes
+# sont rééchantillonnées directement
+MAX_EXACT_SAMPLES = 8
+_DIRECTIONS = {1: "increasing", -1: "decreasing", 0: "increasing"}
+
+
+@lru_cache(maxsize=None)
+def median_outcomes(k: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Loi exacte de la médiane de k tirages avec remise parmi k valeurs triées
+    v[0] <= ... <= v[k-1] : la médiane vaut (v[a] + v[b]) / 2, et le couple
+    (a, b) ne dépend que des effectifs tirés, pas des valeurs.
+
+    Limité à k <= MAX_EXACT_SAMPLES (ValueError au-delà) : l'énumération
+    croît comme k^k.
+
+    Returns:
+        (a, b, poids cumulés) : un tirage entier r uniforme dans [0, k^k)
+        donne l'issue np.searchsorted(poids cumulés, r, side="right").
+    """
+    if k > MAX_EXACT_SAMPLES:
+        raise ValueError(f"Loi exacte de la médiane limitée à {MAX_EXACT_SAMPLES} tirages (k = {k})")
+    low, high = (k - 1) // 2, k // 2
+    weights: Dict[Tuple[int, int], int] = {}
+    for multiset in itertools.combinations_with_replacement(range(k), k):
+        counts = np.bincount(multiset, minlength=k)
+        cumulative = np.cumsum(counts)
+        pair = (int(np.searchsorted(cumulative, low, side="right")),
+                int(np.searchsorted(cumulative, high, side="right")))
+        # Nombre de tuples ordonnés correspondant à ces effectifs
+        arrangements = math.factorial(k) // math.prod(math.factorial(c) for c in counts)
+        weights[pair] = weights.get(pair, 0) + arrangements
+    pairs = sorted(weights)
+    return (
+        np.array([a for a, _ in pairs]),
+        np.array([b for _, b in pairs]),
+        np.cumsum([weights[pair] for pair in pairs]),
+    )
+
+
+def item_values(item: Dict[str, Any], kind: str) -> List[List[float]]:
+    """
+    Réponses extraites de chaque question d'un élément, qu'il vienne de
+    data/ (champ "responses") ou d'une sortie de run_checks.
+    """
+    if "extracted_results" in item:
+        return item["extracted_results"]
+    if "responses" in item:
+        return [[a["result"] for a in prompt if a.get("parsed") and a.get("result") is not None]
+                for prompt in item["answers"]]
+    return [[v for v in (extract_result(r, kind) for r in prompt) if v is not None] for prompt in item["answers"]]
+
+
+def load_runs(file: str) -> Dict[str, Any]:
+    """
+    Charge les réponses de tous les tirages d'un fichier de résultats (JSON,
+    JSONL, magasin .cols) ou de data/.
+
+    Returns:
+        "type", "values" (éléments × questions × tirages, NaN hors réponse),
+        "keys" (tuples de questions, pour apparier les configurations) et
+        les champs propres à la vérification (ex. "direction").
+    """
+    if file.rstrip(os.sep).endswith(STORE_SUFFIX):
+        store = ColumnarStore(file)
+        runs = {
+            "type": store.type,
+            "values": np.asarray(store["answers"], dtype=float),
+            "keys": [tuple(store.questions(i)) for i in range(len(store))],
+        }
+        if store.type == "monotonic_sequence":
+            runs["direction"] = np.array([_DIRECTIONS[int(d)] for d in store["direction"]])
+        return runs
+
+    items = [item for item in load_results(file) if not item.get("skipped", False)]
+    if not items:
+        raise ValueError(f"Aucun élément dans {file}")
+    check = get_check(items[0]["type"])
+    extracted = [item_values(item, check.answer_kind) for item in items]
+    n_prompts = max(len(item) for item in extracted)
+    n_samples = max((len(prompt) for item in extracted for prompt in item), default=0)
+    values = np.full((len(items), n_prompts, max(n_samples, 1)), np.nan)
+    for i, item in enumerate(extracted):
+        for j, prompt in enumerate(item):
+            values[i, j, :len(prompt)] = prompt
+    runs = {"type": check.name, "values": values, "keys": [tuple(item["questions"]) for item in items]}
+    for name in check.fields:
+        runs[name] = np.array([item[name] for item in items])
+    return runs
+
+
+def cell_distributions(sorted_values: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Valeurs distinctes de la médiane rééchantillonnée de plusieurs questions
+    (une ligne de k réponses triées par question) et leurs probabilités.
+
+    Returns:
+        (valeurs, probabilités, nombre de valeurs de chaque question), les
+        valeurs des questions se suivant à plat.
+    """
+    a, b, cumulative = median_outcomes(k)
+    medians = (sorted_values[:, a] + sorted_values[:, b]) / 2
+    order = np.argsort(medians, axis=1)
+    medians = np.take_along_axis(medians, order, axis=1)
+    first = np.ones(medians.shape, dtype=bool)
+    first[:, 1:] = medians[:, 1:] != medians[:, :-1]
+    starts = np.flatnonzero(first)
+    probabilities = np.add.reduceat(np.diff(cumulative, prepend=0)[order].ravel(), starts) / cumulative[-1]
+    return medians.ravel()[starts], probabilities, first.sum(axis=1)
+
+
+class ResampledViolations:
+    """
+    Violations rééchantillonnées d'une configuration : les tirages de chaque
+    question sont rééchantillonnés avec remise, indépendamment pour chaque
+    réplique.
+
+    Pour un élément, la loi de la violation rééchantillonnée est calculée
+    exactement en énumérant les médianes possibles de ses questions (cf.
+    median_outcomes) ; chaque réplique tire ensuite une violation dans cette
+    loi. Au-delà de max_outcomes combinaisons (par défaut n_resamples, où
+    l'énumération coûte autant que la simulation), ou si une question a
+    plus de MAX_EXACT_SAMPLES tirages, les médianes sont tirées question
+    par question. Les éléments dont aucune question n'a de tirages
+    différents gardent leur violation observée (la plupart à T = 0).
+    """
+
+    def __init__(
+        self,
+        runs: Dict[str, Any],
+        n_resamples: int,
+        rng: np.random.Generator,
+        threshold: float = STRONG_THRESHOLD,
+        max_outcomes: Optional[int] = None,
+    ):
+        check = get_check(runs["type"])
+        max_outcomes = max_outcomes or n_resamples
+        values = np.sort(runs["values"], axis=2)  # NaN en fin de ligne
+        counts = (~np.isnan(values)).sum(axis=2)
+        fields = {name: runs[name] for name in check.fields}
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            medians = np.nanmedian(values, axis=2)
+        self.n_items, n_prompts = medians.shape
+        self.violation = check.violation(medians, **fields)
+        self.strong = self.violation > threshold
+
+        last = np.take_along_axis(values, np.maximum(counts - 1, 0)[:, :, None], axis=2)[:, :, 0]
+        varying_cells = (counts >= 2) & (values[:, :, 0] != last)
+        varying = np.flatnonzero(varying_cells.any(axis=1))
+
+        # Loi de la médiane de chaque question des éléments qui varient, à
+        # plat (début et nombre de valeurs par question), calculée en un
+        # appel par nombre de tirages ; une question sans tirages différents
+        # garde sa médiane observée
+        cells = varying_cells[varying]
+        too_many = (cells & (counts[varying] > MAX_EXACT_SAMPLES)).any(axis=1)
+        cells &= ~too_many[:, None]
+        cell_medians = [medians[varying].ravel()]
+        cell_probabilities = [np.ones(cells.size)]
+        cell_start = np.arange(cells.size).reshape(cells.shape)
+        cell_size = np.ones(cells.shape, dtype=np.int64)
+        offset = cells.size
+        for k in np.unique(counts[varying][cells]):
+            rows, prompts = np.nonzero(cells & (counts[varying] == k))
+            group_medians, group_probabilities, sizes = cell_distributions(values[varying[rows], prompts, :k], int(k))
+            cell_start[rows, prompts] = offset + np.cumsum(sizes) - sizes
+            cell_size[rows, prompts] = sizes
+            cell_medians.append(group_medians)
+            cell_probabilities.append(group_probabilities)
+            offset += len(group_medians)
+        cell_medians = np.concatenate(cell_medians)
+        cell_probabilities = np.concatenate(cell_probabilities)
+
+        # Éléments énumérés d'abord (colonnes mélangées sur place ci-dessous)
+        is_exact = ~too_many & (np.prod(cell_size, axis=1, dtype=float) <= max_outcomes)
+        exact = np.flatnonzero(is_exact)
+        self.varying = np.concatenate([varying[exact], varying[~is_exact]])
+        self.column = np.full(self.n_items, -1)
+        self.column[self.varying] = np.arange(len(self.varying))
+
+        # Une ligne par élément, transposée à la fin
+        violations = np.empty((len(self.varying), n_resamples))
+        if len(exact):
+            # Combinaisons de médianes de tous les éléments, évaluées en un
+            # seul appel : l'indice d'une combinaison dans son élément est
+            # décomposé question par question
+            n_outcomes = np.prod(cell_size[exact], axis=1)
+            item = np.repeat(np.arange(len(exact)), n_outcomes)
+            remainder = np.arange(len(item)) - np.repeat(np.cumsum(n_outcomes) - n_outcomes, n_outcomes)
+            outcomes = np.empty((len(item), n_prompts))
+            probabilities = np.ones(len(item))
+            for p in reversed(range(n_prompts)):
+                size = cell_size[exact, p][item]
+                index = cell_start[exact, p][item] + remainder % size
+                remainder //= size
+                outcomes[:, p] = cell_medians[index]
+                probabilities *= cell_probabilities[index]
+            joint_fields = {name: field[varying[exact]][item] for name, field in fields.items()}
+            joint_violations = check.violation(outcomes, **joint_fields)
+
+            # Combinaisons de même violation regroupées, puis effectifs des
+            # n_resamples tirages de chaque violation : les lignes sont
+            # mélangées ensuite, ce qui donne des tirages indépendants
+            order = np.lexsort((joint_violations, item))
+            item, joint_violations = item[order], joint_violations[order]
+            first = np.ones(len(item), dtype=bool)
+            first[1:] = (item[1:] != item[:-1]) | (joint_violations[1:] != joint_violations[:-1])
+            starts = np.flatnonzero(first)
+            weights = np.add.reduceat(probabilities[order], starts)
+            boundaries = np.cumsum(np.bincount(item[starts], minlength=len(exact)))[:-1]
+            for column, distinct, item_weights in zip(
+                range(len(exact)), np.split(joint_violations[starts], boundaries), np.split(weights, boundaries)
+            ):
+                violations[column] = np.repeat(distinct, rng.multinomial(n_resamples, item_weights / item_weights.sum()))
+            rng.permuted(violations[:len(exact)], axis=1, out=violations[:len(exact)])
+        if len(exact) < len(self.varying):
+            violations[len(exact):] = self._simulate(
+                values, counts, medians, varying_cells, fields, check, self.varying[len(exact):], n_resamples, rng).T
+        violations = violations.T
+
+        # Écart à la valeur observée, pour les sommes pondérées de means()
+        self.violation_delta = (violations - self.violation[self.varying]).astype(np.float32, order="C")
+        self.strong_delta = ((violations > threshold).astype(np.int8) - self.strong[self.varying]).astype(np.float32, order="C")
+
+    @staticmethod
+    def _simulate(
+        values: np.ndarray,
+        counts: np.ndarray,
+        medians: np.ndarray,
+        varying_cells: np.ndarray,
+        fields: Dict[str, np.ndarray],
+        check: Any,
+        items: np.ndarray,
+        n_resamples: int,
+        rng: np.random.Generator,
+    ) -> np.ndarray:
+        """
+        Violations (répliques × items) avec les médianes tirées question par
+        question.
+        """
+        resampled = np.repeat(medians[None, items], n_resamples, axis=0)
+        rows, prompts = np.nonzero(varying_cells[items])
+        cell_counts = counts[items][rows, prompts]
+        for k in np.unique(cell_counts):
+            in_group = cell_counts == k
+            r, p = rows[in_group], prompts[in_group]
+            if k > MAX_EXACT_SAMPLES:
+                # Loi exacte trop coûteuse : rééchantillonnage des k réponses
+                for row, prompt in zip(r, p):
+                    cell_values = values[items[row], prompt, :k]
+                    resampled[:, row, prompt] = np.median(cell_values[rng.integers(0, k, size=(n_resamples, k))], axis=1)
+                continue
+            a, b, cumulative = median_outcomes(int(k))
+            draws = rng.integers(0, cumulative[-1], size=(n_resamples, len(r)), dtype=np.int32)
+            if cumulative[-1] <= LOOKUP_SIZE:
+                # Table des issues de chacun des k^k tirages : une lecture au lieu d'une recherche
+                outcome = np.repeat(np.arange(len(a), dtype=np.int32), np.diff(cumulative, prepend=0))[draws]
+            else:
+                outcome = np.searchsorted(cumulative, draws, side="right")
+            # Médiane de chaque issue pour chaque question, lue à plat
+            cell_values = values[items[r], p]
+            cell_medians = ((cell_values[:, a] + cell_values[:, b]) / 2).ravel()
+            outcome += np.arange(len(r), dtype=outcome.dtype) * len(a)
+            resampled[:, r, p] = cell_medians[outcome]
+        tiled = {name: np.tile(field[items], n_resamples) for name, field in fields.items()}
+        return check.violation(resampled.reshape(-1, medians.shape[1]), **tiled).reshape(n_resamples, -1)
+
+    def means(self, weights: np.ndarray, items: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Violation moyenne et proportion de violations fortes de chaque
+        réplique, les éléments items (tous par défaut) étant pondérés par
+        weights (répliques × éléments, effectifs du tirage des questions).
+        """
+        if items is None:
+            items = np.arange(self.n_items)
+        n = weights.sum(axis=1)
+        mean = weights @ self.violation[items]
+        strong = weights @ self.strong[items].astype(float)
+        local = np.flatnonzero(self.column[items] >= 0)
+        if len(local):
+            columns = self.column[items[local]]
+            varying_weights = weights[:, local]
+            mean += np.einsum("ij,ij->i", varying_weights, self.violation_delta[:, columns])
+            strong += np.einsum("ij,ij->i", varying_weights, self.strong_delta[:, columns])
+        return mean / n, strong / n
+
+
+def question_weights(n_items: int, n_resamples: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Effectifs de chaque élément dans n_resamples tirages avec remise de
+    n_items éléments (répliques × éléments).
+    """
+    draws = rng.integers(0, n_items, size=(n_resamples, n_items))
+    offsets = np.arange(n_resamples)[:, None] * n_items
+    return np.bincount((draws + offsets).ravel(), minlength=n_resamples * n_items).reshape(n_resamples, n_items).astype(float)
+
+
+def interval(replicates: np.ndarray, estimate: float, confidence: float, lower: float = 0.0) -> List[float]:
+    """
+    Intervalle de confiance percentile corrigé du biais : rééchantillonner
+    les tirages ajoute du bruit aux médianes, ce qui décale vers le haut les
+    violations des répliques (valeurs absolues, écarts maximaux). Les
+    répliques sont recentrées sur l'estimation avant de prendre les
+    percentiles, et les bornes restent dans [lower, 1].
+    """
+    alpha = (1 - confidence) / 2
+    shifted = replicates - (replicates.mean() - estimate)
+    low, high = np.clip(np.quantile(shifted, [alpha, 1 - alpha]), lower, 1.0)
+    return [float(low), float(high)]
+
+
+def bootstrap_files(
+    files: Sequence[str],
+    n_resamples: int = DEFAULT_RESAMPLES,
+    confidence: float = DEFAULT_CONFIDENCE,
+    seed: int = DEFAULT_SEED,
+    threshold: float = STRONG_THRESHOLD,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Intervalles de confiance bootstrap (questions et tirages rééchantillonnés)
+    de la violation moyenne et de la proportion de violations fortes de
+    chaque fichier, et comparaisons appariées entre fichiers d'une même
+    vérification qui partagent des questions (modèles, températures) : les
+    deux configurations sont pondérées par le même tirage des questions
+    communes.
+
+    Returns:
+        {"configs": une ligne par fichier, "comparisons": une ligne par paire}.
+    """
+    rng = np.random.default_rng(seed)
+    runs = {file: load_runs(file) for file in files}
+    resampled = {file: ResampledViolations(r, n_resamples, rng, threshold) for file, r in runs.items()}
+    # Un tirage des questions par effectif, partagé par les configurations et
+    # les comparaisons de même taille : chaque intervalle reste valide seul
+    weights: Dict[int, np.ndarray] = {}
+
+    def weights_for(n_items: int) -> np.ndarray:
+        if n_items not in weights:
+            weights[n_items] = question_weights(n_items, n_resamples, rng)
+        return weights[n_items]
+
+    configs = []
+    for file, r in resampled.items():
+        mean, strong = r.means(weights_for(r.n_items))
+        configs.append({
+            "file": file,
+            "type": runs[file]["type"],
+            "items": r.n_items,
+            "mean_violation": float(r.violation.mean()),
+            "mean_violation_interval": interval(mean, r.violation.mean(), confidence),
+            "strong_proportion": float(r.strong.mean()),
+            "strong_proportion_interval": interval(strong, r.strong.mean(), confidence),
+        })
+
+    comparisons = []
+    for first, second in itertools.combinations(files, 2):
+        if runs[first]["type"] != runs[second]["type"]:
+            continue
+        positions = {key: i for i, key in enumerate(runs[second]["keys"])}
+        pairs = [(i, positions[key]) for i, key in enumerate(runs[first]["keys"]) if key in positions]
+        if len(pairs) < 2:
+            continue
+        items_first, items_second = (np.array(side) for side in zip(*pairs))
+        mean_first, strong_first = resampled[first].means(weights_for(len(pairs)), items_first)
+        mean_second, strong_second = resampled[second].means(weights_for(len(pairs)), items_second)
+        mean_difference = resampled[second].violation[items_second].mean() - resampled[first].violation[items_first].mean()
+        strong_difference = resampled[second].strong[items_second].mean() - resampled[first].strong[items_first].mean()
+        comparisons.append({
+            "first": first,
+            "second": second,
+            "common_items": len(pairs),
+            "mean_violation_difference": float(mean_difference),
+            "mean_violation_difference_interval": interval(mean_second - mean_first, mean_difference, confidence, -1.0),
+            "strong_proportion_difference": float(strong_difference),
+            "strong_proportion_difference_interval": interval(strong_second - strong_first, strong_difference, confidence, -1.0),
+        })
+    return {"configs": configs, "comparisons": comparisons}
+
+
+def _format(value: float, bounds: List[float], scale: float = 1.0) -> str:
+    return f"{scale * value:7.3f} [{scale * bounds[0]:7.3f}, {scale * bounds[1]:7.3f}]"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Intervalles de confiance bootstrap de tous les fichiers de résultats.")
+    parser.add_argument("files", nargs="*",
+                        help="Fichiers de résultats (JSON, JSONL, .cols) ; par défaut tous ceux de data/")
+    parser.add_argument("--resamples", type=int, default=DEFAULT_RESAMPLES)
+    parser.add_argument("--confidence", type=float, default=DEFAULT_CONFIDENCE)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--threshold", type=float, default=STRONG_THRESHOLD, help="Seuil des violations fortes")
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "*.json")))
+    start = time.perf_counter()
+    result = bootstrap_files(files, args.resamples, args.confidence, args.seed, args.threshold)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'fichier':<95} {'n':>4} {'violation moyenne':>33} {'fortes (%)':>33}")
+    for row in result["configs"]:
+        print(f"{os.path.basename(row['file']):<95} {row['items']:>4}"
+              f" {_format(row['mean_violation'], row['mean_violation_interval'])}"
+              f" {_format(row['strong_proportion'], row['strong_proportion_interval'], 100)}")
+    print(f"\nComparaisons appariées (second - premier), IC à {args.confidence:.0%} :")
+    for row in result["comparisons"]:
+        print(f"{os.path.basename(row['first'])}\n  -> {os.path.basename(row['second'])} ({row['common_items']} questions)"
+              f"\n     violation moyenne {_format(row['mean_violation_difference'], row['mean_violation_difference_interval'])}"
+              f"   fortes (%) {_format(row['strong_proportion_difference'], row['strong_proportion_difference_interval'], 100)}")
+    print(f"{len(result['configs'])} fichiers, {len(result['comparisons'])} comparaisons, {args.resamples} répliques"
+          f" : {elapsed:.2f} s")
@@ -0,0 +1,244 @@
+import argparse
+import hashlib
+import json
+import os
+import zlib
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from answer_parser import PROBABILITY
+from consistency_checks import CHECKS, STRONG_THRESHOLD, extract_result
+from question_loader import iter_json_array
+
+FORMAT_VERSION = 1
+STORE_SUFFIX = ".cols"
+
+# Colonnes numériques : nom -> (type NumPy, nombre de dimensions)
+NUMERIC_COLUMNS = {
+    "answers": (np.float64, 3),     # éléments × questions × tirages, NaN si non extraite
+    "parsed": (np.bool_, 3),        # éléments × questions × tirages
+    "median": (np.float64, 2),      # éléments × questions, NaN si aucune réponse
+    "std_devs": (np.float64, 2),    # éléments × questions
+    "violation": (np.float64, 1),   # éléments
+    "strong": (np.bool_, 1),        # éléments
+    "n_questions": (np.int16, 1),   # éléments
+    "direction": (np.int8, 1),      # éléments : +1 croissante, -1 décroissante, 0 sans objet
+    "question_ids": (np.int64, 2),  # éléments × questions -> identifiant de texte, -1 si absent
+    "response_ids": (np.int64, 3),  # éléments × questions × tirages -> identifiant de texte
+}
+
+# Valeur stockée dans data/ pour une médiane ou un écart-type sans réponse extraite
+MISSING_SENTINEL = -10000
+
+
+class TextStore:
+    """
+    Textes (questions, réponses) compressés un par un avec zlib et
+    dédupliqués : un texte identique n'est écrit qu'une fois.
+    """
+
+    def __init__(self, file: str):
+        self.f = open(file, 'wb')
+        self.offsets: List[int] = [0]
+        self.ids: Dict[bytes, int] = {}
+
+    def add(self, text: Optional[str]) -> int:
+        if text is None:
+            return -1
+        encoded = text.encode("utf-8")
+        digest = hashlib.blake2b(encoded, digest_size=16).digest()
+        if digest not in self.ids:
+            blob = zlib.compress(encoded, 6)
+            self.f.write(blob)
+            self.offsets.append(self.offsets[-1] + len(blob))
+            self.ids[digest] = len(self.offsets) - 2
+        return self.ids[digest]
+
+    def close(self) -> np.ndarray:
+        self.f.close()
+        return np.array(self.offsets, dtype=np.int64)
+
+
+def _to_array(rows: List[Any], shape: tuple, fill: Any, dtype: Any) -> np.ndarray:
+    """
+    Tableau de forme shape rempli avec des listes (imbriquées) de longueurs variables.
+    """
+    array = np.full(shape, fill, dtype=dtype)
+    for i, row in enumerate(rows):
+        if len(shape) == 1:
+            array[i] = row
+        elif len(shape) == 2:
+            array[i, :len(row)] = row
+        else:
+            for j, sub in enumerate(row):
+                array[i, j, :len(sub)] = sub
+    return array
+
+
+def convert_file(file: str, out_dir: Optional[str] = None) -> str:
+    """
+    Convertit un fichier JSON (jeu de données de data/ ou sortie
+    results/*/output_*.json) en magasin colonnaire.
+
+    Args:
+        file: Le fichier JSON à convertir.
+        out_dir: Dossier du magasin ; par défaut <file sans .json>.cols.
+
+    Returns:
+        Le chemin du magasin créé.
+    """
+    if out_dir is None:
+        out_dir = os.path.splitext(file)[0] + STORE_SUFFIX
+    os.makedirs(out_dir, exist_ok=True)
+    texts = TextStore(os.path.join(out_dir, "texts.bin"))
+
+    answers, parsed, medians, std_devs = [], [], [], []
+    violations, strong, directions = [], [], []
+    question_ids, response_ids = [], []
+    check_type = None
+    for _, item in iter_json_array(file):
+        check_type = check_type or item.get("type")
+        if item.get("skipped", False):
+            continue
+        questions = item["questions"]
+        if "responses" in item:
+            # Jeu de données de data/ : réponses brutes dans "responses",
+            # réponses extraites dans "answers"
+            raw = item["responses"]
+            values = [[a["result"] if a.get("parsed") else None for a in prompt] for prompt in item["answers"]]
+        else:
+            # Sortie de run_checks : réponses brutes dans "answers"
+            raw = item["answers"]
+            kind = CHECKS[check_type].answer_kind if check_type in CHECKS else PROBABILITY
+            values = [[extract_result(r, kind) for r in prompt] for prompt in raw]
+        question_ids.append([texts.add(q) for q in questions])
+        response_ids.append([[texts.add(r) for r in prompt] for prompt in raw])
+        answers.append([[np.nan if v is None else v for v in prompt] for prompt in values])
+        parsed.append([[v is not None for v in prompt] for prompt in values])
+        medians.append([np.nan if m is None or m == MISSING_SENTINEL else m for m in item.get("median", [])])
+        std_devs.append([np.nan if s is None or s == MISSING_SENTINEL else s for s in item.get("std_devs", [])])
+        violation = item.get("violation", item.get("violation_metric"))
+        violations.append(np.nan if violation is None else violation)
+        strong.append(item.get("strong", violation is not None and violation > STRONG_THRESHOLD))
+        directions.append({"increasing": 1, "decreasing": -1}.get(item.get("direction"), 0))
+    offsets = texts.close()
+
+    n_items = len(question_ids)
+    n_prompts = max((len(q) for q in question_ids), default=0)
+    n_samples = max((len(p) for item in response_ids for p in item), default=0)
+    columns = {
+        "answers": answers,
+        "parsed": parsed,
+        "median": medians,
+        "std_devs": std_devs,
+        "violation": violations,
+        "strong": strong,
+        "n_questions": [len(q) for q in question_ids],
+        "direction": directions,
+        "question_ids": question_ids,
+        "response_ids": response_ids,
+    }
+    fills = {np.float64: np.nan, np.bool_: False}
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "source": os.path.abspath(file),
+        "type": check_type,
+        "n_items": n_items,
+        "n_prompts": n_prompts,
+        "n_samples": n_samples,
+        "n_texts": len(offsets) - 1,
+        "columns": {},
+    }
+    shapes = {1: (n_items,), 2: (n_items, n_prompts), 3: (n_items, n_prompts, n_samples)}
+    for name, (dtype, ndim) in NUMERIC_COLUMNS.items():
+        array = _to_array(columns[name], shapes[ndim], fills.get(dtype, -1), dtype)
+        np.save(os.path.join(out_dir, f"{name}.npy"), array)
+        meta["columns"][name] = {"dtype": array.dtype.str, "shape": list(array.shape)}
+    np.save(os.path.join(out_dir, "text_offsets.npy"), offsets)
+    with open(os.path.join(out_dir, "meta.json"), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=4)
+    return out_dir
+
+
+class ColumnarStore:
+    """
+    Lecture d'un magasin colonnaire : l'ouverture ne lit que meta.json, les
+    colonnes numériques sont projetées en mémoire (np.load(mmap_mode="r"))
+    à la première utilisation et les textes ne sont décompressés qu'à la
+    demande.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Version de format non prise en charge dans '{path}' : {self.meta.get('format_version')}")
+        self._columns: Dict[str, np.ndarray] = {}
+        self._texts = None
+        self._offsets = None
+
+    def __len__(self) -> int:
+        return self.meta["n_items"]
+
+    @property
+    def type(self) -> Optional[str]:
+        return self.meta.get("type")
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in self._columns:
+            self._columns[name] = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+        return self._columns[name]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.column(name)
+
+    def text(self, text_id: int) -> Optional[str]:
+        if text_id < 0:
+            return None
+        if self._texts is None:
+            self._offsets = np.load(os.path.join(self.path, "text_offsets.npy"), mmap_mode="r")
+            self._texts = np.memmap(os.path.join(self.path, "texts.bin"), dtype=np.uint8, mode="r") \
+                if os.path.getsize(os.path.join(self.path, "texts.bin")) > 0 else np.zeros(0, dtype=np.uint8)
+        start, end = int(self._offsets[text_id]), int(self._offsets[text_id + 1])
+        return zlib.decompress(self._texts[start:end].tobytes()).decode("utf-8")
+
+    def questions(self, item: int) -> List[str]:
+        ids = self.column("question_ids")[item]
+        return [self.text(int(i)) for i in ids if i >= 0]
+
+    def responses(self, item: int) -> List[List[str]]:
+        ids = self.column("response_ids")[item][: self.column("n_questions")[item]]
+        return [[self.text(int(i)) for i in prompt if i >= 0] for prompt in ids]
+
+
+def columnar_path(file: str) -> str:
+    """
+    Chemin du magasin colonnaire associé à un fichier JSON.
+    """
+    return os.path.splitext(file)[0] + STORE_SUFFIX
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Conversion des fichiers JSON en magasins colonnaires.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    convert_parser = subparsers.add_parser("convert", help="Convertit des fichiers JSON")
+    convert_parser.add_argument("files", nargs="+")
+    convert_parser.add_argument("--out-dir", help="Dossier de sortie (un seul fichier d'entrée)")
+    info_parser = subparsers.add_parser("info", help="Résume un magasin")
+    info_parser.add_argument("stores", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        if args.out_dir and len(args.files) > 1:
+            parser.error("--out-dir ne s'utilise qu'avec un seul fichier")
+        for file in args.files:
+            store_dir = convert_file(file, args.out_dir)
+            size = sum(os.path.getsize(os.path.join(store_dir, f)) for f in os.listdir(store_dir))
+            print(f"{file} -> {store_dir} ({os.path.getsize(file) / 1e6:.2f} Mo -> {size / 1e6:.2f} Mo)")
+    else:
+        for path in args.stores:
+            store = ColumnarStore(path)
+            print(f"{path} : {store.type}, {len(store)} éléments, {store.meta['n_texts']} textes uniques,"
+                  f" violation moyenne {np.nanmean(store['violation']):.4f}")
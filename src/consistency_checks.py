@@ -0,0 +1,206 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from answer_parser import PROBABILITY, QUANTITY, get_parser
+
+# Seuil au-delà duquel une violation est dite « forte » (cf. README.md)
+STRONG_THRESHOLD = 0.2
+
+# Prompt pour les vérifications de négation, de paraphrase et de la règle de Bayes
+PROBABILITY_SYSTEM_PROMPT = (
+   "The user needs help on a few prediction market questions. You should always output a single best"
+   "probability estimate, without any intervals. It is important that you do not output the probability outright."
+   "Rather, you should consider multiple views, along with the intermediate estimates; and only then"
+   "produce the final numerical answer in the last line, like this: [Answer] 0.5"
+)
+
+# Prompt pour les suites monotones, dont les réponses sont des quantités
+QUANTITY_SYSTEM_PROMPT = (
+   "The user needs help on a few prediction questions. You should always output a single best"
+   "numerical estimate, without any intervals. It is important that you do not output the number outright."
+   "Rather, you should consider multiple views, along with the intermediate estimates; and only then"
+   "produce the final numerical answer in the last line, like this: [Answer] 50"
+)
+
+
+class ConsistencyCheck:
+    """
+    Un type de vérification de cohérence.
+
+    Args:
+        name: Valeur du champ "type" des fichiers de data/.
+        arity: Nombre de questions par élément (None : au moins deux, variable).
+        violation: Fonction vectorisée (medians, **fields) -> violations, où
+                   medians est un tableau (éléments × questions) contenant NaN
+                   pour les questions sans réponse extraite.
+        fields: Champs supplémentaires des éléments passés à violation
+                (ex. "direction" pour les suites monotones).
+        system_prompt: Prompt système envoyé avec chaque question.
+        results_subdir: Sous-dossier de results/ où écrire les sorties.
+        answer_kind: Type des réponses attendues (PROBABILITY : dans [0, 1],
+                     ou QUANTITY), qui fixe leur extraction.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        arity: Optional[int],
+        violation: Callable[..., np.ndarray],
+        fields: Sequence[str] = (),
+        system_prompt: str = PROBABILITY_SYSTEM_PROMPT,
+        results_subdir: Optional[str] = None,
+        answer_kind: str = PROBABILITY,
+    ):
+        self.name = name
+        self.arity = arity
+        self.violation = violation
+        self.fields = tuple(fields)
+        self.system_prompt = system_prompt
+        self.results_subdir = results_subdir or name
+        self.answer_kind = answer_kind
+
+    def accepts(self, questions: Sequence[str]) -> bool:
+        if self.arity is None:
+            return len(questions) >= 2
+        return len(questions) >= self.arity
+
+    def compute(self, medians: np.ndarray, items: Sequence[Dict[str, Any]] = ()) -> np.ndarray:
+        """
+        Calcule les violations d'un lot d'éléments en un seul appel.
+        """
+        fields = {name: np.array([item[name] for item in items]) for name in self.fields}
+        return self.violation(np.asarray(medians, dtype=float), **fields)
+
+
+CHECKS: Dict[str, ConsistencyCheck] = {}
+
+
+def register_check(
+    name: str,
+    arity: Optional[int],
+    fields: Sequence[str] = (),
+    system_prompt: str = PROBABILITY_SYSTEM_PROMPT,
+    results_subdir: Optional[str] = None,
+    answer_kind: str = PROBABILITY,
+):
+    """
+    Décorateur enregistrant une fonction de violation vectorisée dans CHECKS.
+    """
+    def decorator(violation: Callable[..., np.ndarray]) -> Callable[..., np.ndarray]:
+        CHECKS[name] = ConsistencyCheck(name, arity, violation, fields, system_prompt, results_subdir, answer_kind)
+        return violation
+    return decorator
+
+
+def get_check(name: str) -> ConsistencyCheck:
+    try:
+        return CHECKS[name]
+    except KeyError:
+        raise ValueError(f"Type de vérification inconnu : {name} (disponibles : {', '.join(sorted(CHECKS))})")
+
+
+@register_check("negated_pair", arity=2, results_subdir="negated_pairs")
+def negation_violation(medians: np.ndarray) -> np.ndarray:
+    """
+    P(A) + P(non A) = 1 ; une médiane manquante vaut 0.5.
+    """
+    m = np.where(np.isnan(medians), 0.5, medians)
+    return np.abs(m[:, 0] - 1 + m[:, 1])
+
+
+@register_check("bayes", arity=4, results_subdir="bayes")
+def bayes_violation(medians: np.ndarray) -> np.ndarray:
+    """
+    Questions (A, B, B|A, A|B) : P(A)P(B|A) = P(B)P(A|B) ; une médiane manquante vaut 0.5.
+    """
+    m = np.where(np.isnan(medians), 0.5, medians)
+    return np.sqrt(np.abs(m[:, 0] * m[:, 2] - m[:, 1] * m[:, 3]))
+
+
+@register_check("paraphrase", arity=None, results_subdir="paraphrases")
+def paraphrase_violation(medians: np.ndarray) -> np.ndarray:
+    """
+    Écart maximal entre les médianes des paraphrases ; les médianes
+    manquantes sont ignorées.
+    """
+    valid = ~np.isnan(medians)
+    high = np.where(valid, medians, -np.inf).max(axis=1)
+    low = np.where(valid, medians, np.inf).min(axis=1)
+    return np.where(valid.sum(axis=1) >= 2, high - low, 0.0)
+
+
+def _average_ranks(values: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """
+    Rangs (à partir de 1, ex aequo moyennés) de chaque ligne, calculés
+    uniquement parmi les valeurs valides.
+    """
+    v = np.where(valid, values, np.inf)
+    # 2 * rang = 2 * (valeurs inférieures) + (valeurs égales, elle comprise) + 1,
+    # compté colonne par colonne ; une valeur manquante (inf) n'est
+    # inférieure ou égale à aucune valeur valide
+    twice = np.ones(v.shape, dtype=np.int16)
+    for j in range(v.shape[1]):
+        column = v[:, j:j + 1]
+        twice += column < v
+        twice += column <= v
+    return twice / 2
+
+
+@register_check(
+    "monotonic_sequence",
+    arity=None,
+    fields=("direction",),
+    system_prompt=QUANTITY_SYSTEM_PROMPT,
+    results_subdir="monotonic",
+    answer_kind=QUANTITY,
+)
+def monotonic_violation(medians: np.ndarray, direction: np.ndarray) -> np.ndarray:
+    """
+    (1 - ρ) / 2 pour une suite croissante, (1 + ρ) / 2 pour une suite
+    décroissante, où ρ est la corrélation de Spearman entre les médianes
+    et leur position ; les médianes manquantes sont ignorées.
+    """
+    valid = ~np.isnan(medians)
+    count = valid.sum(axis=1)
+    # Positions et rangs (1 à count, ex aequo moyennés) ont la même moyenne
+    # (count + 1) / 2, et les positions centrées ont pour somme des carrés
+    # (count^3 - count) / 12
+    center = (count[:, None] + 1) / 2
+    x = np.where(valid, np.cumsum(valid, axis=1) - center, 0.0)
+    y = np.where(valid, _average_ranks(medians, valid) - center, 0.0)
+    denominator = np.sqrt((count ** 3 - count) / 12 * np.einsum("ij,ij->i", y, y))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rho = np.where(denominator > 0, np.einsum("ij,ij->i", x, y) / denominator, 0.0)
+
+    sign = np.where(np.asarray(direction) == "decreasing", 1.0, -1.0)
+    violation = (1 + sign * rho) / 2
+    return np.where(count >= 2, violation, 0.0)
+
+
+def extract_result(answer: str, kind: str = PROBABILITY) -> Optional[float]:
+    """
+    Extrait le nombre (float ou int) qui suit la balise "[Answer]"
+    dans une chaîne de caractères (cf. answer_parser.AnswerParser).
+
+    Args:
+        answer: La chaîne de caractères d'entrée contenant la réponse
+                et la balise [Answer].
+        kind: Type de réponse attendu (PROBABILITY ou QUANTITY).
+
+    Returns:
+        Le nombre extrait sous forme de float, ou None si la balise
+        n'est pas trouvée, si le nombre n'est pas valide ou s'il sort
+        des bornes du type de réponse.
+    """
+    return get_parser(kind).parse(answer).value
+
+
+def summarize_answers(extracted: List[List[float]]) -> Dict[str, List[Optional[float]]]:
+    """
+    Médiane et écart-type (population) des réponses extraites de chaque
+    question ; None pour une question sans aucune réponse extraite.
+    """
+    medians = [float(np.median(values)) if values else None for values in extracted]
+    std_devs = [float(np.std(values)) if values else None for values in extracted]
+    return {"median": medians, "std_devs": std_devs}
@@ -0,0 +1,98 @@
+import json
+import os
+from typing import Any, Dict, Iterable, List, Sequence, Set, Tuple
+
+
+def save_question_set(file: str, questions: Sequence[Any]):
+    """
+    Enregistre l'échantillon de questions avant de lancer les requêtes,
+    pour qu'une reprise (--resume) porte exactement sur le même échantillon.
+
+    Les éléments sont des tuples de questions, ou des dictionnaires
+    (questions et champs propres à la vérification, ex. "direction").
+    """
+    tmp_file = file + ".tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump([q if isinstance(q, dict) else list(q) for q in questions], f, indent=4, ensure_ascii=False)
+    os.replace(tmp_file, file)
+
+
+def load_question_set(file: str) -> List[Any]:
+    with open(file, 'r', encoding='utf-8') as f:
+        return [q if isinstance(q, dict) else tuple(q) for q in json.load(f)]
+
+
+def _truncate_partial_line(file: str, block_size: int = 1 << 16):
+    # Supprime une dernière ligne incomplète (crash en cours d'écriture),
+    # sans quoi l'ajout suivant s'y collerait et serait perdu à la lecture
+    if not os.path.exists(file):
+        return
+    with open(file, 'rb+') as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - block_size)
+            f.seek(start)
+            newline = f.read(position - start).rfind(b"\n")
+            if newline >= 0:
+                position = start + newline + 1
+                break
+            position = start
+        if position < end:
+            f.truncate(position)
+
+
+def append_results(file: str, entries: Iterable[Dict[str, Any]]):
+    """
+    Ajoute des résultats au fichier JSONL (un objet par ligne) et force
+    l'écriture sur disque : un crash ne perd que le lot en cours. Une
+    dernière ligne incomplète laissée par un crash est d'abord supprimée
+    (sa question est reprise avec --resume).
+    """
+    _truncate_partial_line(file)
+    with open(file, 'a', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def load_results(file: str) -> List[Dict[str, Any]]:
+    """
+    Lit un fichier de résultats, au format JSON (liste) ou JSONL.
+
+    Un fichier JSONL peut être lu pendant qu'une expérience est en cours :
+    une dernière ligne incomplète est ignorée.
+    """
+    if not file.endswith(".jsonl"):
+        with open(file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    results = []
+    with open(file, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                results.append(json.loads(line))
+            except json.JSONDecodeError:
+                print(f"Avertissement : ligne {line_number} incomplète ignorée dans '{file}'.")
+    return results
+
+
+def completed_questions(file: str) -> Set[Tuple[str, ...]]:
+    """
+    Renvoie les tuples de questions déjà traités dans un fichier JSONL.
+    """
+    if not os.path.exists(file):
+        return set()
+    return {tuple(entry["questions"]) for entry in load_results(file)}
+
+
+def finished_results(file: str) -> List[Dict[str, Any]]:
+    """
+    Résultats exploitables d'un fichier JSONL : les entrées marquées
+    "skipped" (aucune réponse extraite) sont écartées.
+    """
+    return [entry for entry in load_results(file) if not entry.get("skipped", False)]
@@ -0,0 +1,182 @@
+import argparse
+import itertools
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+import metrics
+from consistency_checks import get_check
+from response_cache import cache_key
+from run_checks import add_run_arguments, detect_check, load_items, plan_sample, run_configs
+from token_budget import DEFAULT_MAX_TOKENS
+
+
+def _runs_for(runs: Any, temperature: float) -> List[int]:
+    # "runs" : un entier, une liste, ou un dictionnaire température -> entier(s)
+    if isinstance(runs, dict):
+        runs = runs.get(str(temperature), runs.get(f"{temperature:g}"))
+        if runs is None:
+            raise ValueError(f"Aucun nombre de tirages pour la température {temperature}")
+    return list(runs) if isinstance(runs, list) else [runs]
+
+
+def expand_matrix(matrix: Dict[str, Any], base_dir: str = ".") -> List[Dict[str, Any]]:
+    """
+    Développe une matrice d'expériences (jeux de données × modèles ×
+    températures × tirages) en configurations au format de configs/*.json.
+
+    Args:
+        matrix: {"datasets": [{"name", "type", "file", ...}],
+                 "models": ["gpt-4", {"model": ..., "label": ..., "backend": ...}],
+                 "temperatures": [0.0, 0.5],
+                 "runs": 3, [3, 6] ou {"0.0": 3, "0.5": 6},
+                 "defaults": {champs communs, ex. max_tokens, seed}}.
+        base_dir: Dossier de référence des chemins "file".
+
+    Returns:
+        Les configurations, nommées <jeu>_<modèle>_T-<température>
+        (suivi de _x<tirages> si plusieurs nombres de tirages sont donnés).
+    """
+    configs = []
+    defaults = matrix.get("defaults", {})
+    for dataset, model, temperature in itertools.product(
+        matrix["datasets"], matrix["models"], matrix["temperatures"]
+    ):
+        model = {"model": model} if isinstance(model, str) else model
+        all_runs = _runs_for(dataset.get("runs", matrix["runs"]), temperature)
+        for run in all_runs:
+            label = model.get("label", model["model"])
+            name = f"{dataset.get('name', dataset['type'])}_{label}_T-{temperature}"
+            if len(all_runs) > 1:
+                name += f"_x{run}"
+            config = {**defaults, **{k: v for k, v in dataset.items() if k not in ("name", "runs")}}
+            config.update({k: v for k, v in model.items() if k != "label"})
+            config.update({"temperature": temperature, "run": run, "name": name})
+            config["file"] = os.path.normpath(os.path.join(base_dir, dataset["file"]))
+            configs.append(config)
+    return configs
+
+
+def is_matrix(file: str) -> bool:
+    with open(file, 'r', encoding='utf-8') as f:
+        return isinstance(json.load(f), dict)
+
+
+def load_matrix(file: str) -> List[Dict[str, Any]]:
+    """
+    Lit une matrice d'expériences ; les chemins "file" sont relatifs au fichier.
+    """
+    with open(file, 'r', encoding='utf-8') as f:
+        matrix = json.load(f)
+    return expand_matrix(matrix, os.path.dirname(os.path.abspath(file)))
+
+
+def plan_requests(configs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Plan global des requêtes de toutes les configurations : une tâche par
+    (modèle, prompt système, prompt, température, max_tokens, tirage),
+    identifiée par sa clé de cache. En mode séquentiel ou adaptatif, c'est
+    un majorant.
+
+    Returns:
+        Le nombre de tâches par configuration, le total, le nombre de tâches
+        distinctes, et celles de chaque configuration déjà présentes dans
+        une configuration précédente.
+    """
+    seen = set()
+    per_config = []
+    for config in configs:
+        check = get_check(config["type"]) if "type" in config else detect_check(config["file"])
+        system_prompt = config.get("system_prompt", check.system_prompt)
+        max_tokens = config.get("max_tokens", DEFAULT_MAX_TOKENS)
+        keys = [
+            cache_key(config["model"], system_prompt, prompt, config["temperature"], max_tokens, k)
+            for item in plan_sample(config, load_items(config["file"], check))
+            for prompt in item["questions"]
+            for k in range(config["run"])
+        ]
+        duplicates = sum(1 for key in keys if key in seen or seen.add(key))
+        per_config.append({"name": config["name"], "jobs": len(keys), "duplicates": duplicates})
+    total = sum(entry["jobs"] for entry in per_config)
+    return {"configs": per_config, "jobs": total, "unique_jobs": len(seen)}
+
+
+def savings_report(plan: Dict[str, Any], wall_seconds: float) -> Dict[str, Any]:
+    """
+    Appels et temps économisés, d'après les mesures de metrics.registry,
+    par origine : réponses servies par la déduplication ou le cache,
+    tirages regroupés par le paramètre n, tirages jamais demandés (mode
+    adaptatif ou séquentiel) ; et durée de l'exécution comparée à la somme
+    des durées des configurations (leur exécution l'une après l'autre).
+    """
+    summary = metrics.registry.summary()
+    series = summary["series"]
+    requests = sum(s.get("requests", 0) for s in series)
+    latency = sum(s.get("requests", 0) * s.get("latency_mean_seconds", 0.0) for s in series)
+    completions = sum(s.get("completions", 0) for s in series)
+    dedup_hits = sum(s.get("dedup_hits", 0) for s in series)
+    cache_hits = sum(s.get("cache_hits", 0) for s in series)
+    sequential_seconds = sum(
+        stage["total_seconds"] for name, stage in summary["stages"].items() if name.endswith(":config")
+    )
+    return {
+        "planned_jobs": plan["jobs"],
+        "unique_jobs": plan["unique_jobs"],
+        "api_calls": requests,
+        "dedup_hits": dedup_hits,
+        "cache_hits": cache_hits,
+        "calls_saved": plan["jobs"] - requests,
+        # Économies par origine (leur somme est calls_saved, aux relances près)
+        "dedup_saved": dedup_hits,
+        "cache_saved": cache_hits,
+        "n_parameter_saved": max(0.0, completions - requests),
+        "not_sampled": max(0.0, plan["jobs"] - completions - dedup_hits - cache_hits),
+        # Temps de requête évité : réponses dédupliquées × latence moyenne
+        "request_seconds_saved": dedup_hits * (latency / requests) if requests else 0.0,
+        "sequential_seconds": sequential_seconds,
+        "wall_seconds": wall_seconds,
+        "wall_seconds_saved": max(0.0, sequential_seconds - wall_seconds),
+    }
+
+
+def print_plan(plan: Dict[str, Any]):
+    for entry in plan["configs"]:
+        print(f"{entry['name']:<32} {entry['jobs']:>7} tâches, {entry['duplicates']:>6} déjà planifiées")
+    saved = plan["jobs"] - plan["unique_jobs"]
+    print(f"Plan : {plan['jobs']} tâches, {plan['unique_jobs']} distinctes"
+          f" ({saved} doublons, {saved / max(plan['jobs'], 1):.1%})")
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"Appels : {report['api_calls']:.0f} envoyés pour {report['planned_jobs']} tâches planifiées"
+          f" ({report['calls_saved']:.0f} économisés)")
+    print(f"  déduplication {report['dedup_saved']:.0f}, cache {report['cache_saved']:.0f},"
+          f" paramètre n {report['n_parameter_saved']:.0f}, tirages non demandés {report['not_sampled']:.0f}")
+    print(f"Temps : {report['wall_seconds']:.1f} s, contre {report['sequential_seconds']:.1f} s pour les"
+          f" configurations l'une après l'autre ({report['wall_seconds_saved']:.1f} s économisées) ;"
+          f" ≈ {report['request_seconds_saved']:.1f} s de requêtes évitées par la déduplication")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exécute une matrice d'expériences"
+                                                 " (jeux de données × modèles × températures × tirages).")
+    parser.add_argument("matrix", help="Fichier JSON de la matrice (ex. configs/matrix.json)")
+    parser.add_argument("--plan-only", action="store_true",
+                        help="Affiche le plan des requêtes et les doublons sans rien envoyer")
+    add_run_arguments(parser)
+    parser.set_defaults(dedup=True, parallel_configs=4)
+    parser.add_argument("--no-dedup", dest="dedup", action="store_false",
+                        help="Envoie aussi les requêtes identiques à une requête déjà envoyée")
+    args = parser.parse_args()
+
+    configs = load_matrix(args.matrix)
+    plan = plan_requests(configs)
+    print_plan(plan)
+    if not args.plan_only:
+        start = time.perf_counter()
+        run_configs(configs, args)
+        report = savings_report(plan, time.perf_counter() - start)
+        print_report(report)
+        with open(os.path.join(args.results_dir, "matrix_report.json"), 'w', encoding='utf-8') as f:
+            json.dump({"plan": plan, "savings": report}, f, indent=4)
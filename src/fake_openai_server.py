@@ -0,0 +1,183 @@
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+# Une réponse scriptée : code HTTP et Retry-After éventuel (secondes)
+ScriptedStatus = Tuple[int, Optional[float]]
+
+
+def fake_answer(prompt: str, temperature: float, choice: int = 0) -> str:
+    """
+    Réponse déterministe au format attendu par extract_result :
+    la probabilité dépend uniquement du prompt et de la température (et,
+    pour T > 0, de l'indice du choix quand plusieurs sont demandés avec n).
+    """
+    seed = f"{temperature}|{prompt}" if choice == 0 or temperature == 0 else f"{temperature}|{prompt}|{choice}"
+    digest = hashlib.sha256(seed.encode("utf-8")).digest()
+    probability = round(digest[0] / 255, 2)
+    return f"Some reasoning about the question.\n[Answer] {probability}"
+
+
+def parse_script(text: str) -> List[ScriptedStatus]:
+    """
+    Lit une suite scriptée de réponses, ex. "429:2,500,500,200" : une 429
+    avec Retry-After de 2 secondes, deux erreurs 500, puis un succès.
+    """
+    script = []
+    for step in text.split(","):
+        status, _, retry_after = step.strip().partition(":")
+        script.append((int(status), float(retry_after) if retry_after else None))
+    return script
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """
+    Sert POST /chat/completions (et /v1/chat/completions) comme une API
+    compatible OpenAI, sans réseau ni clé.
+    """
+
+    latency: float = 0.0
+    # Connexions persistantes (keep-alive), comme une vraie API
+    protocol_version = "HTTP/1.1"
+    # Codes renvoyés aux requêtes successives avant de répondre normalement
+    script: List[ScriptedStatus] = []
+    script_lock = threading.Lock()
+
+    def log_message(self, format: str, *args: Any):
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any], retry_after: Optional[float] = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        if retry_after is not None:
+            self.send_header("Retry-After", f"{retry_after:g}")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.latency > 0:
+            time.sleep(self.latency)
+        with self.script_lock:
+            status, retry_after = self.script.pop(0) if self.script else (200, None)
+        if status != 200:
+            self._send_json(status, {"error": {"message": f"Scripted error {status}", "type": "scripted"}}, retry_after)
+            return
+
+        prompt = request["messages"][-1]["content"]
+        temperature = request.get("temperature", 0.0)
+        contents = [fake_answer(prompt, temperature, choice) for choice in range(request.get("n") or 1)]
+        prompt_tokens = sum(len(m["content"].split()) for m in request["messages"])
+        completion_tokens = sum(len(content.split()) for content in contents)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        if request.get("stream"):
+            include_usage = (request.get("stream_options") or {}).get("include_usage", False)
+            self._send_stream(request, contents, usage if include_usage else None)
+            return
+        self._send_json(200, {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [
+                {"index": i, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+                for i, content in enumerate(contents)
+            ],
+            # Comptage approximatif (mots), suffisant pour tester la comptabilité des tokens
+            "usage": usage,
+        })
+
+    def _send_stream(self, request: Dict[str, Any], contents: List[str], usage: Optional[Dict[str, int]]):
+        """
+        Réponse en flux (server-sent events) : un fragment par mot, les
+        choix entrelacés, puis l'usage si demandé. Le client peut fermer la
+        connexion avant la fin.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def chunk(choices: List[Dict[str, Any]], chunk_usage: Optional[Dict[str, int]] = None) -> bytes:
+            payload = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                       "model": request.get("model", "fake"), "choices": choices, "usage": chunk_usage}
+            return f"data: {json.dumps(payload)}\n\n".encode("utf-8")
+
+        fragments = [re.findall(r"\S+\s*|\s+", content) for content in contents]
+        try:
+            for step in range(max(len(f) for f in fragments)):
+                for index, content_fragments in enumerate(fragments):
+                    if step < len(content_fragments):
+                        self.wfile.write(chunk([{"index": index, "delta": {"content": content_fragments[step]},
+                                                 "finish_reason": None}]))
+                self.wfile.flush()
+            self.wfile.write(chunk([{"index": i, "delta": {}, "finish_reason": "stop"} for i in range(len(contents))]))
+            if usage is not None:
+                self.wfile.write(chunk([], usage))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def start_fake_server(
+    port: int = 0,
+    latency: float = 0.0,
+    script: Optional[List[ScriptedStatus]] = None,
+) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Démarre le faux serveur dans un thread.
+
+    Args:
+        port: Port d'écoute (0 pour un port libre choisi par le système).
+        latency: Délai simulé par requête, en secondes.
+        script: Réponses des premières requêtes (cf. parse_script), pour
+                tester les relances et la régulation du débit.
+
+    Returns:
+        Le serveur (à arrêter avec shutdown()) et son base_url, à passer
+        à gpt_interface.configure_clients.
+    """
+    handler = type("ConfiguredFakeOpenAIHandler", (FakeOpenAIHandler,), {
+        "latency": latency,
+        "script": list(script or []),
+        "script_lock": threading.Lock(),
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Faux serveur compatible OpenAI pour les tests locaux.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--script", type=parse_script, default=None,
+                        help='Réponses des premières requêtes, ex. "429:2,500,500" (code[:Retry-After])')
+    args = parser.parse_args()
+
+    server, base_url = start_fake_server(args.port, args.latency, args.script)
+    print(f"Serveur factice à l'écoute sur {base_url} (OPENAI_BASE_URL={base_url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
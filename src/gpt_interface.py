@@ -1,16 +1,391 @@
+import asyncio
+import gc
+import json
 import logging
 import os
+import threading
 import time
-from typing import Any, Optional
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 from dotenv import load_dotenv
-import tiktoken
-from openai import OpenAI, APIError, RateLimitError  # Imports spécifiques
+from openai import APIConnectionError, APIError, APIStatusError, RateLimitError  # Imports spécifiques
+import metrics
+from answer_parser import StreamingAnswer
+from backends import Backend, Completion, OpenAICompatibleBackend, create_backend
+from question_index import QuestionIndex
+from rate_limiter import RateController, retry_after_seconds
+from response_cache import ResponseCache, cache_key
+from token_budget import TokenBudget, count_message_tokens, count_tokens
 
 load_dotenv()
-client = OpenAI(
-  base_url="https://openrouter.ai/api/v1",
-  api_key=os.getenv("OPENAI_API_KEY"),
-)
+# Nombre maximal de requêtes envoyées simultanément par gpt_query_many
+DEFAULT_MAX_CONCURRENCY = 16
+# Attente cumulée maximale (secondes) des relances d'une requête
+MAX_RETRY_WAIT = 300
+
+# Backend par défaut (API compatible OpenAI de $OPENAI_BASE_URL), créé au
+# premier appel : importer le module n'ouvre aucune connexion
+_default_backend: Optional[Backend] = None
+
+
+def configure_clients(base_url: Optional[str] = None, api_key: Optional[str] = None, **options: Any):
+    """
+    Reconfigure le backend par défaut, par exemple pour pointer vers un
+    serveur local compatible OpenAI (cf. fake_openai_server.py). Les autres
+    options (délais, taille du pool...) sont celles d'OpenAICompatibleBackend.
+    """
+    global _default_backend
+    if _default_backend is not None:
+        _default_backend.close()
+    _default_backend = OpenAICompatibleBackend(base_url=base_url, api_key=api_key, **options)
+
+
+def default_backend() -> Backend:
+    global _default_backend
+    if _default_backend is None:
+        _default_backend = OpenAICompatibleBackend()
+    return _default_backend
+
+
+# Cache persistant des réponses, activé par configure_cache ou GPT_CACHE_PATH
+response_cache: Optional[ResponseCache] = None
+
+
+def configure_cache(
+    path: Optional[str],
+    mode: str = "readwrite",
+    max_bytes: Optional[int] = None,
+) -> Optional[ResponseCache]:
+    """
+    Active (ou désactive si path est None) le cache SQLite placé devant
+    les appels aux backends.
+    """
+    global response_cache
+    if response_cache is not None:
+        response_cache.close()
+    response_cache = ResponseCache(path, mode=mode, max_bytes=max_bytes) if path else None
+    return response_cache
+
+
+def cache_stats() -> Optional[Dict[str, Any]]:
+    return response_cache.stats() if response_cache is not None else None
+
+
+if os.getenv("GPT_CACHE_PATH"):
+    configure_cache(
+        os.getenv("GPT_CACHE_PATH"),
+        mode=os.getenv("GPT_CACHE_MODE", "readwrite"),
+        max_bytes=int(os.environ["GPT_CACHE_MAX_BYTES"]) if os.getenv("GPT_CACHE_MAX_BYTES") else None,
+    )
+
+
+# Backend imposé à toutes les requêtes (ex. replay_backend.ReplayBackend pour
+# --replay), prioritaire sur le backend des configurations
+backend: Optional[Backend] = None
+# Backends des configurations, un par spécification : les configurations qui
+# partagent un backend partagent aussi son pool de connexions
+_backends: Dict[str, Backend] = {}
+
+BackendSpec = Union[None, str, Dict[str, Any], Backend]
+
+
+def set_backend(new_backend: Optional[Backend]):
+    """
+    Impose un backend (cf. backends.py) à toutes les requêtes, ou rétablit
+    le backend de chaque requête si new_backend est None.
+    """
+    global backend
+    backend = new_backend
+
+
+def get_backend(spec: BackendSpec = None) -> Backend:
+    """
+    Backend d'une requête, d'après le champ "backend" de sa configuration :
+    un type enregistré (ex. "openai", "fake"), ou un dictionnaire
+    {"type": ..., options du backend} (ex. base_url, max_concurrency).
+    Sans spécification, c'est le backend par défaut (cf. configure_clients).
+    """
+    if backend is not None:
+        return backend
+    if spec is None:
+        return default_backend()
+    if isinstance(spec, Backend):
+        return spec
+    if isinstance(spec, str):
+        spec = {"type": spec}
+    name = json.dumps(spec, sort_keys=True)
+    if name not in _backends:
+        options = dict(spec)
+        _backends[name] = create_backend(options.pop("type", "openai"), **options)
+    return _backends[name]
+
+
+def close_backends():
+    """
+    Ferme les pools de connexions de tous les backends, puis les boucles
+    d'événements créées par _run dans tous les threads (ex. ceux de
+    run_checks --parallel-configs), après avoir finalisé leurs générateurs
+    asynchrones (ex. ceux d'un flux interrompu). Une boucle encore en cours
+    d'exécution dans un autre thread est laissée ouverte.
+    """
+    global _default_backend
+    for b in [*_backends.values(), *([_default_backend] if _default_backend else [])]:
+        b.close()
+    _backends.clear()
+    _default_backend = None
+    # Les flux du client openai forment des cycles de références : leurs
+    # générateurs ne sont finalisés qu'au passage du ramasse-miettes, qui
+    # programme leur fermeture sur leur boucle (d'où un tour de boucle)
+    gc.collect()
+    with _loops_lock:
+        loops = [loop for loop in _loops if not loop.is_closed()]
+        _loops[:] = [loop for loop in loops if loop.is_running()]
+    for loop in loops:
+        if not loop.is_running():
+            loop.run_until_complete(asyncio.sleep(0))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+
+# État propre à chaque thread : plusieurs configurations peuvent tourner en
+# parallèle (cf. experiment_matrix.py), chacune avec son budget
+_local = threading.local()
+# Boucles de tous les threads (cf. _run), fermées par close_backends
+_loops: List[asyncio.AbstractEventLoop] = []
+_loops_lock = threading.Lock()
+
+
+def set_token_budget(new_budget: Optional[TokenBudget]):
+    """
+    Installe, pour le thread courant, le TokenBudget qui comptabilise les
+    appels suivants (cf. token_budget.py) et bloque les nouveaux appels une
+    fois son plafond atteint.
+    """
+    _local.token_budget = new_budget
+
+
+def current_token_budget() -> Optional[TokenBudget]:
+    return getattr(_local, "token_budget", None)
+
+
+def _record_cached():
+    if current_token_budget() is not None:
+        current_token_budget().record_cached()
+
+
+# Requêtes identiques (même clé que le cache) en cours ou déjà servies dans ce
+# processus, partagées entre threads ; activé par enable_dedup
+_dedup: Optional[Dict[str, Future]] = None
+_dedup_lock = threading.Lock()
+
+
+def enable_dedup(enabled: bool = True):
+    """
+    Active la déduplication en mémoire : une requête identique à une requête
+    en cours (ou déjà servie) attend sa réponse au lieu d'être renvoyée.
+    """
+    global _dedup
+    _dedup = {} if enabled else None
+
+
+def _claim(key: str) -> Tuple[Optional[Future], bool]:
+    """
+    Renvoie (future, True) si l'appelant doit servir la requête key et
+    publier sa réponse dans future, ou (future, False) pour l'attendre.
+    """
+    if _dedup is None:
+        return None, True
+    with _dedup_lock:
+        if key in _dedup:
+            return _dedup[key], False
+        future = _dedup[key] = Future()
+        return future, True
+
+
+def _settle(key: str, future: Optional[Future], result: Optional[str] = None, error: Optional[BaseException] = None):
+    if future is None:
+        return
+    if error is not None:
+        # Une requête en échec pourra être renvoyée
+        with _dedup_lock:
+            if _dedup is not None and _dedup.get(key) is future:
+                del _dedup[key]
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+# Index des questions (cf. question_index.py), activé par set_question_index :
+# les prompts identiques à la normalisation près partagent clé de cache et réponses
+question_index: Optional[QuestionIndex] = None
+
+
+def set_question_index(index: Optional[QuestionIndex]):
+    """
+    Active (ou désactive si index est None) la réutilisation des réponses
+    entre prompts identiques à la casse, aux espaces et aux guillemets près :
+    leur clé de cache et de déduplication est celle du représentant de
+    l'index (ex. la formulation de data/). Le prompt envoyé reste inchangé.
+    """
+    global question_index
+    question_index = index
+
+
+def _prompt_key(model_name: str, prompt: str) -> str:
+    if question_index is None:
+        return prompt
+    canonical = question_index.canonical(prompt)
+    if canonical != prompt:
+        metrics.registry.inc("gpt_question_index_hits_total", model=model_name)
+    return canonical
+
+
+# Complétions lues en flux et interrompues après la ligne [Answer], activé par enable_streaming
+streaming = False
+
+
+def enable_streaming(enabled: bool = True):
+    """
+    Active le mode flux : les réponses des backends qui le permettent
+    (Backend.supports_stream) sont lues au fil de leur génération, et le
+    flux est fermé dès que chaque choix contient une ligne [Answer]
+    complète (cf. answer_parser.StreamingAnswer) ; la réponse gardée (et
+    mise en cache) s'arrête à cette ligne. Les délais jusqu'au premier
+    fragment et jusqu'à la réponse sont mesurés dans metrics.
+    """
+    global streaming
+    streaming = enabled
+
+
+async def _acomplete(
+    target: Backend,
+    model_name: str,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    sample_index: int,
+    n: int = 1,
+) -> Completion:
+    """
+    Un appel au backend, en flux si le mode est activé et possible. Sans
+    usage renvoyé (flux interrompu), les tokens sont estimés par
+    _record_usage sur le texte reçu.
+    """
+    if not (streaming and target.supports_stream):
+        return await target.acreate(model_name=model_name, messages=messages, temperature=temperature,
+                                    max_tokens=max_tokens, sample_index=sample_index, n=n)
+    start = time.perf_counter()
+    answers = [StreamingAnswer() for _ in range(n)]
+    usage = None
+    first_fragment = True
+    stream = target.astream(model_name, messages, temperature, max_tokens, sample_index, n)
+    try:
+        async for index, fragment in stream:
+            if index is None:
+                usage = fragment
+                continue
+            if first_fragment:
+                metrics.registry.observe("gpt_time_to_first_token_seconds", time.perf_counter() - start,
+                                         model=model_name)
+                first_fragment = False
+            answer = answers[index]
+            if answer.complete or not answer.feed(fragment):
+                continue
+            metrics.registry.observe("gpt_time_to_answer_seconds", time.perf_counter() - start, model=model_name)
+            if all(a.complete for a in answers):
+                metrics.registry.inc("gpt_stream_early_stops_total", model=model_name)
+                break
+        else:
+            for answer in answers:
+                if answer.finish():
+                    metrics.registry.observe("gpt_time_to_answer_seconds", time.perf_counter() - start,
+                                             model=model_name)
+    finally:
+        await stream.aclose()
+    return [answer.text for answer in answers], usage
+
+
+async def _await_duplicate(model_name: str, future: Future) -> str:
+    metrics.registry.inc("gpt_dedup_hits_total", model=model_name)
+    _record_cached()
+    return await asyncio.wrap_future(future)
+
+
+def _record_usage(model_name: str, messages: List[Dict[str, str]], contents: List[str], usage: Optional[Any] = None):
+    """
+    Enregistre l'usage d'un appel (une ou plusieurs complétions) renvoyé par
+    l'API, ou une estimation tiktoken quand le backend n'en renvoie pas
+    (ex. rejeu).
+    """
+    if usage is not None:
+        prompt_tokens, completion_tokens, estimated = usage.prompt_tokens, usage.completion_tokens, False
+    else:
+        prompt_tokens = count_message_tokens(messages, model_name)
+        completion_tokens = sum(count_tokens(content or "", model_name) for content in contents)
+        estimated = True
+    metrics.registry.record_tokens(model_name, prompt_tokens, completion_tokens)
+    # Réponses obtenues de l'API (plusieurs par appel avec le paramètre n)
+    metrics.registry.inc("gpt_completions_total", len(contents), model=model_name)
+    if current_token_budget() is not None:
+        current_token_budget().record(model_name, prompt_tokens, completion_tokens, estimated=estimated)
+
+
+# Régulation du débit partagée par toutes les requêtes (cf. rate_limiter.py)
+rate_controller = RateController()
+
+
+def set_rate_controller(new_controller: RateController):
+    """
+    Remplace le régulateur de débit, par exemple pour fixer les limites de
+    requêtes et de tokens par minute du fournisseur.
+    """
+    global rate_controller
+    rate_controller = new_controller
+
+
+def _reserved_tokens(model_name: str, messages: List[Dict[str, str]], max_tokens: int, n: int = 1) -> int:
+    # Estimation haute de la requête, prélevée sur le seau de tokens par minute
+    if rate_controller.tokens_per_minute is None:
+        return 0
+    return count_message_tokens(messages, model_name) + n * max_tokens
+
+
+def _throttle_wait(model_name: str, reserved_tokens: int) -> float:
+    wait = rate_controller.acquire(model_name, reserved_tokens)
+    if wait > 0:
+        metrics.registry.inc("gpt_throttle_seconds_total", wait, model=model_name)
+    return wait
+
+
+def _retry_wait(model_name: str, error: APIError, attempt: int, reserved_tokens: int = 0) -> float:
+    """
+    Attente avant de réessayer après error, en informant le régulateur :
+    une 429 réduit le débit du modèle, une erreur serveur ou de connexion
+    compte pour le disjoncteur, et les tokens réservés pour la tentative
+    sont rendus. Les autres erreurs (requête invalide,
+    authentification...) ne se corrigent pas en réessayant : elles sont
+    relevées.
+    """
+    retry_after = retry_after_seconds(error)
+    if isinstance(error, RateLimitError):
+        rate_controller.record_rate_limit(model_name, retry_after)
+    elif isinstance(error, APIConnectionError) or (isinstance(error, APIStatusError) and error.status_code >= 500):
+        if rate_controller.record_failure(model_name):
+            logging.warning(f"{model_name} : disjoncteur ouvert après des erreurs serveur répétées")
+            metrics.registry.inc("gpt_circuit_opened_total", model=model_name)
+    else:
+        rate_controller.release(model_name, reserved_tokens)
+        raise error
+    rate_controller.refund(model_name, reserved_tokens)
+    wait = rate_controller.backoff(attempt, retry_after)
+    logging.info(f"{type(error).__name__}: {error}. Waiting {wait:.1f} seconds...")
+    metrics.registry.record_retry(model_name, type(error).__name__, wait)
+    return wait
+
+
+def _used_tokens(usage: Optional[Any]) -> Optional[int]:
+    return usage.prompt_tokens + usage.completion_tokens if usage is not None else None
+
 
 # Set the organization
 #openai.organization = os.getenv("OPENAI_ORGANIZATION_ID")
@@ -32,47 +407,366 @@ def gpt_query(
     model_name: str = "gpt-3.5-turbo",
     max_tokens: int = 200,
     temperature: float = 0.0,
+    sample_index: int = 0,
+    backend: BackendSpec = None,
+    **kwargs: Any,
+):
+    if system_prompt is None:
+        system_prompt = DEFAULT_SYSTEM_PROMPT
+
+    target = get_backend(backend)
+    messages = [
+        chat_message("system", system_prompt),
+        chat_message("user", prompt),
+    ]
+
+    # sample_index distingue les tirages successifs d'un même prompt
+    key = None
+    if response_cache is not None:
+        key = cache_key(model_name, system_prompt, _prompt_key(model_name, prompt), temperature, max_tokens,
+                        sample_index)
+        cached = response_cache.get(key)
+        if cached is not None:
+            metrics.registry.inc("gpt_cache_hits_total", model=model_name)
+            _record_cached()
+            return cached
+    if current_token_budget() is not None:
+        current_token_budget().check()
+
+    reserved = _reserved_tokens(model_name, messages, max_tokens)
+    time_waited = 0
+    attempt = 0
+    while True:
+        wait = _throttle_wait(model_name, reserved)
+        if wait > 0:
+            time.sleep(wait)
+            continue
+        try:
+            with metrics.registry.in_flight(model_name):
+                if streaming and target.supports_stream:
+                    contents, usage = _run(_acomplete(target, model_name, messages, temperature, max_tokens,
+                                                      sample_index))
+                else:
+                    contents, usage = target.create(
+                        model_name=model_name,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        sample_index=sample_index,
+                    )
+                content = contents[0]
+            break
+        except APIError as e:
+            wait = _retry_wait(model_name, e, attempt, reserved)
+            attempt += 1
+            time_waited += wait
+            if time_waited > MAX_RETRY_WAIT:
+                raise TimeoutError(
+                    f"Timed out waiting for {model_name} to respond after"
+                    f" {MAX_RETRY_WAIT} seconds."
+                ) from e
+            time.sleep(wait)
+        except BaseException:
+            # Aussi sur KeyboardInterrupt : un essai du disjoncteur jamais
+            # libéré bloquerait toutes les requêtes suivantes du modèle
+            rate_controller.release(model_name, reserved)
+            raise
+    rate_controller.record_success(model_name, reserved, _used_tokens(usage))
+
+    _record_usage(model_name, messages, [content], usage)
+    if key is not None:
+        response_cache.put(key, content, model_name=model_name)
+    return content
+
+
+async def _await_with_retries(
+    model_name: str,
+    target: Backend,
+    call: Callable[[], Awaitable[Any]],
+    reserved_tokens: int = 0,
+) -> Any:
+    """
+    Attend call(), qui renvoie (réponses, usage), une fois le régulateur de
+    débit d'accord, en réessayant après une 429, une erreur serveur ou de
+    connexion (cf. _retry_wait), tant que les attentes cumulées ne
+    dépassent pas MAX_RETRY_WAIT secondes. Les attentes ne comptent pas
+    dans la limite de concurrence du backend.
+    """
+    time_waited = 0
+    attempt = 0
+    while True:
+        wait = _throttle_wait(model_name, reserved_tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+            continue
+        try:
+            async with target.limit():
+                with metrics.registry.in_flight(model_name):
+                    result = await call()
+        except APIError as e:
+            wait = _retry_wait(model_name, e, attempt, reserved_tokens)
+            attempt += 1
+            time_waited += wait
+            if time_waited > MAX_RETRY_WAIT:
+                raise TimeoutError(
+                    f"Timed out waiting for {model_name} to respond after"
+                    f" {MAX_RETRY_WAIT} seconds."
+                ) from e
+            await asyncio.sleep(wait)
+            continue
+        except BaseException:
+            # Aussi sur annulation (CancelledError) : un essai du disjoncteur
+            # jamais libéré bloquerait toutes les requêtes suivantes du modèle
+            rate_controller.release(model_name, reserved_tokens)
+            raise
+        rate_controller.record_success(model_name, reserved_tokens, _used_tokens(result[1]))
+        return result
+
+
+async def agpt_query(
+    prompt: str,
+    system_prompt: Optional[str] = None,
+    model_name: str = "gpt-3.5-turbo",
+    max_tokens: int = 200,
+    temperature: float = 0.0,
+    sample_index: int = 0,
+    backend: BackendSpec = None,
     **kwargs: Any,
 ):
+    """
+    Version asynchrone de gpt_query : même politique d'attente, mais les
+    pauses ne bloquent pas la boucle d'événements.
+    """
     if system_prompt is None:
         system_prompt = DEFAULT_SYSTEM_PROMPT
 
-    num_seconds_to_wait_max = 300
+    # sample_index distingue les tirages successifs d'un même prompt
+    key = cache_key(model_name, system_prompt, _prompt_key(model_name, prompt), temperature, max_tokens, sample_index)
+    future, owner = _claim(key)
+    if not owner:
+        return await _await_duplicate(model_name, future)
+    try:
+        content = await _fetch_one(get_backend(backend), key, model_name, system_prompt, prompt,
+                                   temperature, max_tokens, sample_index)
+    except BaseException as e:
+        _settle(key, future, error=e)
+        raise
+    _settle(key, future, content)
+    return content
+
+
+async def _fetch_one(
+    target: Backend,
+    key: str,
+    model_name: str,
+    system_prompt: str,
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+    sample_index: int,
+) -> str:
+    """
+    Un tirage : lu dans le cache, ou demandé au backend puis mis en cache.
+    """
+    if response_cache is not None:
+        cached = response_cache.get(key)
+        if cached is not None:
+            metrics.registry.inc("gpt_cache_hits_total", model=model_name)
+            _record_cached()
+            return cached
+    if current_token_budget() is not None:
+        current_token_budget().check()
+
+    messages = [
+        chat_message("system", system_prompt),
+        chat_message("user", prompt),
+    ]
+    contents, usage = await _await_with_retries(model_name, target, lambda: _acomplete(
+        target, model_name, messages, temperature, max_tokens, sample_index,
+    ), _reserved_tokens(model_name, messages, max_tokens))
+    content = contents[0]
+
+    _record_usage(model_name, messages, [content], usage)
+    if response_cache is not None:
+        response_cache.put(key, content, model_name=model_name)
+    return content
 
-    if "gpt-3.5" in model_name or "gpt-4" in model_name:
-        messages = [
-            chat_message("system", system_prompt),
-            chat_message("user", prompt),
-        ]
 
-        time_waited = 0
-        wait_time_seconds = 5
-        while time_waited < num_seconds_to_wait_max:
+# Modèles pour lesquels le paramètre n n'est pas honoré (un seul choix renvoyé)
+_single_choice_models = set()
+
+
+async def agpt_query_samples(
+    prompt: str,
+    system_prompt: Optional[str] = None,
+    model_name: str = "gpt-3.5-turbo",
+    max_tokens: int = 200,
+    temperature: float = 0.0,
+    sample_index: int = 0,
+    n: int = 1,
+    backend: BackendSpec = None,
+    **kwargs: Any,
+) -> List[str]:
+    """
+    Tirages sample_index, ..., sample_index + n - 1 d'un même prompt en un
+    seul aller-retour, avec le paramètre n (si le backend le permet, cf.
+    Backend.supports_n). Chaque tirage garde sa propre entrée dans le cache,
+    et seuls les tirages absents du cache sont demandés. Si le backend ne
+    renvoie pas assez de choix, les tirages manquants sont demandés un par
+    un.
+
+    Returns:
+        Les n réponses, dans l'ordre des indices de tirage.
+    """
+    if system_prompt is None:
+        system_prompt = DEFAULT_SYSTEM_PROMPT
+
+    prompt_key = _prompt_key(model_name, prompt)
+    keys = {
+        i: cache_key(model_name, system_prompt, prompt_key, temperature, max_tokens, i)
+        for i in range(sample_index, sample_index + n)
+    }
+    claims = {i: _claim(key) for i, key in keys.items()}
+    owned = [i for i, (_, owner) in claims.items() if owner]
+    try:
+        results = await _fetch_samples(get_backend(backend), {i: keys[i] for i in owned}, model_name,
+                                       system_prompt, prompt, temperature, max_tokens)
+    except BaseException as e:
+        for i in owned:
+            _settle(keys[i], claims[i][0], error=e)
+        raise
+    for i in owned:
+        _settle(keys[i], claims[i][0], results[i])
+    # Les tirages déjà demandés par une autre requête identique sont attendus
+    # après les nôtres : aucune requête n'attend une requête qui l'attend
+    duplicates = [i for i in keys if i not in results]
+    contents = await asyncio.gather(*(_await_duplicate(model_name, claims[i][0]) for i in duplicates))
+    results.update(zip(duplicates, contents))
+    return [results[i] for i in keys]
+
+
+async def _fetch_samples(
+    target: Backend,
+    keys: Dict[int, str],
+    model_name: str,
+    system_prompt: str,
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+) -> Dict[int, str]:
+    messages = [
+        chat_message("system", system_prompt),
+        chat_message("user", prompt),
+    ]
+    results: Dict[int, str] = {}
+    if response_cache is not None:
+        for i, key in keys.items():
+            cached = response_cache.get(key)
+            if cached is not None:
+                results[i] = cached
+                metrics.registry.inc("gpt_cache_hits_total", model=model_name)
+                _record_cached()
+    missing = [i for i in keys if i not in results]
+
+    if len(missing) > 1 and target.supports_n and model_name not in _single_choice_models:
+        if current_token_budget() is not None:
+            current_token_budget().check()
+
+        contents, usage = await _await_with_retries(model_name, target, lambda: _acomplete(
+            target, model_name, messages, temperature, max_tokens, missing[0], len(missing),
+        ), _reserved_tokens(model_name, messages, max_tokens, len(missing)))
+        _record_usage(model_name, messages, contents, usage)
+        if len(contents) < len(missing):
+            logging.info(f"{model_name} : {len(contents)} choix reçus pour n={len(missing)}, repli sur des requêtes séparées")
+            _single_choice_models.add(model_name)
+        for i, content in zip(missing, contents):
+            results[i] = content
+            if response_cache is not None:
+                response_cache.put(keys[i], content, model_name=model_name)
+
+    rest = [i for i in missing if i not in results]
+    contents = await asyncio.gather(*(
+        _fetch_one(target, keys[i], model_name, system_prompt, prompt, temperature, max_tokens, i) for i in rest
+    ))
+    results.update(zip(rest, contents))
+    return results
+
+
+def _run(coroutine: Awaitable[Any]) -> Any:
+    # Boucle d'événements réutilisée par les points d'entrée synchrones (une
+    # par thread) : les clients asynchrones, et donc leurs connexions,
+    # survivent d'un lot à l'autre
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _local.loop = asyncio.new_event_loop()
+        with _loops_lock:
+            _loops[:] = [other for other in _loops if not other.is_closed()]
+            _loops.append(loop)
+    return loop.run_until_complete(coroutine)
+
+
+def gpt_query_samples(prompt: str, n: int = 1, **kwargs: Any) -> List[str]:
+    """
+    Point d'entrée synchrone de agpt_query_samples.
+    """
+    return _run(agpt_query_samples(prompt, n=n, **kwargs))
+
+
+async def agpt_query_many(
+    queries: List[Dict[str, Any]],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    return_exceptions: bool = False,
+) -> List[Any]:
+    """
+    Envoie toutes les requêtes en parallèle, au plus max_concurrency à la fois
+    (et au plus max_concurrency du backend de chaque requête, s'il en a une).
+
+    Args:
+        queries: Liste de dictionnaires d'arguments pour agpt_query
+                 (prompt, model_name, temperature, system_prompt, backend...).
+                 Une requête avec une clé "n" est passée à
+                 agpt_query_samples.
+        max_concurrency: Nombre maximal de requêtes en vol.
+        return_exceptions: L'erreur d'une requête (Exception) prend la place
+                           de sa réponse au lieu d'interrompre les autres.
+
+    Returns:
+        Les réponses, dans le même ordre que queries : une chaîne par
+        requête, ou la liste des n réponses pour une requête avec "n".
+        Si une requête échoue (sans return_exceptions), les autres sont
+        annulées avant que l'erreur ne soit relevée : aucune ne reste en
+        attente sur la boucle du thread (cf. _run), où elle continuerait à
+        consommer des appels.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run_one(query: Dict[str, Any]) -> Any:
+        async with semaphore:
             try:
-                completion = client.chat.completions.create(
-                    extra_body={},
-                    model=model_name,
-                    messages=messages,
-                    temperature=temperature
-                )
-                
-                break
-            except APIError as e:
-                logging.info(f"APIError: {e}. Waiting {wait_time_seconds} seconds...")
-                time.sleep(wait_time_seconds)
-                time_waited += wait_time_seconds
-            except RateLimitError as e:
-                logging.info(f"RateLimitError: {e}. Waiting {wait_time_seconds} seconds...")
-                time.sleep(wait_time_seconds)
-                time_waited += wait_time_seconds
-                wait_time_seconds *= 2
-        else:
-            raise TimeoutError(
-                f"Timed out waiting for {model_name} to respond after"
-                f" {num_seconds_to_wait_max} seconds."
-            )
+                if "n" in query:
+                    return await agpt_query_samples(**query)
+                return await agpt_query(**query)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                return e
 
-        return completion.choices[0].message.content
+    tasks = [asyncio.ensure_future(run_one(q)) for q in queries]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
 
-    else:
-        raise NotImplementedError
+
+def gpt_query_many(
+    queries: List[Dict[str, Any]],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    return_exceptions: bool = False,
+) -> List[Any]:
+    """
+    Point d'entrée synchrone de agpt_query_many, utilisé par les scripts d'expérience.
+    """
+    return _run(agpt_query_many(queries, max_concurrency=max_concurrency, return_exceptions=return_exceptions))
@@ -0,0 +1,299 @@
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Bornes (en secondes) des histogrammes de latence, au format Prometheus
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Intervalle minimal entre deux rafraîchissements de la ligne de progression
+PROGRESS_INTERVAL = 0.5
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(**labels: Any) -> Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items() if value is not None))
+
+
+class Histogram:
+    """
+    Histogramme cumulatif à bornes fixes (compatible Prometheus).
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Quantile approché, comme histogram_quantile de Prometheus :
+        interpolation linéaire dans le premier intervalle qui atteint la
+        proportion q, dont la borne supérieure est ramenée au max observé
+        (le max sert aussi de borne au-delà de la dernière).
+        """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        lower, below = 0.0, 0
+        for bound, count in zip((*self.buckets, self.max), (*self.counts, self.count)):
+            if count >= rank and count > below:
+                upper = min(bound, self.max)
+                return lower + (upper - lower) * (rank - below) / (count - below)
+            lower, below = bound, count
+        return self.max
+
+
+class MetricsRegistry:
+    """
+    Compteurs, jauges et histogrammes du chemin de requête, étiquetés par
+    modèle et par configuration d'expérience.
+
+    La configuration courante est fixée par set_context (cf. run_checks.py),
+    pour le thread courant, et ajoutée à toutes les mesures qui suivent.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.gauges: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._local = threading.local()
+        self.started: Dict[Labels, float] = {}
+        self.updated: Dict[Labels, float] = {}
+        self.progress: Optional["ProgressLine"] = None
+
+    @property
+    def context(self) -> Dict[str, str]:
+        return getattr(self._local, "context", {})
+
+    def set_context(self, **context: Any):
+        self._local.context = {name: value for name, value in context.items() if value is not None}
+
+    def _key(self, name: str, labels: Dict[str, Any]) -> Tuple[str, Labels]:
+        return name, _labels(**{**self.context, **labels})
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+            self._touch(key[1])
+
+    def _touch(self, labels: Labels):
+        # Première et dernière mesure d'une série, pour les débits
+        now = time.perf_counter()
+        self.started.setdefault(labels, now)
+        self.updated[labels] = now
+
+    def add_gauge(self, name: str, value: float, **labels: Any):
+        key = self._key(name, labels)
+        with self._lock:
+            self._touch(key[1])
+            current = self.gauges.get(key, 0.0) + value
+            self.gauges[key] = current
+            peak_key = (name + "_max", key[1])
+            self.gauges[peak_key] = max(self.gauges.get(peak_key, 0.0), current)
+
+    def observe(self, name: str, value: float, **labels: Any):
+        key = self._key(name, labels)
+        with self._lock:
+            self._touch(key[1])
+            self.histograms.setdefault(key, Histogram()).observe(value)
+
+    @contextmanager
+    def in_flight(self, model: str) -> Iterator[None]:
+        """
+        Mesure un appel à l'API : latence, nombre de requêtes en vol.
+        """
+        self.add_gauge("gpt_requests_in_flight", 1, model=model)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("gpt_request_latency_seconds", time.perf_counter() - start, model=model)
+            self.add_gauge("gpt_requests_in_flight", -1, model=model)
+            if self.progress is not None:
+                self.progress.update(self)
+
+    @contextmanager
+    def stage(self, stage: str, **labels: Any) -> Iterator[None]:
+        """
+        Point de profilage : mesure la durée d'une étape (ex. "parse",
+        "metric", "serialize", "api") séparément du temps d'API.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_duration_seconds", time.perf_counter() - start, stage=stage, **labels)
+
+    def record_retry(self, model: str, error: str, wait_seconds: float):
+        self.inc("gpt_retries_total", model=model, error=error)
+        self.inc("gpt_backoff_seconds_total", wait_seconds, model=model, error=error)
+
+    def record_parse_failures(self, failures: Dict[str, int]):
+        """
+        Réponses dont aucun nombre n'a pu être extrait, par raison (cf. answer_parser).
+        """
+        for reason, count in failures.items():
+            if count:
+                self.inc("answer_parse_failures_total", count, reason=reason)
+
+    def record_tokens(self, model: str, prompt_tokens: int, completion_tokens: int):
+        self.inc("gpt_prompt_tokens_total", prompt_tokens, model=model)
+        self.inc("gpt_completion_tokens_total", completion_tokens, model=model)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+            self.started.clear()
+            self.updated.clear()
+
+    def to_prometheus(self) -> str:
+        """
+        Export au format texte de Prometheus (node_exporter textfile).
+        """
+        def fmt(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            pairs = labels + extra
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+        lines: List[str] = []
+        with self._lock:
+            for kind, series in (("counter", self.counters), ("gauge", self.gauges)):
+                for name in sorted({name for name, _ in series}):
+                    lines.append(f"# TYPE {name} {kind}")
+                    for (series_name, labels), value in sorted(series.items()):
+                        if series_name == name:
+                            lines.append(f"{name}{fmt(labels)} {value:g}")
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (series_name, labels), histogram in sorted(self.histograms.items(), key=lambda kv: kv[0]):
+                    if series_name != name:
+                        continue
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f"{name}_bucket{fmt(labels, (('le', f'{bound:g}'),))} {count}")
+                    lines.append(f"{name}_bucket{fmt(labels, (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{name}_sum{fmt(labels)} {histogram.sum:g}")
+                    lines.append(f"{name}_count{fmt(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Résumé JSON : une entrée par (configuration, modèle) avec latences
+        (et, en flux, délais jusqu'au premier fragment et jusqu'à la
+        réponse), relances et attentes par classe d'erreur, réponses non
+        extraites par raison, tokens par seconde (entre le début de la
+        première requête et la fin de la dernière) et pic de concurrence,
+        plus la durée de chaque étape profilée.
+        """
+        groups: Dict[Labels, Dict[str, Any]] = {}
+        stages: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for (name, labels), histogram in self.histograms.items():
+                label_dict = dict(labels)
+                if name == "stage_duration_seconds":
+                    stage_name = "/".join(v for k, v in labels if k != "stage") + ":" + label_dict["stage"]
+                    stages[stage_name] = {
+                        "count": histogram.count,
+                        "total_seconds": histogram.sum,
+                        "mean_seconds": histogram.sum / histogram.count,
+                    }
+                    continue
+                group = groups.setdefault(labels, {**label_dict})
+                if name == "gpt_request_latency_seconds":
+                    group["requests"] = histogram.count
+                    prefix = "latency"
+                else:
+                    # ex. gpt_time_to_first_token_seconds -> time_to_first_token_*
+                    prefix = name.replace("gpt_", "").replace("_seconds", "")
+                group.update({
+                    f"{prefix}_mean_seconds": histogram.sum / histogram.count,
+                    f"{prefix}_p50_seconds": histogram.quantile(0.5),
+                    f"{prefix}_p95_seconds": histogram.quantile(0.95),
+                    f"{prefix}_max_seconds": histogram.max,
+                })
+            for (name, labels), value in self.counters.items():
+                group_labels = tuple((k, v) for k, v in labels if k not in ("error", "reason"))
+                group = groups.setdefault(group_labels, dict(group_labels))
+                error = dict(labels).get("error")
+                reason = dict(labels).get("reason")
+                if reason is not None:
+                    group.setdefault("parse_failures", {})[reason] = value
+                elif error is not None:
+                    field = "retries" if name == "gpt_retries_total" else "backoff_seconds"
+                    group.setdefault(field, {})[error] = value
+                else:
+                    group[name.replace("gpt_", "").replace("_total", "")] = value
+            for (name, labels), value in self.gauges.items():
+                if name.endswith("_max"):
+                    groups.setdefault(labels, dict(labels))["max_in_flight"] = value
+            for labels, group in groups.items():
+                elapsed = self.updated.get(labels, 0.0) - self.started.get(labels, 0.0)
+                if elapsed > 0 and "completion_tokens" in group:
+                    group["completion_tokens_per_second"] = group["completion_tokens"] / elapsed
+        return {"series": list(groups.values()), "stages": stages}
+
+    def write(self, prometheus_file: Optional[str] = None, json_file: Optional[str] = None):
+        if prometheus_file:
+            with open(prometheus_file, 'w', encoding='utf-8') as f:
+                f.write(self.to_prometheus())
+        if json_file:
+            with open(json_file, 'w', encoding='utf-8') as f:
+                json.dump(self.summary(), f, indent=4)
+
+
+class ProgressLine:
+    """
+    Ligne de progression rafraîchie sur stderr : requêtes terminées, en vol,
+    débit en requêtes et en tokens par seconde.
+    """
+
+    def __init__(self, stream: Any = sys.stderr, interval: float = PROGRESS_INTERVAL):
+        self.stream = stream
+        self.interval = interval
+        self.start = time.perf_counter()
+        self.last = 0.0
+
+    def update(self, registry: MetricsRegistry, force: bool = False):
+        now = time.perf_counter()
+        if not force and now - self.last < self.interval:
+            return
+        self.last = now
+        context = f"[{', '.join(registry.context.values())}] " if registry.context else ""
+        with registry._lock:
+            done = sum(h.count for (name, _), h in registry.histograms.items() if name == "gpt_request_latency_seconds")
+            in_flight = sum(v for (name, _), v in registry.gauges.items() if name == "gpt_requests_in_flight")
+            tokens = sum(v for (name, _), v in registry.counters.items() if name == "gpt_completion_tokens_total")
+            retries = sum(v for (name, _), v in registry.counters.items() if name == "gpt_retries_total")
+        elapsed = max(now - self.start, 1e-9)
+        self.stream.write(f"\r{context}{done} requêtes, {in_flight:.0f} en vol, {done / elapsed:.1f} req/s,"
+                          f" {tokens / elapsed:.0f} tokens/s, {retries:.0f} relances ")
+        self.stream.flush()
+
+    def close(self, registry: MetricsRegistry):
+        self.update(registry, force=True)
+        self.stream.write("\n")
+
+
+# Registre global, alimenté par gpt_interface et run_checks
+registry = MetricsRegistry()
+
+
+def enable_progress(enabled: bool = True):
+    registry.progress = ProgressLine() if enabled else None
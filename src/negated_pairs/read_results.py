@@ -1,21 +1,54 @@
-import json
+import sys
+sys.path.append("..")
 import statistics
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from experiment_io import load_results
+from columnar import STORE_SUFFIX, ColumnarStore
+from bootstrap import DEFAULT_RESAMPLES, bootstrap_files
+from sampling_plan import DEFAULT_CONFIDENCE
+
+def calculate_statistics(
+    file_path: str,
+    bootstrap: Optional[Dict[str, Any]] = None,
+    n_resamples: int = DEFAULT_RESAMPLES,
+    confidence: float = DEFAULT_CONFIDENCE,
+):
+    """
+    Affiche les statistiques de violation d'un fichier de résultats, au
+    format JSON ou JSONL (éventuellement d'une expérience encore en cours),
+    ou d'un magasin colonnaire .cols (cf. columnar.py), avec leurs
+    intervalles de confiance bootstrap (cf. bootstrap.py).
+
+    Args:
+        bootstrap: Ligne du fichier dans bootstrap_files(...)["configs"],
+                   si elle est déjà calculée ; sinon le bootstrap est fait
+                   pour ce seul fichier.
+    """
 
-def calculate_statistics(file_path: str):
-    
     violations: List[float] = []
     number_of_strong: int = 0
 
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data: List[Dict[str, Any]] = json.load(f)
+    if file_path.rstrip(os.sep).endswith(STORE_SUFFIX):
+        # Seules les colonnes violation et strong sont lues, sans aucun texte
+        try:
+            store = ColumnarStore(file_path)
+        except Exception as e:
+            print(f"Une erreur inattendue est survenue lors de la lecture : {e}")
+            return
+        violations = [float(v) for v in store["violation"]]
+        number_of_strong = int(store["strong"].sum())
+        data: List[Dict[str, Any]] = []
+    else:
+        try:
+            data = load_results(file_path)
 
-    except Exception as e:
-        print(f"Une erreur inattendue est survenue lors de la lecture : {e}")
-        return
+        except Exception as e:
+            print(f"Une erreur inattendue est survenue lors de la lecture : {e}")
+            return
     for item in data:
+        if item.get("skipped", False):
+            continue
         violation_metric: float = item.get("violation_metric")
         is_strong: bool = item.get("strong", False)
         violations.append(violation_metric)
@@ -37,6 +70,12 @@ def calculate_statistics(file_path: str):
         print(f"Nombre de violations fortes (>0.2) : {number_of_strong}")
         print(f"Violation moyenne (statistics.mean) : {mean_violation:.4f}")
         print(f"Pourcentage de violations fortes : {percentage_strong:.2f}%")
+        if bootstrap is None:
+            bootstrap = bootstrap_files([file_path], n_resamples, confidence)["configs"][0]
+        low, high = bootstrap["mean_violation_interval"]
+        print(f"IC à {confidence:.0%} de la violation moyenne (bootstrap) : [{low:.4f}, {high:.4f}]")
+        low, high = bootstrap["strong_proportion_interval"]
+        print(f"IC à {confidence:.0%} du pourcentage de violations fortes (bootstrap) : [{100 * low:.2f}%, {100 * high:.2f}%]")
         print("-" * 30)
 
     except Exception as e:
@@ -46,5 +85,27 @@ def calculate_statistics(file_path: str):
 if __name__ == "__main__":
 
     files = ["negated_gpt-3.5_T-0.0","negated_gpt-3.5_T-0.5","negated_gpt-4_T-0.0","negated_gpt-4_T-0.5"]
+    paths = []
     for f in files:
-        calculate_statistics(f"../../results/negated_pairs/output_{f}.json")
\ No newline at end of file
+        path = f"../../results/negated_pairs/output_{f}.json"
+        if os.path.isdir(path[:-len(".json")] + STORE_SUFFIX):
+            # Magasin colonnaire produit par columnar.py convert
+            path = path[:-len(".json")] + STORE_SUFFIX
+        elif not os.path.exists(path):
+            # Expérience en cours : seul le fichier JSONL existe
+            path += "l"
+        paths.append(path)
+
+    # Un seul bootstrap pour tous les fichiers, avec les comparaisons appariées
+    existing = [path for path in paths if os.path.exists(path)]
+    result = bootstrap_files(existing) if existing else {"configs": [], "comparisons": []}
+    rows = {row["file"]: row for row in result["configs"]}
+    for path in paths:
+        calculate_statistics(path, bootstrap=rows.get(path))
+
+    for row in result["comparisons"]:
+        low, high = row["mean_violation_difference_interval"]
+        print(f"{os.path.basename(row['second'])} - {os.path.basename(row['first'])} ({row['common_items']} questions) :")
+        print(f"  violation moyenne {row['mean_violation_difference']:+.4f} [{low:+.4f}, {high:+.4f}]")
+        low, high = row["strong_proportion_difference_interval"]
+        print(f"  violations fortes {100 * row['strong_proportion_difference']:+.2f}% [{100 * low:+.2f}%, {100 * high:+.2f}%]")
@@ -1,10 +1,16 @@
+import argparse
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional
 
 import matplotlib.pyplot as plt
 from highlight_text import HighlightText
 import matplotlib.axes
 
+from word_diff import word_edits
+
+# Highlight delimiters for HighlightText: questions can contain "<" and ">" (">100 nuclear detonations")
+DELIM = ("\u27e6", "\u27e7")
+
 
 def auto_wrap_sentence(sentence: str, line_length_max: int) -> str:
     """
@@ -12,8 +18,8 @@ def auto_wrap_sentence(sentence: str, line_length_max: int) -> str:
     """
     words = sentence.split(" ")
     words_clean = [w.replace("\u0336", "") for w in words]
-    words_clean = [w.replace("<", "") for w in words_clean]
-    words_clean = [w.replace(">", "") for w in words_clean]
+    words_clean = [w.replace(DELIM[0], "") for w in words_clean]
+    words_clean = [w.replace(DELIM[1], "") for w in words_clean]
     lines_clean = []
     lines = []
     line = ""
@@ -32,52 +38,8 @@ def auto_wrap_sentence(sentence: str, line_length_max: int) -> str:
 
 
 def get_levenshtein_sentence_distance_edits(string1, string2) -> List[str]:
-    # Only consider additions and deletions
-    distance_dict: Dict[Tuple(int, int), int] = {}
-
-    sentence1 = string1.split(" ")
-    sentence2 = string2.split(" ")
-
-    # Add the base cases
-    for i in range(len(sentence1) + 1):
-        distance_dict[(i, 0)] = i
-
-    for j in range(len(sentence2) + 1):
-        distance_dict[(0, j)] = j
-
-    # Fill the rest of the table
-    for i in range(1, len(sentence1) + 1):
-        for j in range(1, len(sentence2) + 1):
-            if sentence1[i - 1] == sentence2[j - 1]:
-                distance_dict[(i, j)] = distance_dict[(i - 1, j - 1)]
-            else:
-                distance_dict[(i, j)] = min(
-                    distance_dict[(i - 1, j)] + 1,
-                    distance_dict[(i, j - 1)] + 1,
-                )
-
-    # Get a list of the edits
-    edits = []
-    i, j = len(sentence1), len(sentence2)
-    while i > 0 or j > 0:
-        if i == 0:
-            edits.append("+")
-            j -= 1
-        elif j == 0:
-            edits.append("-")
-            i -= 1
-        elif sentence1[i - 1] == sentence2[j - 1]:
-            edits.append("0")
-            i -= 1
-            j -= 1
-        elif distance_dict[(i - 1, j)] <= distance_dict[(i, j - 1)]:
-            edits.append("-")
-            i -= 1
-        else:
-            edits.append("+")
-            j -= 1
-
-    return edits[::-1]
+    # Only consider additions and deletions (bit-parallel LCS, see word_diff.py)
+    return word_edits(string1, string2)
 
 
 def create_text_object(
@@ -92,6 +54,7 @@ def create_text_object(
         "va": "center",
         "s": sentence,
         "highlight_textprops": bboxes,
+        "delim": DELIM,
         "annotationbbox_kw": {
             "frameon": True,
             "pad": 2,
@@ -138,11 +101,11 @@ def plot_paraphrases(
             j += 1
         elif edit == "-":
             word_strike_through = "".join(l + "\u0336" for l in sentence1_parts[i])
-            new_sentence += [f"<{word_strike_through}>"]
+            new_sentence += [f"{DELIM[0]}{word_strike_through}{DELIM[1]}"]
             bboxes.append(dict(deletion_bbox))
             i += 1
         else:
-            new_sentence += [f"<{sentence2_parts[j]}>"]
+            new_sentence += [f"{DELIM[0]}{sentence2_parts[j]}{DELIM[1]}"]
             bboxes.append(dict(insertion_bbox))
             j += 1
 
@@ -167,16 +130,29 @@ def plot_paraphrases(
 
     plt.tight_layout()
 
-    if show_plot:
-        plt.show()
-
+    # Save first: once the window is closed, plt.show() leaves an empty figure
     if save_plot:
         plt.savefig(save_path, bbox_inches="tight", dpi=300)
 
+    if show_plot:
+        plt.show()
+
     plt.close()
 
 
 if __name__ == "__main__":
+    # For every pair of a dataset file, see render_paraphrases.py
+    parser = argparse.ArgumentParser(description="Plot the word-level diff between two paraphrases.")
+    parser.add_argument("sentence1")
+    parser.add_argument("sentence2")
+    parser.add_argument("--save", help="Save the figure to this path (PNG, SVG, PDF) instead of showing it")
+    args = parser.parse_args()
+
+    plot_paraphrases(
+        args.sentence1,
+        args.sentence2,
+        save_plot=args.save is not None,
+        save_path=args.save,
+        show_plot=args.save is None,
+    )
 
-
-    plot_paraphrases(sentence1, sentence2)
@@ -0,0 +1,336 @@
+import argparse
+import glob
+import json
+import os
+import re
+import threading
+import unicodedata
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from question_loader import iter_json_array
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+# Jaccard minimal (sur les bigrammes de mots) entre deux questions quasi identiques
+DEFAULT_THRESHOLD = 0.7
+DEFAULT_NUM_PERM = 128
+# 32 bandes de 4 lignes : une paire de similarité 0.5 est candidate avec une
+# probabilité de 0.87, une paire de similarité 0.7 avec une probabilité > 0.999
+DEFAULT_BANDS = 32
+SHINGLE_SIZE = 2
+# Premier nombre premier au-delà de 2^32 : (a * h + b) mod P tient dans un uint64
+_PRIME = np.uint64(4294967311)
+# Les espaces insécables sont déjà ramenés à des espaces par NFKC
+_TYPOGRAPHY = str.maketrans({"‘": "'", "’": "'", "“": '"', "”": '"', "–": "-", "—": "-"})
+_SPACE_BEFORE_PUNCTUATION = re.compile(r"\s+([?.!,;:%)])")
+_WORD = re.compile(r"\w+")
+
+# Occurrence d'une question : (fichier, indice de l'élément, position dans l'élément)
+Source = Tuple[str, int, int]
+
+
+def normalize(text: str) -> str:
+    """
+    Forme normalisée d'une question : deux prompts de même forme normalisée
+    (casse, espaces, guillemets typographiques près) sont identiques.
+    """
+    text = unicodedata.normalize("NFKC", text).translate(_TYPOGRAPHY).lower()
+    return " ".join(_SPACE_BEFORE_PUNCTUATION.sub(r"\1", text).split())
+
+
+def shingles(normalized: str) -> Set[str]:
+    """
+    Bigrammes de mots (sans la ponctuation) d'une question normalisée.
+    """
+    words = _WORD.findall(normalized)
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class QuestionIndex:
+    """
+    Index des questions de plusieurs fichiers : doublons exacts (même forme
+    normalisée) et quasi-doublons (signatures MinHash regroupées par LSH,
+    similarité de Jaccard vérifiée exactement).
+
+    Les doublons exacts partagent un représentant, la première forme brute
+    rencontrée (cf. canonical), utilisé par gpt_interface pour réutiliser
+    les réponses. Les quasi-doublons sont seulement signalés : « Will X? »
+    et « Will X not? » sont très proches mais de sens opposés.
+
+    Args:
+        threshold: Similarité de Jaccard minimale des quasi-doublons.
+        num_perm: Nombre de permutations de la signature MinHash.
+        bands: Nombre de bandes LSH (num_perm doit en être un multiple).
+        seed: Graine des permutations.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        num_perm: int = DEFAULT_NUM_PERM,
+        bands: int = DEFAULT_BANDS,
+        seed: int = 0,
+    ):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) doit être un multiple de bands ({bands})")
+        self.threshold = threshold
+        self.rows = num_perm // bands
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 1 << 32, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64)
+        self.ids: Dict[str, int] = {}
+        self.representatives: List[str] = []
+        self.shingle_sets: List[Set[str]] = []
+        self.sources: List[List[Source]] = []
+        self.buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.representatives)
+
+    def signature(self, shingle_set: Set[str]) -> np.ndarray:
+        hashes = np.array([zlib.crc32(s.encode("utf-8")) for s in shingle_set], dtype=np.uint64)
+        return ((self.a[:, None] * hashes[None, :] + self.b[:, None]) % _PRIME).min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(len(self.buckets))]
+
+    def add(self, text: str, source: Optional[Source] = None) -> int:
+        """
+        Ajoute une occurrence de question, et renvoie l'identifiant de sa
+        forme normalisée.
+        """
+        normalized = normalize(text)
+        with self._lock:
+            question_id = self.ids.get(normalized)
+            if question_id is None:
+                question_id = self.ids[normalized] = len(self.representatives)
+                shingle_set = shingles(normalized)
+                self.representatives.append(text)
+                self.shingle_sets.append(shingle_set)
+                self.sources.append([])
+                for bucket, key in zip(self.buckets, self._band_keys(self.signature(shingle_set))):
+                    bucket.setdefault(key, []).append(question_id)
+            if source is not None:
+                self.sources[question_id].append(source)
+            return question_id
+
+    def add_file(self, file: str):
+        """
+        Ajoute toutes les questions d'un fichier JSON (liste d'éléments avec
+        un champ "questions", cf. data/).
+        """
+        for item_index, (_, item) in enumerate(iter_json_array(file, fields=["questions"])):
+            for position, question in enumerate(item.get("questions") or []):
+                self.add(question, (file, item_index, position))
+
+    def canonical(self, text: str) -> str:
+        """
+        Représentant des doublons exacts de text (text lui-même s'il est
+        nouveau, et il devient alors le représentant).
+        """
+        return self.representatives[self.add(text)]
+
+    def find(self, text: str) -> Optional[int]:
+        return self.ids.get(normalize(text))
+
+    def near(self, text: str, threshold: Optional[float] = None) -> List[Tuple[int, float]]:
+        """
+        Questions indexées dont la similarité avec text atteint threshold
+        (doublon exact compris), de la plus proche à la moins proche.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        shingle_set = shingles(normalize(text))
+        candidates = set()
+        with self._lock:
+            for bucket, key in zip(self.buckets, self._band_keys(self.signature(shingle_set))):
+                candidates.update(bucket.get(key, ()))
+        scored = [(i, jaccard(shingle_set, self.shingle_sets[i])) for i in candidates]
+        return sorted([(i, s) for i, s in scored if s >= threshold], key=lambda pair: -pair[1])
+
+    def _items(self, question_id: int) -> Set[Tuple[str, int]]:
+        return {(file, item) for file, item, _ in self.sources[question_id]}
+
+    def near_pairs(self, threshold: Optional[float] = None) -> List[Tuple[int, int, float]]:
+        """
+        Paires de quasi-doublons (i < j, similarité), hors questions d'un même
+        élément (une question et sa négation ou ses paraphrases voulues).
+        """
+        threshold = self.threshold if threshold is None else threshold
+        candidates = set()
+        for bucket in self.buckets:
+            for members in bucket.values():
+                candidates.update((i, j) for n, i in enumerate(members) for j in members[n + 1:])
+        pairs = []
+        for i, j in candidates:
+            if self._items(i) & self._items(j):
+                continue
+            similarity = jaccard(self.shingle_sets[i], self.shingle_sets[j])
+            if similarity >= threshold:
+                pairs.append((min(i, j), max(i, j), similarity))
+        return sorted(pairs)
+
+    def clusters(self, threshold: Optional[float] = None) -> List[List[int]]:
+        """
+        Groupes de quasi-doublons (composantes connexes des paires), les plus
+        grands d'abord.
+        """
+        parent = list(range(len(self)))
+
+        def root(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, j, _ in self.near_pairs(threshold):
+            parent[root(i)] = root(j)
+        groups: Dict[int, List[int]] = {}
+        for i in range(len(self)):
+            groups.setdefault(root(i), []).append(i)
+        return sorted((g for g in groups.values() if len(g) > 1), key=lambda g: (-len(g), g[0]))
+
+    def describe(self, question_id: int) -> Dict[str, Any]:
+        sources = self.sources[question_id]
+        return {
+            "question": self.representatives[question_id],
+            "occurrences": len(sources),
+            "items": len(self._items(question_id)),
+            "files": sorted({os.path.basename(file) for file, _, _ in sources}),
+        }
+
+
+def build_index(files: Iterable[str], threshold: float = DEFAULT_THRESHOLD) -> QuestionIndex:
+    index = QuestionIndex(threshold)
+    for file in files:
+        index.add_file(file)
+    return index
+
+
+def data_files(data_dir: str = DATA_DIR) -> List[str]:
+    return sorted(glob.glob(os.path.join(data_dir, "*.json")))
+
+
+def report(index: QuestionIndex, threshold: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Regroupe les fichiers qui posent les mêmes questions (un jeu de données
+    interrogé avec plusieurs modèles ou températures), puis compte pour
+    chaque jeu les questions répétées dans le jeu lui-même, celles posées
+    telles quelles dans un autre jeu et celles quasi identiques à une
+    question d'un autre jeu ; donne aussi les groupes de quasi-doublons.
+    """
+    file_ids: Dict[str, Set[int]] = {}
+    occurrences: Dict[str, int] = {}
+    for question_id, sources in enumerate(index.sources):
+        for file, _, _ in sources:
+            file_ids.setdefault(file, set()).add(question_id)
+            occurrences[file] = occurrences.get(file, 0) + 1
+    datasets: Dict[frozenset, List[str]] = {}
+    for file in sorted(file_ids):
+        datasets.setdefault(frozenset(file_ids[file]), []).append(file)
+    near: Dict[int, Set[int]] = {}
+    for i, j, _ in index.near_pairs(threshold):
+        near.setdefault(i, set()).add(j)
+        near.setdefault(j, set()).add(i)
+
+    summaries = []
+    for ids, files in datasets.items():
+        others = set().union(*(other for other in datasets if other != ids))
+        summaries.append({
+            "files": [os.path.basename(file) for file in files],
+            "questions": occurrences[files[0]],
+            "unique": len(ids),
+            "shared": len(ids & others),
+            "near": sum(1 for i in ids - others if near.get(i, set()) & (others - ids)),
+        })
+    return {
+        "occurrences": sum(len(sources) for sources in index.sources),
+        "unique": len(index),
+        "datasets": summaries,
+        "clusters": [[index.describe(i) for i in cluster] for cluster in index.clusters(threshold)],
+    }
+
+
+def dedupe_file(
+    file: str,
+    index: QuestionIndex,
+    threshold: Optional[float] = None,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Sépare les éléments d'un nouveau jeu de données : un élément est écarté
+    si l'une de ses questions est un doublon (exact ou quasi) d'une question
+    de l'index ou d'un élément gardé avant lui. Les éléments gardés sont
+    ajoutés à l'index.
+
+    Returns:
+        (éléments gardés, écartés avec "duplicate_of" : la question en
+        cause, la question indexée la plus proche et leur similarité).
+    """
+    kept, dropped = [], []
+    for item_index, (_, item) in enumerate(iter_json_array(file)):
+        match = None
+        for question in item.get("questions") or []:
+            neighbours = index.near(question, threshold)
+            if neighbours and (match is None or neighbours[0][1] > match[2]):
+                match = (question, *neighbours[0])
+        if match is None:
+            kept.append(item)
+            for position, question in enumerate(item["questions"]):
+                index.add(question, (file, item_index, position))
+        else:
+            question, match_id, similarity = match
+            dropped.append({**item, "duplicate_of": {"question": question, "match": index.representatives[match_id],
+                                                     "similarity": similarity}})
+    return kept, dropped
+
+
+def print_report(summary: Dict[str, Any], max_clusters: int):
+    print(f"{summary['occurrences']} occurrences, {summary['unique']} questions distinctes (après normalisation),"
+          f" {len(summary['datasets'])} jeux de données, {len(summary['clusters'])} groupes de quasi-doublons")
+    for dataset in summary["datasets"]:
+        others = f" (+{len(dataset['files']) - 1} fichiers)" if len(dataset["files"]) > 1 else ""
+        print(f"  {dataset['files'][0]}{others} : {dataset['questions']} questions,"
+              f" {dataset['questions'] - dataset['unique']} répétées, {dataset['shared']} posées dans un autre jeu,"
+              f" {dataset['near']} quasi identiques à une question d'un autre jeu")
+    for cluster in summary["clusters"][:max_clusters]:
+        print(f"- groupe de {len(cluster)} questions :")
+        for member in cluster:
+            print(f"    [{member['occurrences']} occ., {len(member['files'])} fichier(s)] {member['question']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Doublons exacts et quasi-doublons des questions de data/.")
+    parser.add_argument("files", nargs="*", help="Fichiers JSON indexés (défaut : data/*.json)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Similarité de Jaccard minimale des quasi-doublons (défaut : 0.7)")
+    parser.add_argument("--max-clusters", type=int, default=20, help="Groupes affichés au plus")
+    parser.add_argument("--json", help="Écrit le rapport complet dans ce fichier JSON")
+    parser.add_argument("--dedupe", metavar="FILE",
+                        help="Nouveau jeu de données à dédoublonner par rapport aux fichiers indexés")
+    parser.add_argument("--output", help="Fichier des éléments gardés par --dedupe (défaut : <FILE>.dedup.json)")
+    args = parser.parse_args()
+
+    index = build_index(args.files or data_files(), args.threshold)
+    if args.dedupe:
+        kept, dropped = dedupe_file(args.dedupe, index, args.threshold)
+        output = args.output or os.path.splitext(args.dedupe)[0] + ".dedup.json"
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(kept, f, indent=4, ensure_ascii=False)
+        print(f"{len(kept)} éléments gardés dans {output}, {len(dropped)} écartés")
+        for item in dropped[:args.max_clusters]:
+            duplicate = item["duplicate_of"]
+            print(f"- {duplicate['question']}\n    ~ {duplicate['match']} ({duplicate['similarity']:.2f})")
+    else:
+        summary = report(index)
+        print_report(summary, args.max_clusters)
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=4, ensure_ascii=False)
@@ -0,0 +1,260 @@
+import json
+import re
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+_STRUCTURE_TOKEN = re.compile(r'["\[\]{}]')
+_SCALAR = re.compile(r'[^,\]}\s]+')
+_WHITESPACE = re.compile(r'\s*')
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+class JSONStreamError(ValueError):
+    """Erreur de syntaxe JSON, avec sa position (en caractères) dans le fichier."""
+
+    def __init__(self, message: str, offset: int):
+        super().__init__(f"{message} (position {offset})")
+        self.offset = offset
+
+
+class _Buffer:
+    """
+    Tampon de lecture : seule la partie non encore consommée du fichier
+    est gardée en mémoire.
+    """
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.text = ""
+        self.base = 0
+        self.eof = False
+
+    def read_more(self, size: Optional[int] = None) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.text += chunk
+        return True
+
+    def skip_whitespace(self, pos: int) -> int:
+        while True:
+            pos = _WHITESPACE.match(self.text, pos).end()
+            if pos < len(self.text) or not self.read_more():
+                return pos
+
+    def char(self, pos: int) -> str:
+        pos = self.skip_whitespace(pos)
+        if pos >= len(self.text):
+            raise JSONStreamError("Fin de fichier inattendue", self.base + pos)
+        return self.text[pos]
+
+    def consume(self, pos: int):
+        self.text = self.text[pos:]
+        self.base += pos
+
+
+def _string_end(text: str, pos: int) -> Optional[int]:
+    """
+    Fin de la chaîne JSON dont le guillemet ouvrant est à pos ; None si elle
+    est coupée par la fin du tampon. str.find est bien plus rapide qu'une
+    expression régulière sur les longues réponses.
+    """
+    start = pos + 1
+    while True:
+        end = text.find('"', start)
+        if end < 0:
+            return None
+        backslash = end - 1
+        while text[backslash] == "\\":
+            backslash -= 1
+        if (end - 1 - backslash) % 2 == 0:
+            return end + 1
+        start = end + 1
+
+
+def _value_end(text: str, pos: int, eof: bool) -> Optional[int]:
+    """
+    Fin de la valeur JSON commençant à pos, sans la décoder ; None si la
+    valeur est coupée par la fin du tampon.
+    """
+    first = text[pos]
+    if first == '"':
+        return _string_end(text, pos)
+    if first in "[{":
+        depth = 0
+        while True:
+            match = _STRUCTURE_TOKEN.search(text, pos)
+            if match is None:
+                return None
+            token = match.group()
+            if token == '"':
+                pos = _string_end(text, match.start())
+                if pos is None:
+                    return None
+                continue
+            pos = match.end()
+            if token in "[{":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return pos
+    match = _SCALAR.match(text, pos)
+    if match is None:
+        raise ValueError(f"Caractère inattendu {first!r}")
+    return match.end() if match.end() < len(text) or eof else None
+
+
+def _read_value(buffer: _Buffer, pos: int, decode: bool) -> Tuple[Any, int]:
+    """
+    Lit (ou saute si decode est False) la valeur commençant à pos, en
+    complétant le tampon autant que nécessaire. La taille lue double à
+    chaque tentative, pour qu'une très longue valeur ne soit pas reparcourue
+    un grand nombre de fois.
+    """
+    read_size = buffer.chunk_size
+    while True:
+        try:
+            end = _value_end(buffer.text, pos, buffer.eof)
+        except ValueError as e:
+            raise JSONStreamError(str(e), buffer.base + pos)
+        if end is not None:
+            break
+        if not buffer.read_more(read_size):
+            raise JSONStreamError("Valeur JSON incomplète", buffer.base + pos)
+        read_size *= 2
+    if not decode:
+        return None, end
+    try:
+        return json.loads(buffer.text[pos:end]), end
+    except json.JSONDecodeError as e:
+        raise JSONStreamError(f"Valeur JSON invalide : {e.msg}", buffer.base + pos + e.pos)
+
+
+def _read_object(buffer: _Buffer, pos: int, fields: Optional[Sequence[str]]) -> Tuple[Any, int]:
+    """
+    Lit un objet en ne décodant que les clés de fields (toutes si None).
+    """
+    if buffer.char(pos) != "{":
+        return _read_value(buffer, buffer.skip_whitespace(pos), decode=True)
+    pos = buffer.skip_whitespace(pos) + 1
+    item: Dict[str, Any] = {}
+    if buffer.char(pos) == "}":
+        return item, buffer.skip_whitespace(pos) + 1
+    while True:
+        pos = buffer.skip_whitespace(pos)
+        if buffer.char(pos) != '"':
+            raise JSONStreamError("Clé attendue", buffer.base + pos)
+        key, pos = _read_value(buffer, pos, decode=True)
+        pos = buffer.skip_whitespace(pos)
+        if buffer.char(pos) != ":":
+            raise JSONStreamError("':' attendu", buffer.base + pos)
+        pos = buffer.skip_whitespace(pos + 1)
+        buffer.char(pos)
+        wanted = fields is None or key in fields
+        value, pos = _read_value(buffer, pos, decode=wanted)
+        if wanted:
+            item[key] = value
+        pos = buffer.skip_whitespace(pos)
+        separator = buffer.char(pos)
+        pos += 1
+        if separator == "}":
+            return item, pos
+        if separator != ",":
+            raise JSONStreamError("',' ou '}' attendu", buffer.base + pos - 1)
+
+
+def iter_json_array(
+    file: str,
+    fields: Optional[Sequence[str]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[Tuple[int, Any]]:
+    """
+    Parcourt un fichier JSON contenant une liste d'objets, élément par
+    élément, avec une mémoire bornée par la taille d'un élément.
+
+    Args:
+        file: Le chemin d'accès au fichier JSON.
+        fields: Clés à décoder dans chaque objet ; les autres (ex. les longs
+                "responses") sont sautées sans être décodées. None : toutes.
+        chunk_size: Taille des blocs lus sur le disque (en caractères).
+
+    Yields:
+        (position de l'élément dans le fichier en caractères, élément).
+
+    Raises:
+        JSONStreamError: Si le fichier n'est pas une liste JSON valide.
+    """
+    with open(file, 'r', encoding='utf-8') as f:
+        buffer = _Buffer(f, chunk_size)
+        pos = buffer.skip_whitespace(0)
+        if buffer.char(pos) != "[":
+            raise JSONStreamError("Liste JSON attendue", buffer.base + pos)
+        pos = buffer.skip_whitespace(pos + 1)
+        if buffer.char(pos) == "]":
+            return
+        while True:
+            pos = buffer.skip_whitespace(pos)
+            offset = buffer.base + pos
+            item, pos = _read_object(buffer, pos, fields)
+            yield offset, item
+            pos = buffer.skip_whitespace(pos)
+            separator = buffer.char(pos)
+            if separator == "]":
+                return
+            if separator != ",":
+                raise JSONStreamError("',' ou ']' attendu", buffer.base + pos)
+            buffer.consume(pos + 1)
+            pos = 0
+
+
+def first_item(file: str, fields: Optional[Sequence[str]] = None) -> Optional[Any]:
+    """
+    Premier élément d'un fichier JSON, sans lire le reste du fichier.
+    """
+    for _, item in iter_json_array(file, fields=fields):
+        return item
+    return None
+
+
+def iter_question_items(
+    file: str,
+    arity: Optional[int],
+    extra_fields: Sequence[str] = (),
+    with_answers: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Produit paresseusement les tuples de questions d'un fichier de data/.
+
+    Args:
+        file: Le chemin d'accès au fichier JSON d'entrée.
+        arity: Nombre de questions attendu (None : au moins deux).
+        extra_fields: Champs à conserver en plus des questions (ex. "direction").
+        with_answers: Conserve aussi le champ "answers" (réponses extraites).
+
+    Yields:
+        Des dictionnaires {"questions": (...), <champs>}. Les éléments mal
+        formés sont signalés avec leur position, puis ignorés.
+    """
+    fields = ["questions", *extra_fields] + (["answers"] if with_answers else [])
+    for offset, item in iter_json_array(file, fields=fields):
+        if not isinstance(item, dict) or not isinstance(item.get("questions"), list):
+            print(f"Avertissement : élément mal formé ignoré à la position {offset} de '{file}'.")
+            continue
+        question_list = item["questions"]
+        expected = arity or 2
+        if len(question_list) < expected:
+            print(f"Avertissement : l'élément à la position {offset} de '{file}' contient"
+                  f" {len(question_list)} questions au lieu de {expected}, ignoré.")
+            continue
+        missing = [name for name in fields[1:] if name not in item]
+        if missing:
+            print(f"Avertissement : champ(s) {', '.join(missing)} absent(s) à la position {offset} de '{file}', ignoré.")
+            continue
+        entry = {"questions": tuple(question_list if arity is None else question_list[:arity])}
+        entry.update({name: item[name] for name in fields[1:]})
+        yield entry
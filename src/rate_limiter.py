@@ -0,0 +1,287 @@
+import email.utils
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+# Backoff exponentiel (secondes) : base * 2^tentative, plafonné, avec gigue totale
+DEFAULT_BACKOFF_BASE = 1.0
+DEFAULT_BACKOFF_CAP = 60.0
+# AIMD : facteur appliqué au débit après une 429, hausse (requêtes/min) par succès
+DEFAULT_DECREASE_FACTOR = 0.5
+DEFAULT_INCREASE = 1.0
+MIN_REQUESTS_PER_MINUTE = 1.0
+# Disjoncteur : échecs serveur consécutifs avant ouverture, pause avant l'essai suivant
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_COOLDOWN = 30.0
+MAX_COOLDOWN = 300.0
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Délai demandé par le fournisseur (en-têtes retry-after-ms ou
+    retry-after, en secondes ou date HTTP), ou None.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return max(0.0, float(headers["retry-after-ms"]) / 1000)
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            date = email.utils.parsedate_to_datetime(value)
+            return max(0.0, date.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Seau à jetons : rate jetons par minute, au plus capacity en réserve
+    (une minute de débit par défaut).
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate / 60)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """
+        Attente avant de pouvoir prélever amount jetons (0 : possible).
+        """
+        self._refill(now)
+        # Une demande plus grosse que le seau passe dès qu'il est plein
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60 / self.rate
+
+    def take(self, amount: float):
+        self.level -= amount
+
+    def give_back(self, amount: float):
+        self.level = min(self.capacity, self.level + amount)
+
+    def set_rate(self, rate: float):
+        self._refill(time.monotonic())
+        self.rate = rate
+        self.capacity = rate
+        self.level = min(self.level, rate)
+
+
+class ModelLimiter:
+    """
+    État de régulation d'un modèle : seaux requêtes/min et tokens/min,
+    pause imposée (Retry-After, disjoncteur) et échecs consécutifs.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float], tokens_per_minute: Optional[float]):
+        self.max_requests_per_minute = requests_per_minute
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.paused_until = 0.0
+        self.failures = 0
+        self.circuit_open = False
+        self.cooldown = DEFAULT_COOLDOWN
+        self.probe_in_flight = False
+        # Débuts des requêtes de la dernière minute, pour estimer le débit observé
+        self.recent: Deque[float] = deque()
+
+
+class RateController:
+    """
+    Régulation partagée de toutes les requêtes du processus (threads et
+    tâches asyncio), par modèle :
+
+    - seaux à jetons pour les requêtes et les tokens par minute ;
+    - AIMD : le débit de requêtes est multiplié par decrease_factor à chaque
+      429 (sans limite configurée, il part du débit observé), puis remonte
+      de increase requête/min par succès, jusqu'à la limite configurée ;
+    - Retry-After : la pause demandée s'applique à toutes les requêtes du modèle ;
+    - backoff exponentiel avec gigue entre les tentatives d'une requête ;
+    - disjoncteur : après failure_threshold erreurs serveur consécutives,
+      plus aucune requête pendant cooldown secondes, puis une seule requête
+      d'essai ; un nouvel échec double la pause (au plus MAX_COOLDOWN).
+
+    Args:
+        requests_per_minute: Limite de requêtes par minute (None : aucune,
+                             jusqu'à la première 429).
+        tokens_per_minute: Limite de tokens (prompt et complétion) par minute.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        backoff_base: float = DEFAULT_BACKOFF_BASE,
+        backoff_cap: float = DEFAULT_BACKOFF_CAP,
+        decrease_factor: float = DEFAULT_DECREASE_FACTOR,
+        increase: float = DEFAULT_INCREASE,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        cooldown: float = DEFAULT_COOLDOWN,
+        seed: Optional[int] = None,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.decrease_factor = decrease_factor
+        self.increase = increase
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.random = random.Random(seed)
+        self.limiters: Dict[str, ModelLimiter] = {}
+        self._lock = threading.Lock()
+
+    def _limiter(self, model_name: str) -> ModelLimiter:
+        if model_name not in self.limiters:
+            limiter = ModelLimiter(self.requests_per_minute, self.tokens_per_minute)
+            limiter.cooldown = self.cooldown
+            self.limiters[model_name] = limiter
+        return self.limiters[model_name]
+
+    def acquire(self, model_name: str, tokens: int = 0) -> float:
+        """
+        Réserve une requête de tokens tokens (estimation haute) si c'est
+        possible tout de suite, et renvoie 0 ; sinon renvoie l'attente
+        avant de redemander.
+        """
+        now = time.monotonic()
+        with self._lock:
+            limiter = self._limiter(model_name)
+            if now < limiter.paused_until:
+                return limiter.paused_until - now
+            if limiter.circuit_open and limiter.probe_in_flight:
+                # Disjoncteur entrouvert : on attend le verdict de la requête d'essai
+                return self.backoff_base
+            wait = 0.0
+            if limiter.requests is not None:
+                wait = max(wait, limiter.requests.wait_time(1, now))
+            if limiter.tokens is not None and tokens:
+                wait = max(wait, limiter.tokens.wait_time(tokens, now))
+            if wait > 0:
+                return wait
+            if limiter.requests is not None:
+                limiter.requests.take(1)
+            if limiter.tokens is not None:
+                limiter.tokens.take(tokens)
+            if limiter.circuit_open:
+                limiter.probe_in_flight = True
+            limiter.recent.append(now)
+            while limiter.recent and limiter.recent[0] < now - 60:
+                limiter.recent.popleft()
+            return 0.0
+
+    def record_success(self, model_name: str, reserved_tokens: int = 0, used_tokens: Optional[int] = None):
+        """
+        Succès d'une requête : ferme le disjoncteur, augmente le débit
+        (AIMD), et rend au seau les tokens réservés mais non consommés.
+        """
+        with self._lock:
+            limiter = self._limiter(model_name)
+            limiter.failures = 0
+            limiter.circuit_open = False
+            limiter.probe_in_flight = False
+            limiter.cooldown = self.cooldown
+            if limiter.requests is not None:
+                rate = limiter.requests.rate + self.increase
+                if limiter.max_requests_per_minute is not None:
+                    rate = min(rate, limiter.max_requests_per_minute)
+                limiter.requests.set_rate(rate)
+            if limiter.tokens is not None and used_tokens is not None and used_tokens < reserved_tokens:
+                limiter.tokens.give_back(reserved_tokens - used_tokens)
+
+    def record_rate_limit(self, model_name: str, retry_after: Optional[float] = None):
+        """
+        Réponse 429 : diminution multiplicative du débit, et pause de tout le
+        modèle pendant le Retry-After éventuel.
+        """
+        now = time.monotonic()
+        with self._lock:
+            limiter = self._limiter(model_name)
+            limiter.probe_in_flight = False
+            if limiter.requests is None:
+                # Pas de limite configurée : on part du débit observé sur la
+                # dernière minute (ou depuis la première requête)
+                recent = [t for t in limiter.recent if t >= now - 60]
+                window = max(1.0, now - recent[0]) if recent else 60.0
+                limiter.requests = TokenBucket(max(MIN_REQUESTS_PER_MINUTE, len(recent) * 60 / window))
+                limiter.requests.level = 1.0
+            limiter.requests.set_rate(max(MIN_REQUESTS_PER_MINUTE, limiter.requests.rate * self.decrease_factor))
+            if retry_after is not None:
+                limiter.paused_until = max(limiter.paused_until, now + retry_after)
+
+    def record_failure(self, model_name: str) -> bool:
+        """
+        Erreur serveur ou de connexion. Renvoie True si le disjoncteur vient
+        de s'ouvrir (ou de se rouvrir après un essai raté).
+        """
+        now = time.monotonic()
+        with self._lock:
+            limiter = self._limiter(model_name)
+            limiter.failures += 1
+            if limiter.circuit_open and limiter.probe_in_flight:
+                limiter.probe_in_flight = False
+                limiter.cooldown = min(MAX_COOLDOWN, limiter.cooldown * 2)
+            elif limiter.circuit_open or limiter.failures < self.failure_threshold:
+                return False
+            limiter.circuit_open = True
+            limiter.paused_until = max(limiter.paused_until, now + limiter.cooldown)
+            return True
+
+    def release(self, model_name: str, reserved_tokens: int = 0):
+        """
+        Requête terminée sans réponse exploitable du serveur (ex. erreur
+        client, annulation) : libère l'essai du disjoncteur sans le juger,
+        et rend les tokens réservés.
+        """
+        with self._lock:
+            self._limiter(model_name).probe_in_flight = False
+        self.refund(model_name, reserved_tokens)
+
+    def refund(self, model_name: str, reserved_tokens: int):
+        """
+        Rend au seau les tokens réservés par acquire pour une tentative
+        refusée (429, erreur serveur) : la suivante les réserve à nouveau.
+        """
+        if not reserved_tokens:
+            return
+        with self._lock:
+            limiter = self._limiter(model_name)
+            if limiter.tokens is not None:
+                limiter.tokens.give_back(reserved_tokens)
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Attente avant la tentative attempt + 1 : au moins le Retry-After,
+        sinon un tirage uniforme dans [0, min(cap, base * 2^attempt)].
+        """
+        delay = self.random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            return max(retry_after, delay / 10)
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                model_name: {
+                    "requests_per_minute": limiter.requests.rate if limiter.requests is not None else None,
+                    "tokens_per_minute": limiter.tokens.rate if limiter.tokens is not None else None,
+                    "circuit_open": limiter.circuit_open,
+                    "consecutive_failures": limiter.failures,
+                }
+                for model_name, limiter in self.limiters.items()
+            }
@@ -0,0 +1,163 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import matplotlib
+
+# Rendu sans affichage, aussi dans les processus du pool
+matplotlib.use("Agg")
+
+from word_diff import paraphrase_pairs
+
+MANIFEST_NAME = "manifest.json"
+DEFAULT_FORMATS = ("png",)
+# Le code de rendu fait partie de l'empreinte : le modifier régénère les figures
+_SOURCES = ("plot_paraphrases.py", "word_diff.py")
+
+
+def _code_hash() -> str:
+    digest = hashlib.sha256()
+    for name in _SOURCES:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def figure_hash(sentence1: str, sentence2: str, fmt: str, code_hash: str) -> str:
+    """
+    Empreinte du contenu d'une figure : les deux phrases, le format et le
+    code de rendu.
+    """
+    payload = json.dumps([sentence1, sentence2, fmt, code_hash], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def plan_figures(files: Sequence[str], out_dir: str, formats: Sequence[str] = DEFAULT_FORMATS) -> List[Dict[str, Any]]:
+    """
+    Une figure par paire de paraphrases, par fichier et par format :
+    <out_dir>/<fichier>/item<élément>_<p>-<q>.<format>.
+    """
+    code_hash = _code_hash()
+    figures = []
+    for file in files:
+        stem = os.path.splitext(os.path.basename(file))[0]
+        for index, p, q, first, second in paraphrase_pairs(file):
+            for fmt in formats:
+                figures.append({
+                    "path": os.path.join(out_dir, stem, f"item{index:03d}_{p}-{q}.{fmt}"),
+                    "sentences": (first, second),
+                    "hash": figure_hash(first, second, fmt, code_hash),
+                })
+    return figures
+
+
+def load_manifest(out_dir: str) -> Dict[str, str]:
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(out_dir: str, manifest: Dict[str, str]):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def _render(job: Tuple[str, str, str]) -> Optional[str]:
+    """
+    Rend une figure ; renvoie l'erreur plutôt que de la lever, pour qu'une
+    paire fautive n'interrompe pas le lot.
+    """
+    from plot_paraphrases import plot_paraphrases
+
+    sentence1, sentence2, path = job
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        with warnings.catch_warnings():
+            # tight_layout prévient quand les deux textes débordent des axes
+            warnings.simplefilter("ignore", UserWarning)
+            plot_paraphrases(sentence1, sentence2, save_plot=True, save_path=path, show_plot=False)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+def render_all(
+    files: Sequence[str],
+    out_dir: str,
+    formats: Sequence[str] = DEFAULT_FORMATS,
+    workers: Optional[int] = None,
+    force: bool = False,
+) -> Dict[str, int]:
+    """
+    Rend les figures de toutes les paires de paraphrases des fichiers dans
+    un pool de processus. Une figure dont le fichier existe et dont
+    l'empreinte n'a pas changé (manifest.json) n'est pas refaite, sauf avec
+    force (les entrées des figures d'autres fichiers restent au manifest) ;
+    une figure au contenu identique à une autre (mêmes questions dans les
+    fichiers de plusieurs modèles) n'est rendue qu'une fois, puis copiée.
+
+    Returns:
+        Le nombre de figures rendues, copiées, inchangées et en échec (ces
+        dernières ne sont pas inscrites au manifest et seront retentées).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = load_manifest(out_dir)
+    figures = plan_figures(files, out_dir, formats)
+
+    todo: Dict[str, List[Dict[str, Any]]] = {}
+    unchanged = 0
+    for figure in figures:
+        key = os.path.relpath(figure["path"], out_dir)
+        if not force and manifest.get(key) == figure["hash"] and os.path.exists(figure["path"]):
+            unchanged += 1
+        else:
+            todo.setdefault(figure["hash"], []).append(figure)
+
+    jobs = [(*group[0]["sentences"], group[0]["path"]) for group in todo.values()]
+    chunksize = max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        errors = list(pool.map(_render, jobs, chunksize=chunksize))
+
+    copied = failed = 0
+    for (content_hash, group), error in zip(todo.items(), errors):
+        if error is not None:
+            warnings.warn(f"{group[0]['path']} : {error}")
+            failed += len(group)
+            for figure in group:
+                manifest.pop(os.path.relpath(figure["path"], out_dir), None)
+            continue
+        for figure in group[1:]:
+            os.makedirs(os.path.dirname(figure["path"]), exist_ok=True)
+            shutil.copyfile(group[0]["path"], figure["path"])
+            copied += 1
+        for figure in group:
+            manifest[os.path.relpath(figure["path"], out_dir)] = content_hash
+    save_manifest(out_dir, manifest)
+    return {"rendered": errors.count(None), "copied": copied, "unchanged": unchanged, "failed": failed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rend les figures de toutes les paires de paraphrases.")
+    parser.add_argument("files", nargs="+", help="Fichiers large_paraphrases_*.json")
+    parser.add_argument("--out-dir", default=os.path.join("..", "results", "figures", "paraphrases"),
+                        help="Dossier des figures (défaut : ../results/figures/paraphrases)")
+    parser.add_argument("--formats", nargs="+", default=list(DEFAULT_FORMATS), choices=["png", "svg", "pdf"],
+                        help="Formats des figures (défaut : png)")
+    parser.add_argument("--workers", type=int, default=None, help="Processus de rendu (défaut : un par cœur)")
+    parser.add_argument("--force", action="store_true", help="Refait toutes les figures")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = render_all(args.files, args.out_dir, args.formats, args.workers, args.force)
+    print(f"{counts['rendered']} figures rendues, {counts['copied']} copiées, {counts['unchanged']} inchangées,"
+          f" {counts['failed']} en échec en {time.perf_counter() - start:.1f} s ({args.out_dir})")
@@ -0,0 +1,131 @@
+import asyncio
+import glob
+import os
+import random
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from backends import Backend, Completion, injected_error
+from question_loader import iter_json_array
+
+# ex. negated_pair_dataset_200_gpt-4-0314_method_1shot_china_T_0.5_times_6_mt_400.json
+DATA_FILE_PATTERN = re.compile(r"_(?P<model>gpt-.+?)_method_.*_T_(?P<temperature>[\d.]+)_times_(?P<run>\d+)_mt_(?P<max_tokens>\d+)\.json$")
+
+
+class ReplayMiss(KeyError):
+    """Aucune réponse enregistrée pour (modèle, température, question, tirage)."""
+
+
+def parse_data_filename(file: str) -> Optional[Dict[str, Any]]:
+    """
+    Extrait modèle, température, nombre de tirages et max_tokens du nom
+    d'un fichier de data/, ou None s'il ne suit pas la convention.
+    """
+    match = DATA_FILE_PATTERN.search(os.path.basename(file))
+    if match is None:
+        return None
+    return {
+        "model": match.group("model"),
+        "temperature": float(match.group("temperature")),
+        "run": int(match.group("run")),
+        "max_tokens": int(match.group("max_tokens")),
+    }
+
+
+def model_aliases(model: str) -> List[str]:
+    """
+    "gpt-4-0314" est aussi servi sous "gpt-4", le nom utilisé par les scripts.
+    """
+    alias = re.sub(r"-\d{4}$", "", model)
+    return [model] if alias == model else [model, alias]
+
+
+class ReplayBackend(Backend):
+    """
+    Backend hors-ligne pour gpt_interface : sert les réponses enregistrées
+    dans data/*.json, indexées par (modèle, température, question, tirage).
+
+    Args:
+        data_dir: Dossier contenant les fichiers JSON enregistrés.
+        latency: Délai simulé par requête, en secondes.
+        error_rate: Probabilité d'injecter une erreur serveur (500).
+        rate_limit_rate: Probabilité d'injecter une erreur 429.
+        wrap: Si True, un tirage au-delà des réponses enregistrées
+              réutilise les réponses modulo leur nombre.
+        seed: Graine du tirage des erreurs injectées.
+        max_concurrency: Requêtes simultanées au plus vers ce backend.
+    """
+
+    supports_n = True
+
+    def __init__(
+        self,
+        data_dir: str,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        wrap: bool = False,
+        seed: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+    ):
+        super().__init__(max_concurrency)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.wrap = wrap
+        self.random = random.Random(seed)
+        self.index: Dict[Tuple[str, float, str], List[str]] = {}
+        self.calls = 0
+        self.injected_errors = 0
+        for file in sorted(glob.glob(os.path.join(data_dir, "*.json"))):
+            self.add_file(file)
+
+    def add_file(self, file: str):
+        meta = parse_data_filename(file)
+        if meta is None:
+            print(f"Avertissement : nom de fichier non reconnu, ignoré : {file}")
+            return
+        for _, item in iter_json_array(file, fields=["questions", "responses"]):
+            for question, responses in zip(item.get("questions", []), item.get("responses", [])):
+                for model in model_aliases(meta["model"]):
+                    key = (model, meta["temperature"], question)
+                    self.index.setdefault(key, []).extend(responses)
+
+    def lookup(self, model_name: str, temperature: float, prompt: str, sample_index: int = 0) -> str:
+        responses = self.index.get((model_name, float(temperature), prompt))
+        if not responses:
+            raise ReplayMiss((model_name, temperature, prompt[:50], sample_index))
+        if sample_index >= len(responses):
+            if not self.wrap:
+                raise ReplayMiss((model_name, temperature, prompt[:50], sample_index))
+            sample_index %= len(responses)
+        return responses[sample_index]
+
+    def _maybe_inject_error(self):
+        error = injected_error(self.random.random(), self.error_rate, self.rate_limit_rate, "ReplayBackend")
+        if error is not None:
+            self.injected_errors += 1
+            raise error
+
+    def _complete(self, model_name: str, messages: List[Dict[str, str]], temperature: float,
+                  sample_index: int, n: int) -> Completion:
+        self._maybe_inject_error()
+        prompt = messages[-1]["content"]
+        return [self.lookup(model_name, temperature, prompt, i) for i in range(sample_index, sample_index + n)], None
+
+    def create(self, model_name, messages, temperature=0.0, max_tokens=200, sample_index=0, n=1) -> Completion:
+        """
+        Les tirages sample_index, ..., sample_index + n - 1 en un seul appel
+        (une seule latence simulée), comme le paramètre n de l'API.
+        """
+        self.calls += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+        return self._complete(model_name, messages, temperature, sample_index, n)
+
+    async def acreate(self, model_name, messages, temperature=0.0, max_tokens=200, sample_index=0, n=1) -> Completion:
+        self.calls += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        return self._complete(model_name, messages, temperature, sample_index, n)
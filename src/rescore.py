@@ -0,0 +1,206 @@
+import argparse
+import glob
+import json
+import os
+import time
+import warnings
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from consistency_checks import STRONG_THRESHOLD, get_check
+
+# Valeur stockée dans data/ pour une médiane ou un écart-type sans réponse extraite
+MISSING_SENTINEL = -10000
+
+
+def pack_answers(items: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Range les réponses extraites d'une liste d'éléments dans des tableaux
+    complétés (éléments × questions × tirages).
+
+    Returns:
+        Un dictionnaire avec "values" (NaN hors réponse), "parsed" (masque
+        des réponses extraites), "stored_violation", "stored_median",
+        "stored_std" (NaN si absent) et les champs propres aux vérifications.
+    """
+    n_items = len(items)
+    n_prompts = max(len(item["answers"]) for item in items)
+    n_samples = max(len(answers) for item in items for answers in item["answers"])
+
+    values = np.full((n_items, n_prompts, n_samples), np.nan)
+    parsed = np.zeros((n_items, n_prompts, n_samples), dtype=bool)
+    stored_median = np.full((n_items, n_prompts), np.nan)
+    stored_std = np.full((n_items, n_prompts), np.nan)
+    stored_violation = np.full(n_items, np.nan)
+    for i, item in enumerate(items):
+        for j, answers in enumerate(item["answers"]):
+            for k, answer in enumerate(answers):
+                if answer.get("parsed") and answer.get("result") is not None:
+                    values[i, j, k] = answer["result"]
+                    parsed[i, j, k] = True
+        if item.get("median") is not None:
+            stored_median[i, :len(item["median"])] = item["median"]
+        if item.get("std_devs") is not None:
+            stored_std[i, :len(item["std_devs"])] = item["std_devs"]
+        if item.get("violation") is not None:
+            stored_violation[i] = item["violation"]
+
+    packed = {
+        "values": values,
+        "parsed": parsed,
+        "stored_median": stored_median,
+        "stored_std": stored_std,
+        "stored_violation": stored_violation,
+        "n_questions": np.array([len(item["answers"]) for item in items]),
+    }
+    if "direction" in items[0]:
+        packed["direction"] = np.array([item.get("direction", "increasing") for item in items])
+    return packed
+
+
+def load_answer_arrays(file: str) -> Dict[str, Any]:
+    """
+    Charge un fichier de data/ sous forme de tableaux NumPy (cf. pack_answers).
+    """
+    with open(file, 'r', encoding='utf-8') as f:
+        items = json.load(f)
+    packed = pack_answers(items)
+    packed["file"] = file
+    packed["type"] = items[0]["type"]
+    return packed
+
+
+def concatenate(arrays: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Concatène les tableaux de plusieurs fichiers d'un même type de
+    vérification, en complétant les axes questions et tirages.
+    """
+    n_prompts = max(a["values"].shape[1] for a in arrays)
+    n_samples = max(a["values"].shape[2] for a in arrays)
+
+    def pad(array: np.ndarray, fill: Any) -> np.ndarray:
+        widths = [(0, 0)] + [(0, target - size) for size, target in zip(array.shape[1:], (n_prompts, n_samples))]
+        return np.pad(array, widths, constant_values=fill)
+
+    merged = {
+        "values": np.concatenate([pad(a["values"], np.nan) for a in arrays]),
+        "parsed": np.concatenate([pad(a["parsed"], False) for a in arrays]),
+        "stored_median": np.concatenate([pad(a["stored_median"], np.nan) for a in arrays]),
+        "stored_std": np.concatenate([pad(a["stored_std"], np.nan) for a in arrays]),
+        "stored_violation": np.concatenate([a["stored_violation"] for a in arrays]),
+        "n_questions": np.concatenate([a["n_questions"] for a in arrays]),
+        "file_index": np.concatenate([np.full(len(a["values"]), i) for i, a in enumerate(arrays)]),
+    }
+    if all("direction" in a for a in arrays):
+        merged["direction"] = np.concatenate([a["direction"] for a in arrays])
+    return merged
+
+
+def rescore(
+    arrays: Dict[str, np.ndarray],
+    check_name: str,
+    threshold: float = STRONG_THRESHOLD,
+    violation: Optional[Any] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Recalcule médianes, écarts-types et violations de tous les éléments en
+    une seule passe vectorisée.
+
+    Args:
+        arrays: Tableaux produits par pack_answers / concatenate.
+        check_name: Type de vérification (clé de CHECKS).
+        threshold: Seuil des violations fortes.
+        violation: Fonction de violation de remplacement, pour essayer une
+                   nouvelle métrique ; par défaut celle de la vérification.
+
+    Returns:
+        "median", "std_devs", "violation", "strong" et "mismatch" (éléments
+        dont la violation recalculée diffère de la valeur stockée).
+    """
+    check = get_check(check_name)
+    values = arrays["values"]
+    any_parsed = arrays["parsed"].any(axis=2)
+    # np.nanmedian avertit pour chaque question sans réponse : c'est attendu ici
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        medians = np.nanmedian(values, axis=2)
+        std_devs = np.nanstd(values, axis=2)
+
+    fields = {name: arrays[name] for name in check.fields}
+    violation_fn = violation or check.violation
+    violations = violation_fn(medians, **fields)
+
+    stored = arrays["stored_violation"]
+    mismatch = ~np.isnan(stored) & ~np.isclose(violations, stored)
+    return {
+        "median": medians,
+        "std_devs": np.where(any_parsed, std_devs, np.nan),
+        "violation": violations,
+        "strong": violations > threshold,
+        "mismatch": mismatch,
+    }
+
+
+def load_all(data_dir: str) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Charge tous les fichiers de data_dir, regroupés par type de vérification.
+    """
+    per_type: Dict[str, List[Dict[str, Any]]] = {}
+    for file in sorted(glob.glob(os.path.join(data_dir, "*.json"))):
+        arrays = load_answer_arrays(file)
+        per_type.setdefault(arrays["type"], []).append(arrays)
+    return per_type
+
+
+def rescore_all(
+    per_type: Dict[str, List[Dict[str, Any]]],
+    threshold: float = STRONG_THRESHOLD,
+) -> List[Dict[str, Any]]:
+    """
+    Recalcule les violations de tous les fichiers chargés par load_all, une
+    passe vectorisée par type de vérification, et les compare aux valeurs
+    stockées.
+
+    Returns:
+        Une ligne de résumé par fichier.
+    """
+    summary = []
+    for check_name, arrays in per_type.items():
+        merged = concatenate(arrays)
+        scores = rescore(merged, check_name, threshold=threshold)
+        stored_median = np.where(merged["stored_median"] == MISSING_SENTINEL, np.nan, merged["stored_median"])
+        any_parsed = merged["parsed"].any(axis=2)
+        median_mismatch = (any_parsed & ~np.isclose(scores["median"], stored_median)).any(axis=1)
+        for index, a in enumerate(arrays):
+            rows = merged["file_index"] == index
+            summary.append({
+                "file": os.path.basename(a["file"]),
+                "type": check_name,
+                "items": int(rows.sum()),
+                "mean_violation": float(scores["violation"][rows].mean()),
+                "strong_percentage": float(100 * scores["strong"][rows].mean()),
+                "violation_mismatches": int(scores["mismatch"][rows].sum()),
+                "median_mismatches": int(median_mismatch[rows].sum()),
+            })
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalcule en bloc les violations de tous les fichiers de data/.")
+    parser.add_argument("--data-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data"))
+    parser.add_argument("--threshold", type=float, default=STRONG_THRESHOLD,
+                        help="Seuil des violations fortes")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    per_type = load_all(args.data_dir)
+    loaded = time.perf_counter()
+    summary = rescore_all(per_type, threshold=args.threshold)
+    done = time.perf_counter()
+    # Écarts avec les violations et les médianes stockées dans les fichiers
+    print(f"{'fichier':<95} {'type':<19} {'n':>4} {'moy.':>7} {'fortes':>7} {'éc. viol.':>9} {'éc. méd.':>8}")
+    for row in summary:
+        print(f"{row['file']:<95} {row['type']:<19} {row['items']:>4} {row['mean_violation']:>7.4f}"
+              f" {row['strong_percentage']:>6.1f}% {row['violation_mismatches']:>9} {row['median_mismatches']:>8}")
+    print(f"{len(summary)} fichiers : chargement {loaded - start:.2f} s, recalcul {1000 * (done - loaded):.1f} ms")
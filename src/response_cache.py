@@ -0,0 +1,154 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+CACHE_MODES = ("readwrite", "readonly", "refresh")
+# Dates d'accès des réponses servies, écrites par lots plutôt qu'à chaque lecture
+ACCESS_FLUSH = 256
+# Une éviction descend à cette part de max_bytes, pour ne pas recommencer à chaque écriture
+EVICTION_TARGET = 0.9
+
+
+def cache_key(
+    model_name: str,
+    system_prompt: str,
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+    sample_index: int,
+) -> str:
+    """
+    Clé de cache : empreinte SHA-256 de tout ce qui détermine une complétion.
+    """
+    payload = json.dumps(
+        [model_name, system_prompt, prompt, float(temperature), max_tokens, sample_index],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Cache persistant (SQLite) des réponses de gpt_query.
+
+    Modes :
+        - "readwrite" : sert les réponses connues et enregistre les nouvelles ;
+        - "readonly"  : sert les réponses connues sans jamais écrire ;
+        - "refresh"   : ignore les réponses connues et les remplace.
+
+    Si max_bytes est fourni, les réponses les moins récemment utilisées
+    sont supprimées dès que la taille totale des réponses le dépasse. La
+    taille totale est lue à l'ouverture puis tenue à jour à chaque écriture
+    et suppression (sans compter les écritures d'autres processus), et les
+    dates d'accès sont enregistrées par lots de ACCESS_FLUSH.
+    """
+
+    def __init__(self, path: str, mode: str = "readwrite", max_bytes: Optional[int] = None):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Mode de cache inconnu : {mode} (attendu : {', '.join(CACHE_MODES)})")
+        self.path = path
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " model_name TEXT,"
+            " response TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+        self._conn.commit()
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self._accessed: Dict[str, float] = {}
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if self.mode == "refresh":
+                self.misses += 1
+                return None
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if self.mode == "readwrite":
+                self._accessed[key] = time.time()
+                if len(self._accessed) >= ACCESS_FLUSH:
+                    self._flush_accesses()
+                    self._conn.commit()
+            self.hits += 1
+        return row[0]
+
+    def _flush_accesses(self):
+        if self._accessed:
+            self._conn.executemany("UPDATE responses SET last_access = ? WHERE key = ?",
+                                   [(accessed, key) for key, accessed in self._accessed.items()])
+            self._accessed.clear()
+
+    def put(self, key: str, response: str, model_name: Optional[str] = None):
+        if self.mode == "readonly" or response is None:
+            return
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model_name, response, size, created, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_name, response, size, now, now),
+            )
+            self._accessed.pop(key, None)
+            self._total += size - (previous[0] if previous else 0)
+            self.writes += 1
+            if self.max_bytes is not None and self._total > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Ordre LRU à jour avant de choisir les réponses à supprimer
+        self._flush_accesses()
+        target = self.max_bytes * EVICTION_TARGET
+        evicted = []
+        # Parcours de l'index sur last_access, arrêté dès la cible atteinte
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC"):
+            if self._total <= target:
+                break
+            evicted.append((key,))
+            self._total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self.evictions += len(evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._flush_accesses()
+            self._conn.commit()
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            return {
+                "path": self.path,
+                "mode": self.mode,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "entries": entries,
+                "bytes": total,
+            }
+
+    def close(self):
+        with self._lock:
+            self._flush_accesses()
+            self._conn.commit()
+            self._conn.close()
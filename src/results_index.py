@@ -0,0 +1,282 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from columnar import STORE_SUFFIX, ColumnarStore
+from experiment_io import load_results
+from sampling_plan import DEFAULT_CONFIDENCE, wilson_interval
+
+# Même dossier que run_checks.RESULTS_ROOT, sans importer la couche d'appels à l'API
+RESULTS_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "results")
+INDEX_NAME = ".results_index.json"
+INDEX_VERSION = 1
+# Colonnes du tableau de synthèse, dans l'ordre des fichiers CSV
+COLUMNS = [
+    "path", "type", "name", "model", "temperature", "runs", "items", "skipped",
+    "mean_violation", "strong", "strong_proportion", "interval_low", "interval_high", "modified",
+]
+# Fichiers lus dans un magasin colonnaire : les textes ne servent pas au résumé
+_STORE_FILES = ("meta.json", "violation.npy", "strong.npy")
+_MODEL = re.compile(r"gpt-[0-9a-z.]+(?:-[0-9a-z.]+)*?(?=_|$)")
+_TEMPERATURE = re.compile(r"T[_-](\d+(?:\.\d+)?)")
+
+
+def _result_name(path: str) -> str:
+    """
+    output_<name>.json, .jsonl ou .cols -> <name>.
+    """
+    base = os.path.basename(path.rstrip(os.sep))
+    for suffix in (STORE_SUFFIX, ".jsonl", ".json"):
+        if base.endswith(suffix):
+            base = base[:-len(suffix)]
+            break
+    return base[len("output_"):] if base.startswith("output_") else base
+
+
+def find_result_files(root: str) -> List[str]:
+    """
+    Fichiers de résultats de root et de ses sous-dossiers : output_<name>.json,
+    .jsonl et magasins .cols. Quand plusieurs formats existent pour une même
+    configuration, seul le plus récent est gardé (un .jsonl plus récent que
+    le .json est une reprise en cours).
+    """
+    latest: Dict[Tuple[str, str], Tuple[float, str]] = {}
+    for directory, subdirs, files in os.walk(root):
+        stores = [d for d in subdirs if d.endswith(STORE_SUFFIX)]
+        # Les magasins sont des résultats, pas des dossiers à parcourir
+        subdirs[:] = [d for d in subdirs if not d.endswith(STORE_SUFFIX)]
+        candidates = [f for f in files if f.startswith("output_") and f.endswith((".json", ".jsonl"))] + stores
+        for name in candidates:
+            path = os.path.join(directory, name)
+            key = (directory, _result_name(path))
+            modified = _stat(path)[0]
+            if key not in latest or modified > latest[key][0]:
+                latest[key] = (modified, path)
+    return sorted(path for _, path in latest.values())
+
+
+def _members(path: str) -> List[str]:
+    if os.path.isdir(path):
+        return [os.path.join(path, name) for name in _STORE_FILES if os.path.exists(os.path.join(path, name))]
+    return [path]
+
+
+def _sidecar(path: str) -> str:
+    return os.path.join(os.path.dirname(path.rstrip(os.sep)), f"estimate_{_result_name(path)}.json")
+
+
+def _stat(path: str) -> Tuple[int, int]:
+    """
+    (mtime en ns, taille) d'un fichier, ou des fichiers lus d'un magasin.
+    """
+    stats = [os.stat(member) for member in _members(path)]
+    return max((s.st_mtime_ns for s in stats), default=0), sum(s.st_size for s in stats)
+
+
+def fingerprint(path: str) -> Dict[str, Any]:
+    """
+    Empreinte rapide (dates et tailles) d'un fichier de résultats et de son
+    estimate_<name>.json.
+    """
+    mtime_ns, size = _stat(path)
+    sidecar = _sidecar(path)
+    return {
+        "mtime_ns": mtime_ns,
+        "size": size,
+        "sidecar_mtime_ns": os.stat(sidecar).st_mtime_ns if os.path.exists(sidecar) else None,
+    }
+
+
+def content_hash(path: str) -> str:
+    """
+    SHA-256 du contenu, calculé seulement quand l'empreinte rapide a changé.
+    """
+    digest = hashlib.sha256()
+    for member in [*_members(path), _sidecar(path)]:
+        if not os.path.exists(member):
+            continue
+        with open(member, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def describe(path: str) -> Dict[str, Any]:
+    """
+    Vérification, modèle, température et nombre de tirages d'un fichier :
+    lus dans estimate_<name>.json (écrit par run_checks.run_config), ou
+    déduits du nom du fichier pour les anciens résultats.
+    """
+    name = _result_name(path)
+    description: Dict[str, Any] = {"name": name, "type": None, "model": None, "temperature": None, "runs": None}
+    sidecar = _sidecar(path)
+    if os.path.exists(sidecar):
+        with open(sidecar, 'r', encoding='utf-8') as f:
+            estimate = json.load(f)
+        description.update({key: estimate[key] for key in ("type", "model", "temperature", "runs") if key in estimate})
+    if description["model"] is None and (match := _MODEL.search(name)):
+        description["model"] = match.group(0)
+    if description["temperature"] is None and (match := _TEMPERATURE.search(name)):
+        description["temperature"] = float(match.group(1))
+    return description
+
+
+def summarize_file(path: str, confidence: float = DEFAULT_CONFIDENCE) -> Dict[str, Any]:
+    """
+    Statistiques de violation d'un fichier de résultats (JSON, JSONL ou
+    magasin .cols), comme read_results.calculate_statistics.
+    """
+    summary = describe(path)
+    if path.rstrip(os.sep).endswith(STORE_SUFFIX):
+        store = ColumnarStore(path)
+        violations = np.asarray(store["violation"], dtype=float)
+        strong = np.asarray(store["strong"], dtype=bool)
+        skipped = 0
+        summary["type"] = summary["type"] or store.type
+    else:
+        items = load_results(path)
+        kept = [item for item in items if not item.get("skipped", False)]
+        violations = np.array([item.get("violation_metric") for item in kept], dtype=float)
+        strong = np.array([item.get("strong", False) for item in kept], dtype=bool)
+        skipped = len(items) - len(kept)
+        if items:
+            summary["type"] = summary["type"] or items[0].get("type")
+    valid = ~np.isnan(violations)
+    n = int(valid.sum())
+    n_strong = int(strong[valid].sum())
+    low, high = wilson_interval(n_strong, n, confidence)
+    summary.update({
+        "items": n,
+        "skipped": skipped,
+        "mean_violation": float(violations[valid].mean()) if n else None,
+        "strong": n_strong,
+        "strong_proportion": n_strong / n if n else None,
+        "interval_low": low,
+        "interval_high": high,
+    })
+    return summary
+
+
+def _modified(current: Dict[str, Any]) -> str:
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(current["mtime_ns"] / 1e9))
+
+
+def load_index(root: str) -> Dict[str, Any]:
+    path = os.path.join(root, INDEX_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    return index.get("files", {}) if index.get("version") == INDEX_VERSION else {}
+
+
+def save_index(root: str, entries: Dict[str, Any]):
+    path = os.path.join(root, INDEX_NAME)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump({"version": INDEX_VERSION, "files": entries}, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def update_index(root: str = RESULTS_ROOT, confidence: float = DEFAULT_CONFIDENCE) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Met à jour l'index des résumés de root/.results_index.json : un fichier
+    dont la date et la taille n'ont pas changé n'est pas relu ; sinon son
+    contenu est haché, et il n'est résumé à nouveau que si le hachage a
+    changé. Les fichiers disparus sont retirés de l'index.
+
+    Returns:
+        (une ligne de résumé par fichier, compteurs "reused", "rehashed",
+        "summarized" et "removed").
+    """
+    previous = load_index(root)
+    entries: Dict[str, Any] = {}
+    counts = {"reused": 0, "rehashed": 0, "summarized": 0, "removed": 0}
+    for path in find_result_files(root):
+        key = os.path.relpath(path, root)
+        entry = previous.get(key)
+        current = fingerprint(path)
+        if entry is not None and entry["confidence"] == confidence:
+            if all(entry[name] == value for name, value in current.items()):
+                entries[key] = entry
+                counts["reused"] += 1
+                continue
+            digest = content_hash(path)
+            if digest == entry["sha256"]:
+                # Fichier touché mais inchangé (copie, resynchronisation)
+                entries[key] = {**entry, **current, "summary": {**entry["summary"], "modified": _modified(current)}}
+                counts["rehashed"] += 1
+                continue
+        else:
+            digest = content_hash(path)
+        summary = summarize_file(path, confidence)
+        summary.update({"path": key, "modified": _modified(current)})
+        entries[key] = {**current, "sha256": digest, "confidence": confidence, "summary": summary}
+        counts["summarized"] += 1
+    counts["removed"] = len(set(previous) - set(entries))
+    save_index(root, entries)
+    return [entries[key]["summary"] for key in sorted(entries)], counts
+
+
+def filter_rows(
+    rows: Sequence[Dict[str, Any]],
+    check_types: Optional[Sequence[str]] = None,
+    models: Optional[Sequence[str]] = None,
+    temperatures: Optional[Sequence[float]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Garde les lignes d'une des vérifications, dont le modèle contient un des
+    noms donnés ("gpt-4" pour "gpt-4-0314") et d'une des températures.
+    """
+    return [
+        row for row in rows
+        if (not check_types or row["type"] in check_types)
+        and (not models or any(model in (row["model"] or "") for model in models))
+        and (not temperatures or (row["temperature"] is not None
+                                  and any(abs(row["temperature"] - t) < 1e-9 for t in temperatures)))
+    ]
+
+
+def write_csv(rows: Sequence[Dict[str, Any]], file: str):
+    with open(file, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tableau de synthèse de tous les fichiers de résultats.")
+    parser.add_argument("--results-dir", default=RESULTS_ROOT, help="Dossier parcouru récursivement")
+    parser.add_argument("--type", nargs="+", dest="check_types", help="Vérifications à garder (ex. negated_pair)")
+    parser.add_argument("--model", nargs="+", dest="models", help="Modèles à garder (ex. gpt-4)")
+    parser.add_argument("--temperature", nargs="+", type=float, dest="temperatures")
+    parser.add_argument("--confidence", type=float, default=DEFAULT_CONFIDENCE)
+    parser.add_argument("--csv", help="Écrit le tableau dans ce fichier CSV")
+    parser.add_argument("--json", help="Écrit le tableau dans ce fichier JSON")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows, counts = update_index(args.results_dir, args.confidence)
+    rows = filter_rows(rows, args.check_types, args.models, args.temperatures)
+    elapsed = time.perf_counter() - start
+
+    if args.csv:
+        write_csv(rows, args.csv)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=4)
+    print(f"{'fichier':<60} {'type':<19} {'modèle':<20} {'T':>4} {'n':>5} {'moy.':>7} {'fortes':>7} {'IC':>15}")
+    for row in rows:
+        mean = f"{row['mean_violation']:7.4f}" if row["mean_violation"] is not None else f"{'-':>7}"
+        strong = f"{100 * row['strong_proportion']:6.1f}%" if row["strong_proportion"] is not None else f"{'-':>7}"
+        temperature = f"{row['temperature']:4.1f}" if row["temperature"] is not None else f"{'-':>4}"
+        print(f"{row['path']:<60} {row['type'] or '-':<19} {row['model'] or '-':<20} {temperature} {row['items']:>5}"
+              f" {mean} {strong} [{100 * row['interval_low']:4.1f}, {100 * row['interval_high']:4.1f}]")
+    print(f"{len(rows)} fichiers en {1000 * elapsed:.0f} ms ({counts['summarized']} résumés, {counts['reused']} inchangés,"
+          f" {counts['rehashed']} re-hachés, {counts['removed']} retirés)")
@@ -0,0 +1,546 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import metrics
+from answer_parser import OK, count_reasons, get_parser
+from adaptive_sampling import DEFAULT_TOLERANCE, AdaptiveSettings, sample_adaptively
+from consistency_checks import STRONG_THRESHOLD, ConsistencyCheck, get_check, summarize_answers
+from experiment_io import (
+    append_results,
+    completed_questions,
+    finished_results,
+    load_question_set,
+    save_question_set,
+)
+from gpt_interface import (
+    DEFAULT_MAX_CONCURRENCY,
+    cache_stats,
+    chat_message,
+    close_backends,
+    enable_dedup,
+    enable_streaming,
+    gpt_query_many,
+    set_backend,
+    set_question_index,
+    set_rate_controller,
+    set_token_budget,
+)
+from sampling_plan import (
+    DEFAULT_CONFIDENCE,
+    DEFAULT_MARGIN,
+    DEFAULT_SEED,
+    draw_sample,
+    estimate,
+    precise_enough,
+    sample_size,
+    sequential_order,
+    stratum_key,
+)
+from question_index import build_index, data_files
+from question_loader import JSONStreamError, first_item, iter_question_items
+from rate_limiter import RateController
+from replay_backend import ReplayBackend
+from token_budget import DEFAULT_MAX_TOKENS, BudgetExceeded, TokenBudget, count_message_tokens, price
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(SRC_DIR)
+CONFIGS_DIR = os.path.join(SRC_DIR, "configs")
+RESULTS_ROOT = os.path.join(REPO_ROOT, "results")
+DATA_DIR = os.path.join(REPO_ROOT, "data")
+
+# Les configurations exécutées en parallèle (--parallel-configs) écrivent
+# leurs lignes une à une sous ce verrou
+_print_lock = threading.Lock()
+
+
+def _print(line: str):
+    with _print_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+
+def load_configs(file: str) -> List[Dict[str, Any]]:
+    """
+    Lit une liste de configurations d'expérience ; les chemins "file" sont
+    relatifs au fichier de configuration.
+    """
+    with open(file, 'r', encoding='utf-8') as f:
+        configs = json.load(f)
+    for config in configs:
+        config["file"] = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(file)), config["file"]))
+    return configs
+
+
+def load_items(file: str, check: ConsistencyCheck) -> List[Dict[str, Any]]:
+    """
+    Extrait les éléments (questions et champs propres à la vérification)
+    d'un fichier JSON de data/, sans décoder les réponses enregistrées.
+
+    Args:
+        file: Le chemin d'accès au fichier JSON d'entrée.
+        check: La vérification, qui fixe le nombre de questions attendu.
+
+    Returns:
+        Une liste de dictionnaires {"questions": (...), <champs>}.
+    """
+    try:
+        return list(iter_question_items(file, check.arity, extra_fields=check.fields))
+    except FileNotFoundError:
+        _print(f"Erreur : Le fichier '{file}' n'a pas été trouvé.")
+    except JSONStreamError as e:
+        _print(f"Erreur : Impossible de décoder le JSON du fichier '{file}' : {e}")
+    return []
+
+
+def detect_check(file: str) -> ConsistencyCheck:
+    """
+    Déduit la vérification du champ "type" du premier élément du fichier.
+    """
+    return get_check(first_item(file, fields=["type"])["type"])
+
+
+def plan_sample(config: Dict[str, Any], all_items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Échantillon de questions d'une configuration, reproductible ("seed").
+
+    La taille est "sample_size" si elle est donnée, sinon elle est déduite
+    de la taille du fichier, de "confidence" et de "margin" (cf. README.md).
+    "stratify" donne un champ des éléments (ou "n_questions") selon lequel
+    stratifier le tirage. En mode "sequential", tous les éléments sont
+    rangés dans un ordre aléatoire et traités jusqu'à ce que l'estimation
+    soit assez précise.
+    """
+    seed = config.get("seed", DEFAULT_SEED)
+    key = stratum_key(config.get("stratify"))
+    if config.get("sequential"):
+        return sequential_order(all_items, seed, key)
+    n = config.get("sample_size") or sample_size(
+        len(all_items), config.get("confidence", DEFAULT_CONFIDENCE), config.get("margin", DEFAULT_MARGIN)
+    )
+    return draw_sample(all_items, min(n, len(all_items)), seed, key)
+
+
+def group_samples(requests: List[Tuple[int, int, int]]) -> List[Tuple[int, int, int, int]]:
+    """
+    Regroupe des requêtes (élément, question, indice de tirage) en
+    (élément, question, premier indice, nombre de tirages consécutifs).
+    """
+    indices: Dict[Tuple[int, int], List[int]] = {}
+    for i, j, k in requests:
+        indices.setdefault((i, j), []).append(k)
+    groups = []
+    for (i, j), ks in indices.items():
+        ks.sort()
+        start = previous = ks[0]
+        for k in ks[1:] + [None]:
+            if k is not None and k == previous + 1:
+                previous = k
+                continue
+            groups.append((i, j, start, previous - start + 1))
+            if k is not None:
+                start = previous = k
+    return groups
+
+
+def config_description(config: Dict[str, Any], check: ConsistencyCheck) -> Dict[str, Any]:
+    """
+    Description de la configuration écrite dans estimate_<name>.json, lue
+    par results_index.py (au lieu d'interpréter le nom des fichiers).
+    """
+    return {"type": check.name, "model": config["model"], "temperature": config["temperature"],
+            "runs": config["run"]}
+
+
+def prompt_tokens(config: Dict[str, Any], system_prompt: str, item: Dict[str, Any]) -> int:
+    """
+    Tokens de prompt (prompt système compris) d'un tirage de toutes les
+    questions d'un élément.
+    """
+    return sum(
+        count_message_tokens([chat_message("system", system_prompt), chat_message("user", prompt)], config["model"])
+        for prompt in item["questions"]
+    )
+
+
+def estimate_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Estimation, sans aucune requête, des tokens et du coût d'une
+    configuration : les tokens de prompt sont comptés avec tiktoken, les
+    tokens de complétion sont majorés par max_tokens. En mode séquentiel,
+    tous les éléments sont comptés (majoration).
+    """
+    check = get_check(config["type"]) if "type" in config else detect_check(config["file"])
+    system_prompt = config.get("system_prompt", check.system_prompt)
+    items = plan_sample(config, load_items(config["file"], check))
+    max_tokens = config.get("max_tokens", DEFAULT_MAX_TOKENS)
+    n_queries = config["run"] * sum(len(item["questions"]) for item in items)
+    n_prompt_tokens = config["run"] * sum(prompt_tokens(config, system_prompt, item) for item in items)
+    return {
+        "name": config["name"],
+        "model": config["model"],
+        "items": len(items),
+        "queries": n_queries,
+        "prompt_tokens": n_prompt_tokens,
+        "max_completion_tokens": n_queries * max_tokens,
+        "max_cost": price(config["model"], n_prompt_tokens, n_queries * max_tokens),
+    }
+
+
+def score_batch(
+    check: ConsistencyCheck,
+    batch: List[Dict[str, Any]],
+    answers: List[List[List[str]]],
+    adaptive: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Extrait les réponses d'un lot, puis calcule médianes et violations
+    pour tout le lot en un seul appel vectorisé. En mode adaptatif, le
+    nombre de tirages de chaque question est ajouté dans "runs".
+    """
+    with metrics.registry.stage("parse"):
+        # Une seule extraction pour tout le lot ; les échecs sont comptés par raison
+        values, codes = get_parser(check.answer_kind).parse_many(
+            [r for item_answers in answers for prompt_answers in item_answers for r in prompt_answers]
+        )
+        metrics.registry.record_parse_failures(
+            {reason: count for reason, count in count_reasons(codes).items() if reason != OK}
+        )
+        flat = iter(values.tolist())
+        extracted = [
+            [[r for r in itertools.islice(flat, len(prompt_answers)) if not math.isnan(r)] for prompt_answers in item_answers]
+            for item_answers in answers
+        ]
+    with metrics.registry.stage("metric"):
+        summaries = [summarize_answers(item_extracted) for item_extracted in extracted]
+        width = max(len(item["questions"]) for item in batch)
+        medians = np.full((len(batch), width), np.nan)
+        for row, summary in enumerate(summaries):
+            medians[row, :len(summary["median"])] = [np.nan if m is None else m for m in summary["median"]]
+        violations = check.compute(medians, batch)
+
+    entries = []
+    for item, item_answers, item_extracted, summary, vm in zip(batch, answers, extracted, summaries, violations):
+        entry = {
+            "type": check.name,
+            "questions": list(item["questions"]),
+            "answers": item_answers,
+            "extracted_results": item_extracted,
+        }
+        entry.update({name: item[name] for name in check.fields})
+        if adaptive:
+            entry["runs"] = [len(prompt_answers) for prompt_answers in item_answers]
+        if not any(item_extracted):
+            # Marquée comme traitée pour --resume, mais exclue des résultats
+            entry["skipped"] = True
+        else:
+            entry.update(summary)
+            entry["violation_metric"] = float(vm)
+            entry["strong"] = bool(vm > STRONG_THRESHOLD)
+        entries.append(entry)
+    return entries
+
+
+def run_config(
+    config: Dict[str, Any],
+    results_root: str = RESULTS_ROOT,
+    resume: bool = False,
+    checkpoint_every: int = 8,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    adaptive: Optional[AdaptiveSettings] = None,
+    budget: Optional[TokenBudget] = None,
+    multi_sample: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Exécute une configuration (fichier, modèle, température, nombre de tirages)
+    pour n'importe quel type de vérification enregistré dans CHECKS.
+
+    Les résultats sont ajoutés lot par lot à output_<name>.jsonl, puis
+    rassemblés dans output_<name>.json à la fin ; la proportion de violations
+    fortes et son intervalle de confiance sont écrits dans
+    estimate_<name>.json (cf. sampling_plan.py). Avec adaptive (ou le champ
+    "adaptive" de la configuration), "run" devient un nombre maximal de
+    tirages par question (cf. adaptive_sampling.py).
+
+    La consommation de tokens est comptée dans un TokenBudget propre à la
+    configuration (plafonds "budget_tokens" et "budget_usd"), rattaché à
+    budget s'il est donné ; aucun lot n'est lancé s'il risque de dépasser
+    l'un des plafonds. Elle est écrite dans usage_<name>.json.
+
+    Avec multi_sample, les tirages d'un même prompt sont demandés en une
+    seule requête (paramètre n de l'API, cf. gpt_interface.agpt_query_samples).
+    """
+    start = time.perf_counter()
+    metrics.registry.set_context(config=config["name"])
+    adaptive = adaptive or AdaptiveSettings.from_config(config.get("adaptive"))
+    check = get_check(config["type"]) if "type" in config else detect_check(config["file"])
+    system_prompt = config.get("system_prompt", check.system_prompt)
+    results_dir = os.path.join(results_root, check.results_subdir)
+    os.makedirs(results_dir, exist_ok=True)
+    name = config["name"]
+    questions_file = os.path.join(results_dir, f"questions_{name}.json")
+    jsonl_file = os.path.join(results_dir, f"output_{name}.jsonl")
+
+    all_items = load_items(config["file"], check)
+    if resume and os.path.exists(questions_file):
+        items = load_question_set(questions_file)
+    else:
+        items = plan_sample(config, all_items) #cf README.md pour la taille des échantillons
+        save_question_set(questions_file, items)
+        open(jsonl_file, 'w', encoding='utf-8').close()
+    done = completed_questions(jsonl_file)
+    todo = [item for item in items if tuple(item["questions"]) not in done]
+    _print(f"{name} : {len(items) - len(todo)} questions déjà traitées, {len(todo)} restantes")
+    queries_sent = prompts_processed = 0
+    confidence = config.get("confidence", DEFAULT_CONFIDENCE)
+    finished = finished_results(jsonl_file)
+    strong_count = sum(entry["strong"] for entry in finished)
+    finished_count = len(finished)
+    max_tokens = config.get("max_tokens", DEFAULT_MAX_TOKENS)
+    config_budget = TokenBudget(config.get("budget_tokens"), config.get("budget_usd"), parent=budget)
+    set_token_budget(config_budget)
+
+    for batch_start in range(0, len(todo), checkpoint_every):
+        if config.get("sequential") and precise_enough(
+            strong_count, finished_count, len(all_items), confidence, config.get("margin", DEFAULT_MARGIN)
+        ):
+            _print(f"{name} : précision atteinte après {finished_count} questions")
+            break
+        batch = todo[batch_start:batch_start + checkpoint_every]
+        # Consommation maximale du lot : tous les tirages, complétions de max_tokens
+        batch_prompt_tokens = config["run"] * sum(prompt_tokens(config, system_prompt, item) for item in batch)
+        batch_completion_tokens = config["run"] * max_tokens * sum(len(item["questions"]) for item in batch)
+        if not config_budget.can_afford(config["model"], batch_prompt_tokens, batch_completion_tokens):
+            _print(f"{name} : budget atteint, {len(todo) - batch_start} questions non lancées (cf. --resume)")
+            break
+
+        def ask(requests: List[Tuple[int, int, int]]) -> List[str]:
+            # Toutes les requêtes (question, prompt, run) partent en parallèle ;
+            # les réponses reviennent dans l'ordre de la liste. Les tirages
+            # consécutifs d'un même prompt partent en une requête (paramètre n).
+            groups = group_samples(requests) if multi_sample else [(i, j, k, 1) for i, j, k in requests]
+            queries = [
+                {"model_name": config["model"], "temperature": config["temperature"], "max_tokens": max_tokens,
+                 "prompt": batch[i]["questions"][j], "system_prompt": system_prompt, "sample_index": k,
+                 "backend": config.get("backend"), **({"n": n} if multi_sample else {})}
+                for i, j, k, n in groups
+            ]
+            with metrics.registry.stage("api"):
+                responses = gpt_query_many(queries, max_concurrency=max_concurrency)
+            if not multi_sample:
+                return responses
+            by_request = {
+                (i, j, k + offset): response
+                for (i, j, k, _), samples in zip(groups, responses)
+                for offset, response in enumerate(samples)
+            }
+            return [by_request[request] for request in requests]
+
+        try:
+            if adaptive:
+                answers = sample_adaptively(check, batch, ask, config["run"], adaptive, config["temperature"])
+            else:
+                requests = [
+                    (i, j, k)
+                    for i, item in enumerate(batch)
+                    for k in range(config["run"])
+                    for j in range(len(item["questions"]))
+                ]
+                answers = [[[] for _ in item["questions"]] for item in batch]
+                for (i, j, _), response in zip(requests, ask(requests)):
+                    answers[i][j].append(response)
+        except BudgetExceeded as e:
+            _print(f"{name} : {e}, lot abandonné (cf. --resume)")
+            break
+        prompts_processed += sum(len(item["questions"]) for item in batch)
+        queries_sent += sum(len(prompt_answers) for item_answers in answers for prompt_answers in item_answers)
+        entries = score_batch(check, batch, answers, adaptive=adaptive is not None)
+        with metrics.registry.stage("serialize"):
+            append_results(jsonl_file, entries)
+        strong_count += sum(entry.get("strong", False) for entry in entries)
+        finished_count += sum(not entry.get("skipped", False) for entry in entries)
+    if adaptive and prompts_processed:
+        fixed = config["run"] * prompts_processed
+        _print(f"{name} : {queries_sent} requêtes au lieu de {fixed} ({100 * (1 - queries_sent / fixed):.1f} % d'économie)")
+    set_token_budget(None)
+    usage = config_budget.stats()
+    _print(f"{name} : {usage['calls']} appels, {usage['prompt_tokens']} + {usage['completion_tokens']} tokens"
+           f" ({usage['cost']:.4f} $), {usage['cached_calls']} réponses en cache")
+    if cache_stats() is not None:
+        _print(f"{name} : cache {cache_stats()}")
+
+    all_results_data = finished_results(jsonl_file)
+    _print(f"{name} : {len(all_results_data)} résultats en {time.perf_counter() - start:.2f} s")
+    summary = estimate(sum(entry["strong"] for entry in all_results_data), len(all_results_data),
+                       len(all_items), confidence)
+    summary.update({"seed": config.get("seed", DEFAULT_SEED), "sequential": bool(config.get("sequential"))})
+    summary.update(config_description(config, check))
+    if all_results_data:
+        low, high = summary["interval"]
+        _print(f"{name} : violations fortes {100 * summary['strong_proportion']:.1f} %"
+               f" [{100 * low:.1f} %, {100 * high:.1f} %] (confiance {100 * confidence:.0f} %,"
+               f" N = {len(all_items)})")
+    try:
+        with metrics.registry.stage("serialize"), \
+                open(os.path.join(results_dir, f"output_{name}.json"), 'w', encoding='utf-8') as f:
+            json.dump(all_results_data, f, indent=4, ensure_ascii=False)
+        with open(os.path.join(results_dir, f"estimate_{name}.json"), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=4)
+        with open(os.path.join(results_dir, f"usage_{name}.json"), 'w', encoding='utf-8') as f:
+            json.dump(usage, f, indent=4)
+    except IOError as e:
+        _print(f"{name} : erreur lors de l'écriture dans le fichier JSON : {e}")
+    metrics.registry.set_context()
+    return all_results_data
+
+
+def add_run_arguments(parser: argparse.ArgumentParser):
+    """
+    Options communes à run_checks.py et aux scripts de chaque vérification.
+    """
+    parser.add_argument("--replay", metavar="DATA_DIR",
+                        help="Rejoue les réponses enregistrées dans DATA_DIR au lieu d'appeler l'API")
+    parser.add_argument("--replay-latency", type=float, default=0.0,
+                        help="Latence simulée par requête en mode replay (secondes)")
+    parser.add_argument("--replay-error-rate", type=float, default=0.0,
+                        help="Probabilité d'injecter une erreur serveur en mode replay")
+    parser.add_argument("--rpm", type=float,
+                        help="Limite de requêtes par minute du fournisseur, pour chaque modèle")
+    parser.add_argument("--tpm", type=float,
+                        help="Limite de tokens par minute du fournisseur, pour chaque modèle")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reprend une expérience interrompue à partir des fichiers de results/")
+    parser.add_argument("--checkpoint-every", type=int, default=8,
+                        help="Nombre de questions par lot écrit dans le fichier JSONL")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="Nombre maximal de requêtes simultanées")
+    parser.add_argument("--parallel-configs", type=int, default=1,
+                        help="Nombre de configurations exécutées simultanément (chacune avec"
+                             " --max-concurrency requêtes en vol au plus)")
+    parser.add_argument("--dedup", action="store_true",
+                        help="Une requête identique (modèle, prompt, température, tirage) à une requête"
+                             " déjà envoyée par une configuration reçoit la même réponse sans nouvel appel")
+    parser.add_argument("--question-index", action="store_true",
+                        help="Les prompts identiques, à la casse, aux espaces et aux guillemets près, à une"
+                             " question de data/ ou à un prompt déjà envoyé partagent cache et réponses"
+                             " (cf. question_index.py)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Reçoit les complétions en flux et coupe chacune dès la ligne [Answer] lue")
+    parser.add_argument("--results-dir", default=RESULTS_ROOT,
+                        help="Dossier racine des résultats")
+    parser.add_argument("--seed", type=int,
+                        help="Graine du tirage des questions (remplace le champ \"seed\" des configurations)")
+    parser.add_argument("--sequential", action="store_true",
+                        help="Tire les questions par lots jusqu'à ce que l'intervalle de confiance sur la"
+                             " proportion de violations fortes atteigne la marge visée")
+    parser.add_argument("--budget-tokens", type=int,
+                        help="Plafond de tokens (prompt et complétion) pour l'ensemble des configurations")
+    parser.add_argument("--budget-usd", type=float,
+                        help="Plafond de coût en dollars pour l'ensemble des configurations")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Estime tokens et coût de chaque configuration sans envoyer de requête")
+    parser.add_argument("--no-multi-sample", dest="multi_sample", action="store_false",
+                        help="Envoie une requête par tirage au lieu d'utiliser le paramètre n de l'API")
+    parser.add_argument("--progress", action="store_true",
+                        help="Affiche une ligne de progression (requêtes, débit, relances)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Arrête les tirages d'une question dès que sa médiane est stable ou que la"
+                             " violation est tranchée par rapport au seuil ; \"run\" devient un maximum")
+    parser.add_argument("--adaptive-min-runs", type=int,
+                        help="Tirages initiaux par question en mode adaptatif (défaut : 2 à T=0, 3 sinon)")
+    parser.add_argument("--adaptive-tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Largeur maximale des réponses d'une question stable en mode adaptatif")
+
+
+def print_estimates(configs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    estimates = [estimate_config(config) for config in configs]
+    print(f"{'configuration':<28} {'questions':>9} {'requêtes':>9} {'tokens prompt':>14} {'complétion max':>15} {'coût max':>10}")
+    for e in estimates:
+        cost = "?" if e["max_cost"] is None else f"{e['max_cost']:.2f} $"
+        print(f"{e['name']:<28} {e['items']:>9} {e['queries']:>9} {e['prompt_tokens']:>14}"
+              f" {e['max_completion_tokens']:>15} {cost:>10}")
+    total_cost = sum(e["max_cost"] or 0.0 for e in estimates)
+    print(f"Total : {sum(e['queries'] for e in estimates)} requêtes,"
+          f" {sum(e['prompt_tokens'] + e['max_completion_tokens'] for e in estimates)} tokens au plus,"
+          f" {total_cost:.2f} $ au plus")
+    return estimates
+
+
+def run_configs(configs: List[Dict[str, Any]], args: argparse.Namespace) -> Dict[str, List[Dict[str, Any]]]:
+    overrides = {}
+    if args.seed is not None:
+        overrides["seed"] = args.seed
+    if args.sequential:
+        overrides["sequential"] = True
+    configs = [{**config, **overrides} for config in configs]
+    if args.dry_run:
+        print_estimates(configs)
+        return {}
+    if args.replay:
+        set_backend(ReplayBackend(args.replay, latency=args.replay_latency, error_rate=args.replay_error_rate))
+    set_rate_controller(RateController(args.rpm, args.tpm))
+    adaptive = None
+    if args.adaptive:
+        adaptive = AdaptiveSettings(min_runs=args.adaptive_min_runs, tolerance=args.adaptive_tolerance)
+    budget = TokenBudget(args.budget_tokens, args.budget_usd)
+    metrics.enable_progress(args.progress)
+    enable_dedup(args.dedup)
+    enable_streaming(args.stream)
+    set_question_index(build_index(data_files(DATA_DIR)) if args.question_index else None)
+
+    def run_one(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with metrics.registry.stage("config"):
+            return run_config(
+                config,
+                results_root=args.results_dir,
+                resume=args.resume,
+                checkpoint_every=args.checkpoint_every,
+                max_concurrency=args.max_concurrency,
+                adaptive=adaptive,
+                budget=budget,
+                multi_sample=args.multi_sample,
+            )
+
+    results = {}
+    try:
+        if args.parallel_configs > 1:
+            # Chaque configuration tourne dans son thread, avec sa boucle
+            # d'événements (fermée par close_backends) ; backends,
+            # régulateur et cache sont partagés
+            with ThreadPoolExecutor(max_workers=args.parallel_configs) as pool:
+                for config, result in zip(configs, pool.map(run_one, configs)):
+                    results[config["name"]] = result
+        else:
+            for config in configs:
+                results[config["name"]] = run_one(config)
+    finally:
+        # Exporté même après une interruption, pour diagnostiquer une exécution lente
+        if metrics.registry.progress is not None:
+            metrics.registry.progress.close(metrics.registry)
+        os.makedirs(args.results_dir, exist_ok=True)
+        metrics.registry.write(
+            prometheus_file=os.path.join(args.results_dir, "metrics.prom"),
+            json_file=os.path.join(args.results_dir, "metrics.json"),
+        )
+        close_backends()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exécute des vérifications de cohérence de tout type.")
+    parser.add_argument("configs", nargs="+",
+                        help="Fichiers de configuration JSON (ex. configs/paraphrases.json)")
+    add_run_arguments(parser)
+    args = parser.parse_args()
+
+    configs = [config for file in args.configs for config in load_configs(file)]
+    run_configs(configs, args)
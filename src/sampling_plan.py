@@ -0,0 +1,191 @@
+import argparse
+import math
+import random
+from statistics import NormalDist
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Valeurs du README.md : niveau de confiance de 90 %, marge d'erreur de ±8 %
+DEFAULT_CONFIDENCE = 0.90
+DEFAULT_MARGIN = 0.08
+DEFAULT_SEED = 0
+# Nombre minimal de résultats avant d'évaluer le critère d'arrêt séquentiel
+MIN_SEQUENTIAL_SIZE = 10
+
+
+def z_score(confidence: float) -> float:
+    """
+    Score Z bilatéral du niveau de confiance (1.645 pour 90 %, 1.96 pour 95 %).
+    """
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+
+def sample_size(
+    population: int,
+    confidence: float = DEFAULT_CONFIDENCE,
+    margin: float = DEFAULT_MARGIN,
+    p: float = 0.5,
+) -> int:
+    """
+    Taille d'échantillon pour estimer une proportion dans une population
+    finie (formule du README.md) :
+
+        n = N z² p(1 - p) / (e² (N - 1) + z² p(1 - p))
+
+    Args:
+        population: Taille N de la population (nombre de questions du fichier).
+        confidence: Niveau de confiance.
+        margin: Marge d'erreur e souhaitée.
+        p: Proportion estimée (0.5 : cas le plus défavorable).
+
+    Returns:
+        n, arrondi comme dans le tableau du README.md (175 -> 66, 104 -> 53,
+        51 -> 35, 50 -> 34 à 90 % et ±8 %).
+    """
+    if population <= 1:
+        return population
+    variance = z_score(confidence) ** 2 * p * (1 - p)
+    n = population * variance / (margin ** 2 * (population - 1) + variance)
+    return min(population, max(1, round(n)))
+
+
+def finite_population_correction(n: int, population: Optional[int]) -> float:
+    if population is None or population <= 1:
+        return 1.0
+    return max(0.0, (population - n) / (population - 1))
+
+
+def wilson_interval(
+    successes: int,
+    n: int,
+    confidence: float = DEFAULT_CONFIDENCE,
+    population: Optional[int] = None,
+) -> Tuple[float, float]:
+    """
+    Intervalle de Wilson d'une proportion, avec correction de population
+    finie quand population est donnée (la variance est multipliée par
+    (N - n) / (N - 1), l'intervalle se réduit à un point quand n = N).
+    """
+    if n == 0:
+        return 0.0, 1.0
+    p = successes / n
+    z2 = z_score(confidence) ** 2 * finite_population_correction(n, population)
+    center = (p + z2 / (2 * n)) / (1 + z2 / n)
+    half_width = math.sqrt(p * (1 - p) / n + z2 / (4 * n ** 2)) * math.sqrt(z2) / (1 + z2 / n)
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+
+def _strata(items: Sequence[Any], key: Optional[Callable[[Any], Any]]) -> Dict[Any, List[int]]:
+    strata: Dict[Any, List[int]] = {}
+    for index, item in enumerate(items):
+        strata.setdefault(key(item) if key else None, []).append(index)
+    return strata
+
+
+def stratum_key(name: Optional[str]) -> Optional[Callable[[Any], Any]]:
+    """
+    Clé de stratification d'une configuration : un champ des éléments
+    (ex. "direction"), ou "n_questions" pour le nombre de questions.
+    """
+    if not name:
+        return None
+    if name == "n_questions":
+        return lambda item: len(item["questions"])
+    return lambda item: item[name]
+
+
+def draw_sample(
+    items: Sequence[Any],
+    n: int,
+    seed: int = DEFAULT_SEED,
+    key: Optional[Callable[[Any], Any]] = None,
+) -> List[Any]:
+    """
+    Tire n éléments sans remise, de façon reproductible. Avec key, le tirage
+    est stratifié : chaque strate reçoit une part proportionnelle à sa
+    taille (méthode des plus forts restes).
+    """
+    rng = random.Random(seed)
+    strata = _strata(items, key)
+    quotas = {s: n * len(indices) / len(items) for s, indices in strata.items()}
+    allocation = {s: int(q) for s, q in quotas.items()}
+    remainders = sorted(strata, key=lambda s: quotas[s] - allocation[s], reverse=True)
+    for s in remainders[:n - sum(allocation.values())]:
+        allocation[s] += 1
+    chosen = sorted(index for s, indices in strata.items() for index in rng.sample(indices, allocation[s]))
+    rng.shuffle(chosen)
+    return [items[index] for index in chosen]
+
+
+def sequential_order(
+    items: Sequence[Any],
+    seed: int = DEFAULT_SEED,
+    key: Optional[Callable[[Any], Any]] = None,
+) -> List[Any]:
+    """
+    Ordre aléatoire reproductible de tous les éléments, à traiter par lots
+    en mode séquentiel. Avec key, chaque préfixe de l'ordre reste
+    (approximativement) proportionnel aux strates : le k-ième élément
+    d'une strate de taille m reçoit la position (k + u) / m, u uniforme.
+    """
+    rng = random.Random(seed)
+    positions = []
+    for indices in _strata(items, key).values():
+        rng.shuffle(indices)
+        positions.extend(((k + rng.random()) / len(indices), index) for k, index in enumerate(indices))
+    return [items[index] for _, index in sorted(positions)]
+
+
+def estimate(
+    strong: int,
+    n: int,
+    population: int,
+    confidence: float = DEFAULT_CONFIDENCE,
+) -> Dict[str, Any]:
+    """
+    Proportion de violations fortes de l'échantillon et son intervalle de
+    confiance sur la population.
+    """
+    low, high = wilson_interval(strong, n, confidence, population)
+    proportion = strong / n if n else 0.5
+    return {
+        "population": population,
+        "sample_size": n,
+        "strong": strong,
+        "strong_proportion": strong / n if n else None,
+        "confidence": confidence,
+        "interval": [low, high],
+        # L'intervalle de Wilson n'est pas centré sur la proportion observée :
+        # la marge est l'écart au bord le plus éloigné (le « ± » du README.md)
+        "margin": max(proportion - low, high - proportion),
+    }
+
+
+def precise_enough(
+    strong: int,
+    n: int,
+    population: int,
+    confidence: float = DEFAULT_CONFIDENCE,
+    margin: float = DEFAULT_MARGIN,
+) -> bool:
+    """
+    Critère d'arrêt séquentiel : l'intervalle de Wilson (corrigé pour la
+    population finie) est à moins de margin de part et d'autre de la
+    proportion observée.
+    """
+    if n >= population:
+        return True
+    if n < MIN_SEQUENTIAL_SIZE:
+        return False
+    return estimate(strong, n, population, confidence)["margin"] <= margin
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Taille d'échantillon pour une population finie (cf. README.md).")
+    parser.add_argument("population", type=int, nargs="+")
+    parser.add_argument("--confidence", type=float, default=DEFAULT_CONFIDENCE)
+    parser.add_argument("--margin", type=float, default=DEFAULT_MARGIN)
+    args = parser.parse_args()
+
+    for population in args.population:
+        print(f"N = {population} : n = {sample_size(population, args.confidence, args.margin)}"
+              f" (confiance {args.confidence:.0%}, marge ±{args.margin:.0%})")
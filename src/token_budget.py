@@ -0,0 +1,163 @@
+import logging
+import math
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import tiktoken
+
+# Budget de complétion des fichiers de data/ (suffixe "mt_400")
+DEFAULT_MAX_TOKENS = 400
+
+# Prix en dollars pour 1000 tokens (prompt, complétion), par préfixe de modèle ;
+# le préfixe le plus long l'emporte. À mettre à jour selon le fournisseur.
+PRICES_PER_1K = {
+    "gpt-3.5-turbo": (0.0015, 0.002),
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-32k": (0.06, 0.12),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.0025, 0.01),
+}
+
+# Tokens ajoutés par message et pour amorcer la réponse (format chat d'OpenAI)
+TOKENS_PER_MESSAGE = 3
+TOKENS_REPLY_PRIMING = 3
+# Approximation utilisée si l'encodage tiktoken n'est pas disponible (hors-ligne)
+CHARS_PER_TOKEN = 4
+
+
+class BudgetExceeded(RuntimeError):
+    """Le budget (tokens ou dollars) d'une expérience est épuisé."""
+
+
+@lru_cache(maxsize=None)
+def _encoding(model_name: str) -> Optional[Any]:
+    try:
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            # Modèle inconnu de tiktoken (ex. nom de modèle OpenRouter)
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # Les encodages sont téléchargés au premier usage : hors-ligne, on estime
+        logging.warning(f"Encodage tiktoken indisponible ({type(e).__name__}) : estimation à {CHARS_PER_TOKEN} caractères par token.")
+        return None
+
+
+def count_tokens(text: str, model_name: str = "gpt-3.5-turbo") -> int:
+    encoding = _encoding(model_name)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+def count_message_tokens(messages: List[Dict[str, str]], model_name: str = "gpt-3.5-turbo") -> int:
+    """
+    Nombre de tokens du prompt d'une requête chat (prompt système compris).
+    """
+    return TOKENS_REPLY_PRIMING + sum(
+        TOKENS_PER_MESSAGE + count_tokens(message["role"], model_name) + count_tokens(message["content"], model_name)
+        for message in messages
+    )
+
+
+def price(model_name: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """
+    Coût en dollars, ou None si le modèle n'a pas de prix dans PRICES_PER_1K.
+    """
+    prefixes = [p for p in PRICES_PER_1K if model_name.startswith(p)]
+    if not prefixes:
+        return None
+    prompt_price, completion_price = PRICES_PER_1K[max(prefixes, key=len)]
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+
+class TokenBudget:
+    """
+    Comptabilité des tokens d'une expérience, avec plafond optionnel.
+
+    Args:
+        max_tokens: Plafond sur le total des tokens (prompt et complétion).
+        max_cost: Plafond en dollars (cf. PRICES_PER_1K).
+        parent: Budget englobant (ex. celui de toutes les configurations
+                d'une exécution), qui reçoit aussi chaque consommation et
+                dont le plafond s'applique également.
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        max_cost: Optional[float] = None,
+        parent: Optional["TokenBudget"] = None,
+    ):
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.parent = parent
+        self.calls = 0
+        self.cached_calls = 0
+        self.estimated_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def record(self, model_name: str, prompt_tokens: int, completion_tokens: int, estimated: bool = False):
+        """
+        Enregistre la consommation d'un appel (usage renvoyé par l'API, ou
+        estimation avec tiktoken si estimated).
+        """
+        with self._lock:
+            self.calls += 1
+            self.estimated_calls += int(estimated)
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cost += price(model_name, prompt_tokens, completion_tokens) or 0.0
+        if self.parent is not None:
+            self.parent.record(model_name, prompt_tokens, completion_tokens, estimated)
+
+    def record_cached(self):
+        with self._lock:
+            self.cached_calls += 1
+        if self.parent is not None:
+            self.parent.record_cached()
+
+    def can_afford(self, model_name: str, prompt_tokens: int, completion_tokens: int) -> bool:
+        """
+        Vérifie qu'un travail dont la consommation maximale est donnée tient
+        dans ce qui reste du budget.
+        """
+        if self.max_tokens is not None and self.total_tokens + prompt_tokens + completion_tokens > self.max_tokens:
+            return False
+        if self.max_cost is not None:
+            cost = price(model_name, prompt_tokens, completion_tokens) or 0.0
+            if self.cost + cost > self.max_cost:
+                return False
+        return self.parent is None or self.parent.can_afford(model_name, prompt_tokens, completion_tokens)
+
+    def check(self):
+        """
+        Lève BudgetExceeded si le plafond est déjà atteint.
+        """
+        if self.max_tokens is not None and self.total_tokens >= self.max_tokens:
+            raise BudgetExceeded(f"Budget de {self.max_tokens} tokens épuisé ({self.total_tokens} utilisés)")
+        if self.max_cost is not None and self.cost >= self.max_cost:
+            raise BudgetExceeded(f"Budget de {self.max_cost:.2f} $ épuisé ({self.cost:.2f} $ utilisés)")
+        if self.parent is not None:
+            self.parent.check()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "cached_calls": self.cached_calls,
+            "estimated_calls": self.estimated_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "cost": round(self.cost, 6),
+            "max_tokens": self.max_tokens,
+            "max_cost": self.max_cost,
+        }
@@ -0,0 +1,194 @@
+import argparse
+import itertools
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from question_loader import iter_json_array
+
+# Script d'édition mot à mot : "0" (mot conservé), "-" (supprimé), "+" (ajouté)
+Edits = List[str]
+
+
+def _word_masks(words: Sequence[str]) -> Dict[str, int]:
+    """
+    Pour chaque mot, le masque des positions où il apparaît (bit j : words[j]).
+    """
+    masks: Dict[str, int] = {}
+    for j, word in enumerate(words):
+        masks[word] = masks.get(word, 0) | (1 << j)
+    return masks
+
+
+def word_edits(string1: str, string2: str) -> Edits:
+    """
+    Script d'édition (ajouts et suppressions de mots uniquement) pour passer
+    de string1 à string2, identique à celui de la table de Levenshtein
+    complète (_table_edits), mais calculé par plus longue sous-séquence
+    commune bit-parallèle : une ligne de la table tient dans un entier de
+    len(string2) bits, et chaque ligne coûte quelques opérations sur cet
+    entier au lieu de len(string2) accès à un dictionnaire.
+    """
+    words1 = string1.split(" ")
+    words2 = string2.split(" ")
+    n, m = len(words1), len(words2)
+    full = (1 << m) - 1
+    masks = _word_masks(words2)
+
+    # rows[i] : bits de la ligne i ; la longueur de la sous-séquence commune
+    # de words1[:i] et words2[:j] est le nombre de bits nuls parmi les j premiers
+    rows = [full]
+    v = full
+    for word in words1:
+        u = v & masks.get(word, 0)
+        v = ((v + u) | (v - u)) & full
+        rows.append(v)
+
+    def lcs(i: int, j: int) -> int:
+        return j - (rows[i] & ((1 << j) - 1)).bit_count()
+
+    edits = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        if i == 0:
+            edits.append("+")
+            j -= 1
+        elif j == 0:
+            edits.append("-")
+            i -= 1
+        elif words1[i - 1] == words2[j - 1]:
+            edits.append("0")
+            i -= 1
+            j -= 1
+        # distance(i - 1, j) <= distance(i, j - 1), où distance = i + j - 2 * lcs
+        elif lcs(i - 1, j) >= lcs(i, j - 1):
+            edits.append("-")
+            i -= 1
+        else:
+            edits.append("+")
+            j -= 1
+    return edits[::-1]
+
+
+def _table_edits(string1: str, string2: str) -> Edits:
+    """
+    Ancienne implémentation (table complète dans un dictionnaire), gardée
+    comme référence pour la vérification et le banc d'essai.
+    """
+    distance_dict: Dict[Tuple[int, int], int] = {}
+    sentence1 = string1.split(" ")
+    sentence2 = string2.split(" ")
+    for i in range(len(sentence1) + 1):
+        distance_dict[(i, 0)] = i
+    for j in range(len(sentence2) + 1):
+        distance_dict[(0, j)] = j
+    for i in range(1, len(sentence1) + 1):
+        for j in range(1, len(sentence2) + 1):
+            if sentence1[i - 1] == sentence2[j - 1]:
+                distance_dict[(i, j)] = distance_dict[(i - 1, j - 1)]
+            else:
+                distance_dict[(i, j)] = min(distance_dict[(i - 1, j)] + 1, distance_dict[(i, j - 1)] + 1)
+
+    edits = []
+    i, j = len(sentence1), len(sentence2)
+    while i > 0 or j > 0:
+        if i == 0:
+            edits.append("+")
+            j -= 1
+        elif j == 0:
+            edits.append("-")
+            i -= 1
+        elif sentence1[i - 1] == sentence2[j - 1]:
+            edits.append("0")
+            i -= 1
+            j -= 1
+        elif distance_dict[(i - 1, j)] <= distance_dict[(i, j - 1)]:
+            edits.append("-")
+            i -= 1
+        else:
+            edits.append("+")
+            j -= 1
+    return edits[::-1]
+
+
+def batch_edits(pairs: Sequence[Tuple[str, str]]) -> List[Edits]:
+    """
+    Scripts d'édition d'une liste de paires de phrases ; une paire qui
+    revient (même question dans plusieurs fichiers) n'est calculée qu'une fois.
+    """
+    computed: Dict[Tuple[str, str], Edits] = {}
+    results = []
+    for pair in pairs:
+        if pair not in computed:
+            computed[pair] = word_edits(*pair)
+        results.append(computed[pair])
+    return results
+
+
+def paraphrase_pairs(file: str) -> Iterator[Tuple[int, int, int, str, str]]:
+    """
+    Toutes les paires de paraphrases d'un fichier large_paraphrases_* :
+    (indice de l'élément, indice de la première question, de la seconde,
+    première question, seconde question).
+    """
+    for index, (_, item) in enumerate(iter_json_array(file, fields=["questions"])):
+        for (p, first), (q, second) in itertools.combinations(enumerate(item["questions"]), 2):
+            yield index, p, q, first, second
+
+
+def diff_paraphrase_file(file: str) -> List[Dict[str, Any]]:
+    """
+    Scripts d'édition de toutes les paires de paraphrases d'un fichier.
+
+    Returns:
+        Une entrée {"item", "pair", "edits"} par paire (6 pour un quadruplet).
+    """
+    pairs = list(paraphrase_pairs(file))
+    edits = batch_edits([(first, second) for _, _, _, first, second in pairs])
+    return [
+        {"item": index, "pair": (p, q), "edits": pair_edits}
+        for (index, p, q, _, _), pair_edits in zip(pairs, edits)
+    ]
+
+
+def benchmark(file: str, repeat: int = 3, scale: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Compare word_edits et _table_edits sur toutes les paires d'un fichier
+    (résultats identiques exigés), puis sur des phrases scale fois plus
+    longues (questions de plusieurs phrases).
+    """
+    pairs = [(first, second) for _, _, _, first, second in paraphrase_pairs(file)]
+    if scale:
+        pairs = [(" ".join([first] * scale), " ".join([second] * scale)) for first, second in pairs]
+
+    def timed(function: Any) -> Tuple[float, List[Edits]]:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            results = [function(first, second) for first, second in pairs]
+        return (time.perf_counter() - start) / repeat, results
+
+    table_seconds, expected = timed(_table_edits)
+    seconds, results = timed(word_edits)
+    mismatches = sum(1 for a, b in zip(expected, results) if a != b)
+    return {
+        "pairs": len(pairs),
+        "mean_words": sum(len(first.split(" ")) + len(second.split(" ")) for first, second in pairs) / (2 * len(pairs)),
+        "table_seconds": table_seconds,
+        "bitparallel_seconds": seconds,
+        "speedup": table_seconds / seconds if seconds else None,
+        "mismatches": mismatches,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banc d'essai du diff mot à mot des paraphrases.")
+    parser.add_argument("file", help="Fichier large_paraphrases_*.json")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes chronométrées (défaut : 3)")
+    parser.add_argument("--scale", type=int, nargs="*", default=[1, 4],
+                        help="Facteurs de longueur des phrases (défaut : 1 4)")
+    args = parser.parse_args()
+
+    for scale in args.scale:
+        result = benchmark(args.file, args.repeat, scale)
+        print(f"×{scale} : {result['pairs']} paires de {result['mean_words']:.0f} mots en moyenne,"
+              f" table {result['table_seconds'] * 1000:.1f} ms, bit-parallèle {result['bitparallel_seconds'] * 1000:.1f} ms"
+              f" (×{result['speedup']:.1f}), {result['mismatches']} différences")
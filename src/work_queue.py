@@ -0,0 +1,450 @@
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from consistency_checks import get_check
+from experiment_io import save_question_set
+from experiment_matrix import is_matrix, load_matrix
+from gpt_interface import DEFAULT_MAX_CONCURRENCY, gpt_query_many, set_backend, set_rate_controller
+from rate_limiter import RateController
+from run_checks import (
+    RESULTS_ROOT,
+    config_description,
+    detect_check,
+    group_samples,
+    load_configs,
+    load_items,
+    plan_sample,
+    score_batch,
+)
+from sampling_plan import DEFAULT_CONFIDENCE, DEFAULT_SEED, estimate
+from token_budget import DEFAULT_MAX_TOKENS
+
+# Durée (secondes) d'un bail : passé ce délai sans battement de cœur, la
+# tâche est considérée abandonnée et peut être reprise par un autre worker
+DEFAULT_LEASE_SECONDS = 120.0
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_MAX_ATTEMPTS = 3
+# Attente entre deux tentatives de prise quand toutes les tâches restantes sont louées
+POLL_SECONDS = 2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS experiments (
+    name TEXT PRIMARY KEY,
+    config TEXT NOT NULL,
+    items TEXT NOT NULL,
+    population INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    experiment TEXT NOT NULL,
+    item INTEGER NOT NULL,
+    question INTEGER NOT NULL,
+    sample INTEGER NOT NULL,
+    prompt TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    UNIQUE (experiment, item, question, sample)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_expires);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    host TEXT,
+    pid INTEGER,
+    started REAL,
+    heartbeat REAL,
+    jobs_done INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """
+    Connexion à la file (transactions explicites). Plusieurs processus, ou
+    plusieurs machines si le système de fichiers partagé gère les verrous,
+    peuvent ouvrir le même fichier.
+    """
+    conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout = 60000")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def plan(path: str, configs: List[Dict[str, Any]], max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> int:
+    """
+    Écrit dans la file l'échantillon de chaque configuration (tiré avec sa
+    graine "seed", cf. run_checks.plan_sample) et une tâche par (élément,
+    question, tirage). Replanifier une configuration déjà présente ne
+    change rien.
+
+    Returns:
+        Le nombre de tâches ajoutées.
+    """
+    conn = connect(path)
+    added = 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('max_attempts', ?)", (str(max_attempts),))
+        for config in configs:
+            if conn.execute("SELECT 1 FROM experiments WHERE name = ?", (config["name"],)).fetchone():
+                print(f"{config['name']} : déjà planifiée")
+                continue
+            check = get_check(config["type"]) if "type" in config else detect_check(config["file"])
+            all_items = load_items(config["file"], check)
+            items = plan_sample(config, all_items)
+            conn.execute(
+                "INSERT INTO experiments VALUES (?, ?, ?, ?)",
+                (config["name"], json.dumps({**config, "type": check.name}), json.dumps(items), len(all_items)),
+            )
+            jobs = [
+                (config["name"], i, j, k, prompt)
+                for i, item in enumerate(items)
+                for j, prompt in enumerate(item["questions"])
+                for k in range(config["run"])
+            ]
+            conn.executemany(
+                "INSERT INTO jobs (experiment, item, question, sample, prompt) VALUES (?, ?, ?, ?, ?)", jobs
+            )
+            added += len(jobs)
+            print(f"{config['name']} : {len(items)} questions, {len(jobs)} tâches")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return added
+
+
+class Worker:
+    """
+    Prend des tâches par lots sous bail, les exécute avec gpt_query_many
+    (tirages consécutifs d'un même prompt regroupés avec le paramètre n) et
+    enregistre les réponses. Un thread renouvelle les baux tant que le lot
+    est en cours ; si le worker meurt, ses tâches sont reprises par un autre
+    à l'expiration du bail.
+
+    Args:
+        path: Fichier SQLite de la file.
+        batch_size: Nombre de tâches prises à la fois.
+        lease_seconds: Durée d'un bail.
+        max_concurrency: Requêtes simultanées au plus.
+        multi_sample: Regroupe les tirages d'un même prompt (paramètre n).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        multi_sample: bool = True,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.max_concurrency = max_concurrency
+        self.multi_sample = multi_sample
+        self.id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.conn = connect(path)
+        self.experiments: Dict[str, Dict[str, Any]] = {}
+        self._stop = threading.Event()
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'max_attempts'").fetchone()
+        self.max_attempts = int(row[0]) if row else DEFAULT_MAX_ATTEMPTS
+        now = time.time()
+        self.conn.execute("INSERT INTO workers (id, host, pid, started, heartbeat) VALUES (?, ?, ?, ?, ?)",
+                          (self.id, socket.gethostname(), os.getpid(), now, now))
+
+    def _experiment(self, name: str) -> Dict[str, Any]:
+        if name not in self.experiments:
+            row = self.conn.execute("SELECT config FROM experiments WHERE name = ?", (name,)).fetchone()
+            config = json.loads(row[0])
+            config["system_prompt"] = config.get("system_prompt", get_check(config["type"]).system_prompt)
+            self.experiments[name] = config
+        return self.experiments[name]
+
+    def claim(self) -> List[Tuple[int, str, int, int, int, str]]:
+        """
+        Loue jusqu'à batch_size tâches en attente ou dont le bail a expiré ;
+        celles qui ont épuisé leurs tentatives passent en échec.
+        """
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                "UPDATE jobs SET status = 'failed', error = COALESCE(error, 'bail expiré'), lease_owner = NULL"
+                " WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts),
+            )
+            rows = self.conn.execute(
+                "SELECT id, experiment, item, question, sample, prompt FROM jobs"
+                " WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)"
+                " ORDER BY experiment, item, question, sample LIMIT ?",
+                (now, self.batch_size),
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1"
+                " WHERE id = ?",
+                [(self.id, now + self.lease_seconds, row[0]) for row in rows],
+            )
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return rows
+
+    def _heartbeat(self):
+        conn = connect(self.path)
+        while not self._stop.wait(self.lease_seconds / 3):
+            now = time.time()
+            conn.execute("UPDATE jobs SET lease_expires = ? WHERE lease_owner = ? AND status = 'leased'",
+                         (now + self.lease_seconds, self.id))
+            conn.execute("UPDATE workers SET heartbeat = ? WHERE id = ?", (now, self.id))
+        conn.close()
+
+    def execute(
+        self, jobs: List[Tuple[int, str, int, int, int, str]]
+    ) -> Tuple[Dict[int, str], List[Tuple[List[int], Exception]]]:
+        """
+        Envoie les requêtes d'un lot de tâches.
+
+        Returns:
+            Les réponses par tâche, et les tâches de chaque requête en échec
+            avec son erreur : une requête qui échoue n'entraîne pas les
+            autres tâches du lot.
+        """
+        by_prompt: Dict[Tuple[str, int, int], Dict[int, int]] = {}
+        for job_id, experiment, item, question, sample, _ in jobs:
+            by_prompt.setdefault((experiment, item, question), {})[sample] = job_id
+        prompts = {(job[1], job[2], job[3]): job[5] for job in jobs}
+        queries = []
+        owners = []
+        for key, samples in by_prompt.items():
+            config = self._experiment(key[0])
+            requests = [(0, 0, k) for k in sorted(samples)]
+            groups = group_samples(requests) if self.multi_sample else [(0, 0, k, 1) for _, _, k in requests]
+            for _, _, k, n in groups:
+                queries.append({
+                    "prompt": prompts[key], "system_prompt": config["system_prompt"],
+                    "model_name": config["model"], "temperature": config["temperature"],
+                    "max_tokens": config.get("max_tokens", DEFAULT_MAX_TOKENS), "sample_index": k,
+                    "backend": config.get("backend"), **({"n": n} if self.multi_sample else {}),
+                })
+                owners.append([samples[k + offset] for offset in range(n)])
+        responses = gpt_query_many(queries, max_concurrency=self.max_concurrency, return_exceptions=True)
+        results = {}
+        failures = []
+        for job_ids, response in zip(owners, responses):
+            if isinstance(response, Exception):
+                failures.append((job_ids, response))
+                continue
+            for job_id, content in zip(job_ids, response if self.multi_sample else [response]):
+                results[job_id] = content
+        return results, failures
+
+    def complete(self, results: Dict[int, str]) -> int:
+        """
+        Enregistre les réponses des tâches dont ce worker détient encore le
+        bail (une tâche reprise par un autre après expiration est ignorée).
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        done = 0
+        for job_id, content in results.items():
+            done += self.conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, lease_owner = NULL, error = NULL"
+                " WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (json.dumps(content, ensure_ascii=False), job_id, self.id),
+            ).rowcount
+        self.conn.execute("UPDATE workers SET jobs_done = jobs_done + ?, heartbeat = ? WHERE id = ?",
+                          (done, time.time(), self.id))
+        self.conn.execute("COMMIT")
+        return done
+
+    def fail(self, job_ids: List[int], error: BaseException):
+        """
+        Rend les tâches d'un lot en échec : elles repartent en attente, ou
+        passent en échec après max_attempts tentatives.
+        """
+        self.conn.executemany(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,"
+            " lease_owner = NULL, error = ? WHERE id = ? AND lease_owner = ?",
+            [(self.max_attempts, f"{type(error).__name__}: {error}", job_id, self.id) for job_id in job_ids],
+        )
+
+    def remaining(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'leased')").fetchone()[0]
+
+    def run(self) -> int:
+        """
+        Traite des lots jusqu'à ce que la file soit vide (en attendant les
+        baux des autres workers, qui peuvent expirer).
+
+        Returns:
+            Le nombre de tâches terminées par ce worker.
+        """
+        heartbeat = threading.Thread(target=self._heartbeat, daemon=True)
+        heartbeat.start()
+        done = 0
+        try:
+            while True:
+                jobs = self.claim()
+                if not jobs:
+                    if self.remaining() == 0:
+                        break
+                    time.sleep(POLL_SECONDS)
+                    continue
+                try:
+                    results, failures = self.execute(jobs)
+                except Exception as e:
+                    print(f"Worker {self.id} : lot de {len(jobs)} tâches en échec ({type(e).__name__}: {e})")
+                    self.fail([job[0] for job in jobs], e)
+                    continue
+                for job_ids, error in failures:
+                    print(f"Worker {self.id} : {len(job_ids)} tâches en échec ({type(error).__name__}: {error})")
+                    self.fail(job_ids, error)
+                done += self.complete(results)
+        finally:
+            self._stop.set()
+            heartbeat.join()
+            self.conn.close()
+        return done
+
+
+def status(path: str) -> Dict[str, Dict[str, int]]:
+    """
+    Nombre de tâches par configuration et par état.
+    """
+    conn = connect(path)
+    counts: Dict[str, Dict[str, int]] = {}
+    for experiment, state, count in conn.execute(
+        "SELECT experiment, status, COUNT(*) FROM jobs GROUP BY experiment, status"
+    ):
+        counts.setdefault(experiment, {})[state] = count
+    conn.close()
+    return counts
+
+
+def reduce(path: str, results_root: str = RESULTS_ROOT) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Rassemble les réponses de la file dans le format de run_checks.py :
+    questions_<name>.json, output_<name>.json et estimate_<name>.json. Les
+    éléments dont une tâche n'est pas terminée sont laissés de côté.
+    """
+    conn = connect(path)
+    outputs = {}
+    for name, config_json, items_json, population in conn.execute("SELECT * FROM experiments").fetchall():
+        config = json.loads(config_json)
+        items = json.loads(items_json)
+        check = get_check(config["type"])
+        answers: List[List[List[Optional[str]]]] = [
+            [[None] * config["run"] for _ in item["questions"]] for item in items
+        ]
+        for item, question, sample, result in conn.execute(
+            "SELECT item, question, sample, result FROM jobs WHERE experiment = ? AND status = 'done'", (name,)
+        ):
+            answers[item][question][sample] = json.loads(result)
+        complete = [i for i, item_answers in enumerate(answers)
+                    if all(r is not None for prompt_answers in item_answers for r in prompt_answers)]
+        if len(complete) < len(items):
+            print(f"{name} : {len(items) - len(complete)} questions incomplètes laissées de côté")
+        entries = score_batch(check, [items[i] for i in complete], [answers[i] for i in complete]) if complete else []
+        results = [entry for entry in entries if not entry.get("skipped", False)]
+
+        results_dir = os.path.join(results_root, check.results_subdir)
+        os.makedirs(results_dir, exist_ok=True)
+        confidence = config.get("confidence", DEFAULT_CONFIDENCE)
+        summary = estimate(sum(entry["strong"] for entry in results), len(results), population, confidence)
+        summary.update({"seed": config.get("seed", DEFAULT_SEED), "sequential": False})
+        summary.update(config_description(config, check))
+        save_question_set(os.path.join(results_dir, f"questions_{name}.json"), items)
+        with open(os.path.join(results_dir, f"output_{name}.json"), 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+        with open(os.path.join(results_dir, f"estimate_{name}.json"), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=4)
+        print(f"{name} : {len(results)} résultats")
+        outputs[name] = results
+    conn.close()
+    return outputs
+
+
+def _configure(args: argparse.Namespace):
+    if args.replay:
+        from replay_backend import ReplayBackend
+        set_backend(ReplayBackend(args.replay, latency=args.replay_latency))
+    set_rate_controller(RateController(args.rpm, args.tpm))
+
+
+def _work(args: argparse.Namespace) -> int:
+    _configure(args)
+    worker = Worker(args.queue, args.batch_size, args.lease, args.max_concurrency, args.multi_sample)
+    done = worker.run()
+    print(f"Worker {worker.id} : {done} tâches terminées")
+    return done
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="File de tâches partagée (SQLite) pour répartir une"
+                                                 " expérience sur plusieurs processus ou machines.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    plan_parser = subparsers.add_parser("plan", help="Écrit les tâches des configurations dans la file")
+    plan_parser.add_argument("queue")
+    plan_parser.add_argument("configs", nargs="+",
+                             help="Fichiers de configuration JSON, ou matrices (cf. experiment_matrix.py)")
+    plan_parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS)
+    for command in ("work", "local"):
+        work_parser = subparsers.add_parser(
+            command, help="Traite les tâches" if command == "work" else
+            "Lance plusieurs workers locaux, puis rassemble les résultats"
+        )
+        work_parser.add_argument("queue")
+        work_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        work_parser.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS,
+                                 help="Durée d'un bail en secondes")
+        work_parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY)
+        work_parser.add_argument("--no-multi-sample", dest="multi_sample", action="store_false")
+        work_parser.add_argument("--replay", metavar="DATA_DIR")
+        work_parser.add_argument("--replay-latency", type=float, default=0.0)
+        work_parser.add_argument("--rpm", type=float)
+        work_parser.add_argument("--tpm", type=float)
+        if command == "local":
+            work_parser.add_argument("--workers", type=int, default=4)
+            work_parser.add_argument("--results-dir", default=RESULTS_ROOT)
+    subparsers.add_parser("status", help="État des tâches").add_argument("queue")
+    reduce_parser = subparsers.add_parser("reduce", help="Écrit les fichiers output_<name>.json")
+    reduce_parser.add_argument("queue")
+    reduce_parser.add_argument("--results-dir", default=RESULTS_ROOT)
+    args = parser.parse_args()
+
+    if args.command == "plan":
+        configs = [
+            config for file in args.configs
+            for config in (load_matrix(file) if is_matrix(file) else load_configs(file))
+        ]
+        print(f"{plan(args.queue, configs, args.max_attempts)} tâches ajoutées à {args.queue}")
+    elif args.command == "work":
+        _work(args)
+    elif args.command == "local":
+        # Plusieurs processus qui partagent le fichier, comme des machines distinctes
+        with multiprocessing.get_context("spawn").Pool(args.workers) as pool:
+            print(f"{sum(pool.map(_work, [args] * args.workers))} tâches terminées par {args.workers} workers")
+        reduce(args.queue, args.results_dir)
+    elif args.command == "status":
+        for experiment, counts in status(args.queue).items():
+            print(f"{experiment:<32} " + ", ".join(f"{state} {count}" for state, count in sorted(counts.items())))
+    else:
+        reduce(args.queue, args.results_dir)